@@ -0,0 +1,172 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This is the entry point to synthesize the hole completions of many Paddle
+files at once:
+
+`python3 batch.py METHOD_NUM PATTERN [WORKERS] [TIMEOUT]`
+
+PATTERN is a directory, whose `.paddle` files are solved (including the
+ones in its subdirectories), or a glob such as `examples/**/*.paddle`. The
+files are solved in parallel by WORKERS processes (by default, one per
+CPU), with the synthesis loop of `main.py`. Each process parses the
+grammar of Paddle and loads z3 once, and then solves many files. A file
+that is not solved within TIMEOUT seconds (by default, 600) is given up,
+and a worker process that dies (e.g. out of memory) only fails the file
+it was solving.
+
+One JSON object is printed per line as soon as a file is solved, with
+the fields:
+- `file`: the name of the file;
+- `solution`: the completion of each hole, printed as a Paddle expression,
+  or null if no solution was found;
+- `cached`: true if the solution comes from the cache (see `SolutionCache`);
+- `iterations`: the number of candidates sent to the verifier;
+- `candidates`: the number of candidates enumerated;
+- `solver_time`: the time spent verifying the candidates, in seconds;
+- `wall_time`: the time spent on the file, in seconds;
+- `error`: the error raised, e.g. when the file cannot be parsed or is
+  not solved within the time limit (the other fields are then missing).
+"""
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from lang.paddle import parse
+from synthesis.synth import Synthesizer
+from synthesis.cache import CACHE_DIR, SolutionCache
+from main import VERIFICATION_BUDGET, synthesize
+
+# The time limit of each file, in seconds.
+TIMEOUT = 600
+
+
+def usage():
+    """Print usage information for this file."""
+    print("Usage: python3 batch.py METHOD_NUM PATTERN [WORKERS] [TIMEOUT]")
+    print("PATTERN is a directory of .paddle files, or a glob such as examples/**/*.paddle.")
+    print("The files are solved by WORKERS processes (by default, one per CPU), and the result")
+    print("of each file is printed as one line of JSON.")
+    print(f"A file that is not solved within TIMEOUT seconds (by default, {TIMEOUT}) is given up.")
+
+
+def problem_files(pattern: str) -> List[str]:
+    """Returns the Paddle files of a directory and its subdirectories, or the files that match a glob."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*.paddle")
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+class Timeout(Exception):
+    """Raised in a worker when a file is not solved within its time limit."""
+
+
+def on_alarm(signum, frame):
+    # The exception is lost if it is raised in a callback (e.g. of a weak
+    # reference), so the alarm fires again until it reaches the loop.
+    signal.setitimer(signal.ITIMER_REAL, 1)
+    raise Timeout("the file was not solved within the time limit")
+
+
+def solve(filename: str, method_num: int, cache: SolutionCache) -> Dict:
+    """Solves the file with the synthesis loop of `main.py`, or returns its cached solution."""
+    prog = parse(filename)
+    cached_solution = cache.lookup(prog, VERIFICATION_BUDGET)
+    if cached_solution is not None:
+        return {"solution": cached_solution, "cached": True, "iterations": 0, "candidates": 0, "solver_time": 0.0}
+    result = synthesize(prog, Synthesizer(prog), method_num)
+    if result.solution is not None:
+        cache.store(prog, result.solution, method_num)
+    return dict(result._asdict(), cached=False)
+
+
+def solve_file(method_num: int, filename: str, cache_dir: Optional[str] = CACHE_DIR,
+               timeout: float = TIMEOUT) -> Dict:
+    """
+    Solves the file, and returns its result as a JSON object. An error is
+    part of the result, so that it does not stop the other files.
+    @param timeout The time limit of the file, in seconds (0 means no
+    limit). The solver is only interrupted when its own budget runs out.
+    """
+    start = time.perf_counter()
+    handler = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = solve(filename, method_num, SolutionCache(cache_dir))
+        if result["solution"] is not None:
+            result["solution"] = {hole: str(completion) for hole, completion in result["solution"].items()}
+    except Exception as exception:
+        result = {"error": f"{type(exception).__name__}: {exception}"}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+    return dict({"file": filename}, **result, wall_time=time.perf_counter() - start)
+
+
+def solve_in_pool(method_num: int, files: List[str], workers: int, cache_dir: Optional[str],
+                  timeout: float) -> Iterator[Tuple[str, Optional[Dict]]]:
+    """
+    Solves the files with a pool of worker processes, and generates each
+    file with its result as soon as it is solved. The result is None if
+    the pool broke before the file was solved, e.g. because a worker
+    process was killed.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(solve_file, method_num, filename, cache_dir, timeout): filename for filename in files}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except BrokenProcessPool:
+                yield futures[future], None
+
+
+def run(method_num: int, files: List[str], workers: int, output: TextIO = sys.stdout,
+        cache_dir: Optional[str] = CACHE_DIR, timeout: float = TIMEOUT) -> int:
+    """
+    Solves the files with a pool of worker processes, and writes the result
+    of each file as a line of JSON as soon as it is solved. Returns the
+    number of files that are solved.
+    """
+    results = []
+    broken = []
+    for filename, result in solve_in_pool(method_num, files, workers, cache_dir, timeout):
+        if result is None:
+            broken.append(filename)
+        else:
+            results.append(result)
+            write_result(result, output)
+    # The files that were not solved when the pool broke are solved again,
+    # each in its own pool, so that the file that broke it is the only one
+    # that fails.
+    for filename in broken:
+        for _, result in solve_in_pool(method_num, [filename], 1, cache_dir, timeout):
+            if result is None:
+                result = {"file": filename, "error": "BrokenProcessPool: the worker process terminated abruptly"}
+            results.append(result)
+            write_result(result, output)
+    return sum(result.get("solution") is not None for result in results)
+
+
+def write_result(result: Dict, output: TextIO) -> None:
+    """Writes the result of a file as a line of JSON."""
+    output.write(json.dumps(result) + "\n")
+    output.flush()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 2:
+        print("Please provide a method number and a directory or a glob of input files!")
+        usage()
+        sys.exit(-1)
+    method_num = int(sys.argv[1])
+    files = problem_files(sys.argv[2])
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    timeout = float(sys.argv[4]) if len(sys.argv) > 4 else TIMEOUT
+    solved = run(method_num, files, workers, timeout=timeout)
+    print(f"Solved {solved} of {len(files)} files.", file=sys.stderr)
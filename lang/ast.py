@@ -5,7 +5,8 @@ by Victor Nicolet and Danya Lette
 This file contains classes that are used to construct the Paddle AST.
 """
 import sys
-from typing import Set, List, Optional, Tuple
+import weakref
+from typing import FrozenSet, Set, List, Optional, Tuple
 from enum import Enum, unique
 from lark import ast_utils
 
@@ -172,12 +173,70 @@ class Variable(Node):
 
 # === Paddle Expressions and Declarations Abstract Nodes ===
 
-class Expression(Node):
+# The hash-consed expressions, indexed by their class and their key. An
+# expression is removed from the table when it is not used anymore.
+interned_expressions = weakref.WeakValueDictionary()
+
+
+class HashConsing(type):
+    """
+    The metaclass of expressions. Creating an expression that is
+    structurally equal to an existing one returns the existing object, so
+    that two expressions are equal only if they are the same object, and
+    equal subexpressions are shared.
+    Expressions must not be modified once they are created.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        node = super().__call__(*args, **kwargs)
+        key = node.key()
+        if key is None:
+            return node
+        key = (cls,) + key
+        existing = interned_expressions.get(key)
+        if existing is not None:
+            return existing
+        node.hash_value = hash(key)
+        interned_expressions[key] = node
+        return node
+
+
+class Expression(Node, metaclass=HashConsing):
     """An abstract class for expressions."""
 
+    # The hash of the key of the expression, computed once.
+    hash_value: Optional[int] = None
+    # The variables used by the composite expressions, computed once: the
+    # subexpressions are shared (e.g. the definition of a variable at each of
+    # its uses), so walking the tree every time would be exponential.
+    uses_value: Optional[FrozenSet[Variable]] = None
+
     def uses(self,) -> Set[Variable]:
         '''An expression uses some variables.'''
 
+    def key(self) -> Optional[tuple]:
+        """
+        The arguments of the constructor that give this expression, or None
+        if the expression is not hash-consed. The children are compared by
+        identity, since they are hash-consed too.
+        """
+        return None
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        if self.hash_value is None:
+            return object.__hash__(self)
+        return self.hash_value
+
+    def __reduce__(self):
+        # Unpickled expressions are hash-consed again.
+        key = self.key()
+        if key is None:
+            return super().__reduce__()
+        return (type(self), key)
+
 
 class Declaration(Node):
     """ An abstract class for Nodes that declare variables.
@@ -238,9 +297,14 @@ class Ite(Expression):
     def children(self) -> list:
         return [self.cond, self.true_br, self.false_br]
 
+    def key(self) -> tuple:
+        return (self.cond, self.true_br, self.false_br)
+
     def uses(self) -> Set[Variable]:
-        branches_uses = self.true_br.uses().union(self.false_br.uses())
-        return self.cond.uses().union(branches_uses)
+        if self.uses_value is None:
+            branches_uses = self.true_br.uses().union(self.false_br.uses())
+            self.uses_value = frozenset(self.cond.uses().union(branches_uses))
+        return set(self.uses_value)
 
     def __str__(self) -> str:
         return f"{self.cond} ? {self.true_br} : {self.false_br}"
@@ -272,8 +336,13 @@ class BinaryExpr(Expression):
     def children(self) -> list:
         return [self.left_operand, self.right_operand]
 
+    def key(self) -> tuple:
+        return (self.operator, self.left_operand, self.right_operand)
+
     def uses(self,) -> Set[Variable]:
-        return self.left_operand.uses().union(self.right_operand.uses())
+        if self.uses_value is None:
+            self.uses_value = frozenset(self.left_operand.uses().union(self.right_operand.uses()))
+        return set(self.uses_value)
 
     def __str__(self):
         return (f"({str(self.left_operand)} {str(self.operator)} "
@@ -300,8 +369,13 @@ class UnaryExpr(Expression):
     def children(self) -> list:
         return [self.operand]
 
+    def key(self) -> tuple:
+        return (self.operator, self.operand)
+
     def uses(self) -> Set[Variable]:
-        return self.operand.uses()
+        if self.uses_value is None:
+            self.uses_value = frozenset(self.operand.uses())
+        return set(self.uses_value)
 
     def __str__(self):
         return f"({str(self.operator)} {str(self.operand)})"
@@ -334,6 +408,9 @@ class VarExpr(Expression):
             return []
         return [self.var]
 
+    def key(self) -> tuple:
+        return (self.var, self.name)
+
     attr_names = ('name', )
 
 
@@ -348,6 +425,9 @@ class IntConst(Expression):
     def uses(self) -> Set[Variable]:
         return set()
 
+    def key(self) -> tuple:
+        return (self.value, )
+
     def __str__(self) -> str:
         return str(self.value)
 
@@ -365,6 +445,9 @@ class BoolConst(Expression):
     def uses(self) -> Set[Variable]:
         return set()
 
+    def key(self) -> tuple:
+        return (self.value, )
+
     def __str__(self) -> str:
         return str(self.value)
 
@@ -615,6 +698,9 @@ def pythonize(string: str) -> str:
     Will not work in many cases, use with care!
     This is meant to be used to evaluate some Paddle expression directly:
         x is an expression : eval(pythonize(str(x)))
+    The operators keep their Python semantics (e.g. `/` is not the integer
+    division). `lang.compiler.compile_expr` compiles the expression itself,
+    with the semantics of the Interpreter and of z3: compile_expr(x)()
     """
     return (string.replace(' = ', ' == ').replace('&&', 'and')
             .replace('||', 'or').replace('!', 'not'))
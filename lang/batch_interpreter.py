@@ -0,0 +1,203 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the BatchInterpreter class, which evaluates a program on
+many inputs at once. The values of a variable on all the inputs are stored
+in one NumPy array (int64 or bool), and each operator of the program is
+applied to whole arrays.
+
+The synthesis loop (see `refuted` in `main.py`) uses it to check a
+candidate on all the counterexamples at once when there are many of them.
+
+The semantics are the ones of the Interpreter (and of z3). NumPy integers
+have a fixed size, so an operation whose operands could overflow int64 is
+computed on arrays of Python integers instead.
+"""
+from random import Random
+from typing import Dict, List, Mapping
+import numpy as np
+from lang.ast import *
+from lang.symb_eval import EvaluationTypeError, Evaluator
+from lang.interpreter import Value
+
+# Operands strictly between -SAFE_BOUND and SAFE_BOUND cannot overflow int64
+# when they are added, subtracted or multiplied.
+SAFE_BOUND = 2 ** 31
+
+
+def fits(values: np.ndarray) -> bool:
+    """Returns true if the values are int64 and small enough for int64 arithmetic."""
+    if values.dtype != np.int64:
+        return values.dtype == np.bool_
+    return values.size == 0 or (values.max() < SAFE_BOUND and values.min() > -SAFE_BOUND)
+
+
+def exact(x: np.ndarray, y: np.ndarray):
+    """Returns the operands, as arrays of Python integers if they could overflow."""
+    if fits(x) and fits(y):
+        return x, y
+    return x.astype(object), y.astype(object)
+
+
+def batch_div(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Integer division with the semantics of `interpreter.int_div`."""
+    remainder = batch_mod(x, y)
+    safe_y = np.where(y == 0, 1, y)
+    return np.where(y == 0, 0, (x - remainder) // safe_y)
+
+
+def batch_mod(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Integer modulo with the semantics of `interpreter.int_mod`."""
+    x, y = exact(x, y)
+    safe_y = np.where(y == 0, 1, y)
+    return np.where(y == 0, 0, x % np.abs(safe_y))
+
+
+binary_funcs = {
+    BinaryOperator.PLUS: lambda x, y: np.add(*exact(x, y)),
+    BinaryOperator.MINUS: lambda x, y: np.subtract(*exact(x, y)),
+    BinaryOperator.TIMES: lambda x, y: np.multiply(*exact(x, y)),
+    BinaryOperator.DIV: batch_div,
+    BinaryOperator.MODULO: batch_mod,
+    BinaryOperator.EQUALS: lambda x, y: np.asarray(x == y, dtype=bool),
+    BinaryOperator.GREATER: lambda x, y: np.asarray(x > y, dtype=bool),
+    BinaryOperator.GREATER_EQ: lambda x, y: np.asarray(x >= y, dtype=bool),
+    BinaryOperator.LESSTHAN: lambda x, y: np.asarray(x < y, dtype=bool),
+    BinaryOperator.LESSTHAN_EQ: lambda x, y: np.asarray(x <= y, dtype=bool),
+    BinaryOperator.AND: np.logical_and,
+    BinaryOperator.OR: np.logical_or,
+    BinaryOperator.NOTEQUALS: lambda x, y: np.asarray(x != y, dtype=bool)
+}
+unary_funcs = {
+    UnaryOperator.NOT: np.logical_not,
+    UnaryOperator.ABS: lambda x: np.abs(x if fits(x) else x.astype(object)),
+    UnaryOperator.NEG: lambda x: np.negative(x if fits(x) else x.astype(object))
+}
+
+
+def to_columns(prog: Program, points: List[Mapping[str, Value]]) -> Dict[str, np.ndarray]:
+    """
+    Converts a list of inputs of the program, each a map from input names to
+    values, to a map from input names to the arrays of their values.
+    """
+    columns = {}
+    for var in prog.inputs:
+        values = [point[var.name] for point in points]
+        if var.type == PaddleType.BOOL:
+            columns[var.name] = np.array(values, dtype=np.bool_)
+            continue
+        try:
+            columns[var.name] = np.array(values, dtype=np.int64)
+        except OverflowError:
+            # The values found by the solver are not bounded, they are kept as Python integers.
+            columns[var.name] = np.array(values, dtype=object)
+    return columns
+
+
+def random_inputs(prog: Program, count: int, low: int = -100, high: int = 100,
+                  seed: int = 410) -> Dict[str, np.ndarray]:
+    """
+    Returns `count` random inputs of the program, as a map from input names
+    to arrays of values. Integers are sampled between low and high.
+    """
+    rng = np.random.default_rng(Random(seed).getrandbits(32))
+    columns = {}
+    for var in prog.inputs:
+        if var.type == PaddleType.BOOL:
+            columns[var.name] = rng.integers(0, 2, size=count).astype(np.bool_)
+        else:
+            columns[var.name] = rng.integers(low, high, size=count, endpoint=True, dtype=np.int64)
+    return columns
+
+
+class Columns():
+    """
+    The arrays of values of the inputs of a program on a list of inputs that
+    grows, e.g. the counterexamples of the synthesis loop. The arrays are
+    only converted again when inputs were added to the list.
+    """
+
+    def __init__(self, prog: Program) -> None:
+        self.prog = prog
+        self.size = 0
+        self.columns: Dict[str, np.ndarray] = to_columns(prog, [])
+
+    def of(self, points: List[Mapping[str, Value]]) -> Dict[str, np.ndarray]:
+        """Returns the arrays of values of the inputs on the points."""
+        if len(points) != self.size:
+            self.columns = to_columns(self.prog, points)
+            self.size = len(points)
+        return self.columns
+
+
+class BatchInterpreter():
+    """
+    A BatchInterpreter evaluates a program on arrays of inputs. Like the
+    Interpreter, it should be initialized with a map from hole name to the
+    expression of the hole.
+    """
+
+    def __init__(self, hole_defs: Mapping[str, Expression]) -> None:
+        """
+        @param hole_defs A Mapping from string to expression, meant to be used
+        to replace a hole variable by its definition.
+        """
+        self.hole_defs = hole_defs
+
+    def evaluate_expr(self, env: Mapping[str, np.ndarray], ex: Expression, size: int) -> np.ndarray:
+        """
+        Evaluates the expression ex on all the inputs at once.
+        @param env A Mapping from variable names to the arrays of their values.
+        @param ex The expression to evaluate.
+        @param size The number of inputs.
+        """
+        if isinstance(ex, BinaryExpr):
+            lhs = self.evaluate_expr(env, ex.left_operand, size)
+            rhs = self.evaluate_expr(env, ex.right_operand, size)
+            return binary_funcs[ex.operator](lhs, rhs)
+
+        if isinstance(ex, UnaryExpr):
+            return unary_funcs[ex.operator](self.evaluate_expr(env, ex.operand, size))
+
+        if isinstance(ex, Ite):
+            cond = self.evaluate_expr(env, ex.cond, size)
+            true_br = self.evaluate_expr(env, ex.true_br, size)
+            false_br = self.evaluate_expr(env, ex.false_br, size)
+            return np.where(cond, true_br, false_br)
+
+        if isinstance(ex, VarExpr):
+            if ex.name in env:
+                return env[ex.name]
+            if ex.name in self.hole_defs:
+                return self.evaluate_expr(env, self.hole_defs[ex.name], size)
+            raise EvaluationTypeError(f"Variable {ex.name} has no value.")
+
+        if isinstance(ex, BoolConst):
+            return np.full(size, ex.value, dtype=np.bool_)
+
+        if isinstance(ex, IntConst):
+            if -SAFE_BOUND < ex.value < SAFE_BOUND:
+                return np.full(size, ex.value, dtype=np.int64)
+            return np.full(size, ex.value, dtype=object)
+
+        if isinstance(ex, (GrammarInteger, GrammarVar)):
+            raise EvaluationTypeError(
+                "GrammarInteger and GrammarVar should not appear in expressions that are evaluated.")
+
+        raise EvaluationTypeError("Argument is an Expression of unknown type!")
+
+    def evaluate(self, prog: Program, inputs: Mapping[str, np.ndarray]) -> np.ndarray:
+        """
+        Evaluates the program on all the inputs, and returns the array of the
+        values of the constraint.
+        @param prog The program to evaluate.
+        @param inputs A Mapping from the names of the inputs of the program to
+        the arrays of their values. All the arrays have the same length.
+        """
+        Evaluator(self.hole_defs).check_holes_have_defs(prog)
+        size = len(next(iter(inputs.values()))) if len(inputs) > 0 else 1
+        environment = dict(inputs)
+        for assignment in prog.assignments:
+            environment[assignment.var.name] = self.evaluate_expr(environment, assignment.expr, size)
+        return np.asarray(self.evaluate_expr(environment, prog.constraint, size), dtype=bool)
@@ -0,0 +1,206 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the compilation of expressions and programs to Python
+functions, which evaluate them on concrete values much faster than the
+Interpreter walks them.
+
+An expression is compiled to the source of a Python function, which is
+compiled once with `compile` and then runs as Python bytecode. The shared
+subexpressions are evaluated once in a statement (e.g. `t2 = (t0 + t1)`).
+The semantics are the ones of the Interpreter (and of z3): the division
+and the modulo are `int_div` and `int_mod`. The variables of the program are renamed `v_x`
+so that they cannot clash with Python keywords or with the temporaries.
+
+The expressions are hash-consed, so an expression is its own structural
+key: the compiled functions are cached by expression. A program is compiled
+once, with a call to the compiled completion of each hole, so that a
+candidate only compiles its hole completions.
+"""
+from collections import Counter
+from functools import lru_cache, partial
+from typing import Callable, Dict, List, Mapping, Tuple
+from lang.ast import *
+from lang.interpreter import Value, int_div, int_mod
+from lang.symb_eval import EvaluationTypeError, Evaluator
+
+# The number of compiled functions that are kept.
+COMPILE_CACHE_SIZE = 4096
+# The nesting depth after which a subexpression is evaluated in a statement,
+# which is well below the limits of the Python parser.
+NESTING_LIMIT = 50
+
+binary_templates = {
+    BinaryOperator.PLUS: "{} + {}",
+    BinaryOperator.MINUS: "{} - {}",
+    BinaryOperator.TIMES: "{} * {}",
+    BinaryOperator.DIV: "int_div({}, {})",
+    BinaryOperator.MODULO: "int_mod({}, {})",
+    BinaryOperator.EQUALS: "{} == {}",
+    BinaryOperator.GREATER: "{} > {}",
+    BinaryOperator.GREATER_EQ: "{} >= {}",
+    BinaryOperator.LESSTHAN: "{} < {}",
+    BinaryOperator.LESSTHAN_EQ: "{} <= {}",
+    BinaryOperator.AND: "{} and {}",
+    BinaryOperator.OR: "{} or {}",
+    BinaryOperator.NOTEQUALS: "{} != {}"
+}
+unary_templates = {
+    UnaryOperator.NOT: "not {}",
+    UnaryOperator.ABS: "abs({})",
+    UnaryOperator.NEG: "-{}"
+}
+# The functions that the compiled code can call.
+runtime = {"int_div": int_div, "int_mod": int_mod}
+
+
+def local_name(name: str) -> str:
+    """Returns the name of the Python variable of a Paddle variable."""
+    return f"v_{name}"
+
+
+class CodeGenerator():
+    """
+    A CodeGenerator writes the Python code that evaluates expressions. The
+    subexpressions are nested in one Python expression, except the ones that
+    are used several times, which are evaluated once in a statement, and the
+    ones nested too deeply for the Python parser. The completions of the holes
+    are compiled separately, and called with the variables they can use.
+    """
+
+    def __init__(self, variables: Mapping[str, str], holes: Mapping[str, Tuple[str, ...]]) -> None:
+        """
+        @param variables The Python expression of the value of each variable.
+        @param holes The variables that the completion of each hole is called with.
+        """
+        self.holes = holes
+        self.lines: List[str] = []
+        # The Python expression of each Paddle variable that has a value.
+        self.variables: Dict[str, str] = dict(variables)
+        # The Python expression of each compiled subexpression, and its nesting depth.
+        self.values: Dict[Expression, str] = {}
+        self.depths: Dict[Expression, int] = {}
+        # The number of parents of each subexpression of the expressions to compile.
+        self.uses: Counter = Counter()
+
+    def count_uses(self, ex: Expression) -> None:
+        """Counts the uses of the subexpressions of ex, which must be done before it is generated."""
+        self.uses[ex] += 1
+        if self.uses[ex] == 1:
+            for child in ex.children():
+                if isinstance(child, Expression):
+                    self.count_uses(child)
+
+    def bind(self, name: str, value: str) -> None:
+        """Assigns the value to the Python variable of the Paddle variable."""
+        self.lines.append(f"{local_name(name)} = {value}")
+        self.variables[name] = local_name(name)
+
+    def temporary(self, value: str) -> str:
+        name = f"t{len(self.lines)}"
+        self.lines.append(f"{name} = {value}")
+        return name
+
+    def generate(self, ex: Expression) -> str:
+        """
+        Writes the statements that evaluate the shared subexpressions of ex,
+        and returns the Python expression of its value.
+        """
+        if ex in self.values:
+            return self.values[ex]
+        if isinstance(ex, BinaryExpr):
+            lhs = self.generate(ex.left_operand)
+            rhs = self.generate(ex.right_operand)
+            value = "(" + binary_templates[ex.operator].format(lhs, rhs) + ")"
+        elif isinstance(ex, UnaryExpr):
+            value = "(" + unary_templates[ex.operator].format(self.generate(ex.operand)) + ")"
+        elif isinstance(ex, Ite):
+            cond = self.generate(ex.cond)
+            true_branch = self.generate(ex.true_br)
+            false_branch = self.generate(ex.false_br)
+            value = f"({true_branch} if {cond} else {false_branch})"
+        elif isinstance(ex, VarExpr):
+            if ex.name in self.variables:
+                # A variable is not memoized by expression, its value depends on the environment.
+                return self.variables[ex.name]
+            if ex.name not in self.holes:
+                raise EvaluationTypeError(f"Variable {ex.name} has no value.")
+            # The hole is evaluated once, with the variables defined before it.
+            arguments = ", ".join(self.variables[name] for name in self.holes[ex.name])
+            self.bind(ex.name, f"hole_{ex.name}({arguments})")
+            return self.variables[ex.name]
+        elif isinstance(ex, (BoolConst, IntConst)):
+            return repr(ex.value)
+        elif isinstance(ex, (GrammarInteger, GrammarVar)):
+            raise EvaluationTypeError(
+                "GrammarInteger and GrammarVar should not appear in expressions that are evaluated.")
+        else:
+            raise EvaluationTypeError("Argument is an Expression of unknown type!")
+        depth = 1 + max(self.depths.get(c, 0) for c in ex.children() if isinstance(c, Expression))
+        if self.uses[ex] > 1 or depth >= NESTING_LIMIT:
+            value, depth = self.temporary(value), 0
+        self.values[ex] = value
+        self.depths[ex] = depth
+        return value
+
+    def function(self, parameters: str, result: str) -> Callable:
+        """Returns the Python function with the statements written so far, which returns result."""
+        namespace = dict(runtime)
+        if len(self.lines) == 0:
+            # A lambda is faster to compile.
+            return eval(compile(f"lambda {parameters}: {result}", "<paddle>", "eval"), namespace)
+        source = "\n    ".join([f"def compiled({parameters}):"] + self.lines + [f"return {result}"])
+        exec(compile(source, "<paddle>", "exec"), namespace)
+        return namespace["compiled"]
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_expr(ex: Expression, variables: Tuple[str, ...] = ()) -> Callable[..., Value]:
+    """
+    Returns a function that evaluates the expression: its arguments are the
+    values of the variables, in order.
+    @param ex The expression, which must only use the variables.
+    @param variables The names of the variables of the expression.
+    """
+    generator = CodeGenerator({name: local_name(name) for name in variables}, {})
+    generator.count_uses(ex)
+    result = generator.generate(ex)
+    return generator.function(", ".join(local_name(name) for name in variables), result)
+
+
+def hole_parameters(prog: Program, hole: str) -> Tuple[str, ...]:
+    """Returns the names of the variables that the completions of the hole can use, in order."""
+    return tuple(sorted(var.name for var in prog.hole_can_use(hole)))
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_template(prog: Program) -> Callable[..., Value]:
+    """
+    Returns a function that evaluates the program, whose arguments are the
+    compiled completion of each hole (see `compile_expr`) and the inputs.
+    The program is compiled once, and each candidate only compiles its
+    hole completions, which are cached by expression.
+    """
+    hole_names = [h.var.name for h in prog.holes]
+    # The inputs are read where they are used, so that the unused ones can be missing.
+    generator = CodeGenerator({var.name: f"inputs[{var.name!r}]" for var in prog.inputs},
+                              {name: hole_parameters(prog, name) for name in hole_names})
+    for ex in [a.expr for a in prog.assignments] + [prog.constraint]:
+        generator.count_uses(ex)
+    for assignment in prog.assignments:
+        generator.bind(assignment.var.name, generator.generate(assignment.expr))
+    parameters = [f"hole_{name}" for name in hole_names] + ["inputs"]
+    return generator.function(", ".join(parameters), generator.generate(prog.constraint))
+
+
+def compile_program(prog: Program, hole_completions: Mapping[str, Expression]) -> Callable[[Mapping[str, Value]], Value]:
+    """
+    Returns a function that evaluates the program with the hole completions
+    on the inputs, like `Interpreter.evaluate`.
+    @param prog The program.
+    @param hole_completions A map from the holes of the program to their completion.
+    """
+    Evaluator(hole_completions).check_holes_have_defs(prog)
+    holes = [compile_expr(hole_completions[h.var.name], hole_parameters(prog, h.var.name)) for h in prog.holes]
+    return partial(compile_template(prog), *holes)
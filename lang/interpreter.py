@@ -0,0 +1,128 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the Interpreter class, which is used to evaluate
+programs and expressions on concrete integer and boolean values.
+
+The integer operations have the same semantics as the operations on z3's
+`Int`, so that a program that is false on some inputs is also false for
+the verifier. This makes the Interpreter a cheap way to reject candidates
+before calling the solver.
+"""
+from typing import Mapping, Union
+from lang.ast import *
+from lang.symb_eval import EvaluationTypeError, Evaluator
+
+# A concrete Paddle value.
+Value = Union[int, bool]
+
+
+def int_div(x: int, y: int) -> int:
+    """
+    Integer division with the semantics of z3's `Int` division: the
+    remainder of the division is always positive, so the result is rounded
+    down if y is positive and rounded up if y is negative.
+    Division by zero is unspecified in z3, which means that the verifier
+    considers every possible result. It returns 0 here, which is one of them.
+    """
+    if y == 0:
+        return 0
+    return (x - int_mod(x, y)) // y
+
+
+def int_mod(x: int, y: int) -> int:
+    """
+    Integer modulo with the semantics of z3's `Int` modulo: the result
+    is always between 0 and abs(y) - 1.
+    Modulo by zero is unspecified in z3, it returns 0 here (see `int_div`).
+    """
+    if y == 0:
+        return 0
+    return x % abs(y)
+
+
+binary_funcs = {
+    BinaryOperator.PLUS: lambda x, y: x + y,
+    BinaryOperator.MINUS: lambda x, y: x - y,
+    BinaryOperator.TIMES: lambda x, y: x * y,
+    BinaryOperator.DIV: int_div,
+    BinaryOperator.MODULO: int_mod,
+    BinaryOperator.EQUALS: lambda x, y: x == y,
+    BinaryOperator.GREATER: lambda x, y: x > y,
+    BinaryOperator.GREATER_EQ: lambda x, y: x >= y,
+    BinaryOperator.LESSTHAN: lambda x, y: x < y,
+    BinaryOperator.LESSTHAN_EQ: lambda x, y: x <= y,
+    BinaryOperator.AND: lambda x, y: x and y,
+    BinaryOperator.OR: lambda x, y: x or y,
+    BinaryOperator.NOTEQUALS: lambda x, y: x != y
+}
+unary_funcs = {
+    UnaryOperator.NOT: lambda x: not x,
+    UnaryOperator.ABS: abs,
+    UnaryOperator.NEG: lambda x: -x
+}
+
+
+class Interpreter():
+    """
+    An Interpreter can be used to evaluate an expression on concrete
+    values. Like the Evaluator, an Interpreter should be initialized with
+    a map from hole name to the expression of the hole.
+    """
+
+    def __init__(self, hole_defs: Mapping[str, Expression]) -> None:
+        """
+        @param hole_defs A Mapping from string to expression, meant to be used
+        to replace a hole variable by its definition.
+        """
+        self.hole_defs = hole_defs
+
+    def evaluate_expr(self, env: Mapping[str, Value], ex: Expression) -> Value:
+        """
+        Evaluates the expression ex in the environment env.
+        @param env A Mapping from variable names to concrete values.
+        @param ex The expression to evaluate.
+        """
+        if isinstance(ex, BinaryExpr):
+            lhs = self.evaluate_expr(env, ex.left_operand)
+            rhs = self.evaluate_expr(env, ex.right_operand)
+            return binary_funcs[ex.operator](lhs, rhs)
+
+        if isinstance(ex, UnaryExpr):
+            return unary_funcs[ex.operator](self.evaluate_expr(env, ex.operand))
+
+        if isinstance(ex, Ite):
+            if self.evaluate_expr(env, ex.cond):
+                return self.evaluate_expr(env, ex.true_br)
+            return self.evaluate_expr(env, ex.false_br)
+
+        if isinstance(ex, VarExpr):
+            if ex.name in env:
+                return env[ex.name]
+            if ex.name in self.hole_defs:
+                return self.evaluate_expr(env, self.hole_defs[ex.name])
+            raise EvaluationTypeError(f"Variable {ex.name} has no value.")
+
+        if isinstance(ex, (BoolConst, IntConst)):
+            return ex.value
+
+        if isinstance(ex, (GrammarInteger, GrammarVar)):
+            raise EvaluationTypeError(
+                "GrammarInteger and GrammarVar should not appear in expressions that are evaluated.")
+
+        raise EvaluationTypeError("Argument is an Expression of unknown type!")
+
+    def evaluate(self, prog: Program, inputs: Mapping[str, Value]) -> Value:
+        """
+        Evaluates the program on the inputs: the assignments are evaluated
+        in order, and then the constraint.
+        @param prog The program to evaluate.
+        @param inputs A Mapping from the names of the inputs of the program
+        to their values.
+        """
+        Evaluator(self.hole_defs).check_holes_have_defs(prog)
+        environment = dict(inputs)
+        for assignment in prog.assignments:
+            environment[assignment.var.name] = self.evaluate_expr(environment, assignment.expr)
+        return self.evaluate_expr(environment, prog.constraint)
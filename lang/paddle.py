@@ -29,3 +29,15 @@ def parse(filename: Optional[str] = None, string: Optional[str] = None):
             content = "\n".join(file.readlines())
             tree = paddle_transform(parser.parse(content))
     return tree
+
+
+def parse_completion(prog, hole: str, text: str):
+    """
+    Parses the completion of a hole of the program, e.g. `x + 1` printed
+    by the synthesizer, in the context of the program: the variables that
+    the hole can use are declared as inputs.
+    """
+    hole_var = next(h.var for h in prog.holes if h.var.name == hole)
+    inputs = "".join(f"input {v.name} : {v.type};" for v in prog.hole_can_use(hole))
+    completion = parse(string=f"{inputs}define {hole} : {hole_var.type} = {text};assert True;")
+    return completion.assignments[-1].expr
@@ -0,0 +1,123 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the Simplifier class, an Evaluator that simplifies the
+expressions it builds, so that the formulas sent to the solver are smaller.
+
+The simplifications are valid with the semantics of z3:
+- the operations on constants are folded with the integer semantics of the
+  Interpreter (which is the one of z3), except for the division and the
+  modulo by zero, which are unspecified;
+- an if-then-else with a constant condition is replaced by its branch;
+- the identities of the booleans (e.g. `True && b = b`, `! ! b = b`) and
+  the neutral and absorbing elements of the integers (e.g. `x + 0 = x`,
+  `x * 0 = 0`) are applied.
+"""
+from typing import Dict, Mapping
+from lang.ast import *
+from lang.interpreter import binary_funcs, unary_funcs
+from lang.symb_eval import Evaluator
+
+
+def is_const(ex: Expression) -> bool:
+    return isinstance(ex, (IntConst, BoolConst))
+
+
+def const(value) -> Expression:
+    if isinstance(value, bool):
+        return BoolConst(value)
+    return IntConst(value)
+
+
+def simplify_binary(ex: BinaryExpr) -> Expression:
+    """Returns a simplified expression equivalent to ex, whose operands are simplified."""
+    operator, left, right = ex.operator, ex.left_operand, ex.right_operand
+    if is_const(left) and is_const(right):
+        if not (operator in (BinaryOperator.DIV, BinaryOperator.MODULO) and right.value == 0):
+            return const(binary_funcs[operator](left.value, right.value))
+        return ex
+    if operator in (BinaryOperator.AND, BinaryOperator.OR):
+        for constant, other in [(left, right), (right, left)]:
+            if isinstance(constant, BoolConst):
+                # True is neutral for && and absorbing for ||, and the opposite for False.
+                return other if constant.value == (operator == BinaryOperator.AND) else constant
+        if left is right:
+            return left
+    if operator in (BinaryOperator.PLUS, BinaryOperator.MINUS) and right is IntConst(0):
+        return left
+    if operator == BinaryOperator.PLUS and left is IntConst(0):
+        return right
+    if operator in (BinaryOperator.TIMES, BinaryOperator.DIV) and right is IntConst(1):
+        return left
+    if operator == BinaryOperator.TIMES and left is IntConst(1):
+        return right
+    if operator == BinaryOperator.TIMES and (left is IntConst(0) or right is IntConst(0)):
+        return IntConst(0)
+    if operator in (BinaryOperator.EQUALS, BinaryOperator.NOTEQUALS) and isinstance(right, BoolConst):
+        # b = True is b, and b != True is ! b.
+        if right.value == (operator == BinaryOperator.EQUALS):
+            return left
+        return simplify_unary(UnaryExpr(UnaryOperator.NOT, left))
+    return ex
+
+
+def simplify_unary(ex: UnaryExpr) -> Expression:
+    """Returns a simplified expression equivalent to ex, whose operand is simplified."""
+    if is_const(ex.operand):
+        return const(unary_funcs[ex.operator](ex.operand.value))
+    # ! ! b = b and - - x = x
+    if isinstance(ex.operand, UnaryExpr) and ex.operand.operator == ex.operator and ex.operator != UnaryOperator.ABS:
+        return ex.operand.operand
+    return ex
+
+
+def simplify_ite(ex: Ite) -> Expression:
+    """Returns a simplified expression equivalent to ex, whose children are simplified."""
+    if isinstance(ex.cond, BoolConst):
+        return ex.true_br if ex.cond.value else ex.false_br
+    if ex.true_br is ex.false_br:
+        return ex.true_br
+    if ex.true_br is BoolConst(True) and ex.false_br is BoolConst(False):
+        return ex.cond
+    if ex.true_br is BoolConst(False) and ex.false_br is BoolConst(True):
+        return simplify_unary(UnaryExpr(UnaryOperator.NOT, ex.cond))
+    return ex
+
+
+simplifications = {BinaryExpr: simplify_binary, UnaryExpr: simplify_unary, Ite: simplify_ite}
+
+
+class Simplifier(Evaluator):
+    """
+    A Simplifier symbolically evaluates expressions like an Evaluator, and
+    simplifies each composite expression once its children are evaluated.
+    The number of nodes removed by the simplifications is counted in
+    `removed` (the nodes of the evaluated expressions seen as trees).
+    """
+
+    def __init__(self, hole_defs: Mapping[str, Expression]) -> None:
+        """
+        @param hole_defs A Mapping from string to expression, meant to be used
+        to replace a hole variable by its definition.
+        """
+        super().__init__(hole_defs)
+        self.removed = 0
+        self.sizes: Dict[Expression, int] = {}
+
+    def size(self, ex: Expression) -> int:
+        """Returns the number of nodes of the expression, seen as a tree."""
+        if ex not in self.sizes:
+            self.sizes[ex] = 1 + sum(self.size(c) for c in ex.children() if isinstance(c, Expression))
+        return self.sizes[ex]
+
+    def evaluate_expr(self, var_defs: Mapping[str, Expression],
+                      ex: Expression) -> Expression:
+        result = super().evaluate_expr(var_defs, ex)
+        # The definitions of the variables are already simplified.
+        if type(ex) not in simplifications:
+            return result
+        simplified = simplifications[type(result)](result)
+        if simplified is not result:
+            self.removed += self.size(result) - self.size(simplified)
+        return simplified
@@ -35,6 +35,8 @@ class Evaluator():
         to replace a hole variable by its definition.
         """
         self.hole_defs = hole_defs
+        # The evaluated definitions of the holes.
+        self.hole_values = {}
 
     def evaluate_expr(self, var_defs: Mapping[str, Expression],
                       ex: Expression) -> Expression:
@@ -76,9 +78,18 @@ class Evaluator():
         # Case 4: ex is a variable
         elif isinstance(ex, VarExpr):
             if ex.var.name in var_defs:
+                # The definition is shared, not copied: the expressions are
+                # hash-consed, so the result is a DAG whose size is linear
+                # in the size of the program.
                 result = var_defs[ex.var.name]
             elif ex.var.name in self.hole_defs:
-                result = self.hole_defs[ex.var.name]
+                # The hole definition can use variables defined before
+                # the hole, which are also replaced by their definition.
+                # Their definitions do not change, so the hole is only
+                # evaluated once.
+                if ex.var.name not in self.hole_values:
+                    self.hole_values[ex.var.name] = self.evaluate_expr(var_defs, self.hole_defs[ex.var.name])
+                result = self.hole_values[ex.var.name]
             else:
                 # If a variable has no definition and is not a hole
                 # (.e.g it's an input), then it is unchanged.
@@ -0,0 +1,76 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the ProgramTemplate class, a program that is
+symbolically evaluated once for all the candidate hole completions.
+
+The holes are left in the evaluated program as placeholders `?h` (fresh
+variables with the type of the hole). The completions of a candidate are
+then evaluated alone, in the environment of the defines, which gives the
+value of each placeholder: the program with the completions is the
+template where each placeholder is equal to its value. The cost of a
+candidate depends on the size of its completions, and not on the number
+of defines in the program.
+"""
+from typing import Dict, Mapping
+from lang.ast import *
+from lang.simplify import Simplifier
+from lang.symb_eval import Evaluator
+
+
+class ProgramTemplate():
+    """
+    The constraint of a program, and the values of its defines, where the
+    holes are replaced by placeholders.
+    """
+
+    def __init__(self, prog: Program, simplify: bool = False) -> None:
+        """
+        @param prog The program.
+        @param simplify Whether the expressions are simplified (see `Simplifier`).
+        """
+        self.prog = prog
+        self.placeholders = {h.var.name: VarExpr(Variable(f"?{h.var.name}", h.var.type)) for h in prog.holes}
+        self.evaluator = Simplifier(self.placeholders) if simplify else Evaluator(self.placeholders)
+        # The value of each define.
+        self.environment: Dict[str, Expression] = {}
+        for assignment in prog.assignments:
+            self.environment[assignment.var.name] = self.evaluator.evaluate_expr(self.environment, assignment.expr)
+        self.constraint = self.evaluator.evaluate_expr(self.environment, prog.constraint)
+
+    def hole_values(self, hole_completions: Mapping[str, Expression]) -> Dict[str, Expression]:
+        """
+        Returns the value of the placeholder of each hole: its completion,
+        where the defines it uses are replaced by their value. The values can
+        contain the placeholders of other holes, through the defines.
+        """
+        return {name: self.evaluator.evaluate_expr(self.environment, hole_completions[name])
+                for name in self.placeholders}
+
+    def instantiate(self, hole_completions: Mapping[str, Expression]) -> Expression:
+        """
+        Returns the constraint where the placeholders are replaced by their
+        value, which is the program evaluated with the hole completions (see
+        `Evaluator.evaluate`). Its cost depends on the size of the template.
+        """
+        values = self.hole_values(hole_completions)
+        substituted: Dict[Expression, Expression] = {self.placeholders[name]: None for name in values}
+
+        def substitute(ex: Expression) -> Expression:
+            if ex in substituted and substituted[ex] is not None:
+                return substituted[ex]
+            if ex in substituted:
+                # A placeholder, replaced by the value of its hole.
+                result = substitute(values[ex.var.name[1:]])
+            elif isinstance(ex, BinaryExpr):
+                result = BinaryExpr(ex.operator, substitute(ex.left_operand), substitute(ex.right_operand))
+            elif isinstance(ex, UnaryExpr):
+                result = UnaryExpr(ex.operator, substitute(ex.operand))
+            elif isinstance(ex, Ite):
+                result = Ite(substitute(ex.cond), substitute(ex.true_br), substitute(ex.false_br))
+            else:
+                result = ex
+            substituted[ex] = result
+            return result
+        return substitute(self.constraint)
@@ -99,31 +99,46 @@ class ToAst(Transformer):
                     more than once for hole \"{hole_id}\".")
         self.grammar_variables[hole_id][var.name] = var
 
-    def _assign_program_variables(self, node: Node):
-        if node is None:
-            return
-        if isinstance(node, VarExpr):
-            if node.name in self.program_variables.keys():
-                node.var = self.program_variables[node.name]
-            else:
-                raise TransformerVariableException(
-                    f"Expression contains unknown variable \"{node.name}\"")
-        for child in node.children():
-            self._assign_program_variables(child)
-
-    def _assign_grammar_variables(self, hole_id: str, node: Node):
+    def _resolve(self, ex: Expression, lookup) -> Expression:
+        """
+        Returns the expression ex where each variable is replaced by the
+        Variable returned by lookup for its name. Expressions are
+        hash-consed, so they are rebuilt instead of being modified.
+        """
+        if isinstance(ex, VarExpr):
+            return VarExpr(lookup(ex.name))
+        if isinstance(ex, BinaryExpr):
+            return BinaryExpr(ex.operator, self._resolve(ex.left_operand, lookup),
+                              self._resolve(ex.right_operand, lookup))
+        if isinstance(ex, UnaryExpr):
+            return UnaryExpr(ex.operator, self._resolve(ex.operand, lookup))
+        if isinstance(ex, Ite):
+            return Ite(self._resolve(ex.cond, lookup), self._resolve(ex.true_br, lookup),
+                       self._resolve(ex.false_br, lookup))
+        return ex
+
+    def _assign_program_variables(self, node: Expression) -> Expression:
         if node is None:
-            return
-        if isinstance(node, VarExpr):
-            if node.name in self.grammar_variables[hole_id].keys():
-                node.var = self.grammar_variables[hole_id][node.name]
-            elif node.name in self.program_variables.keys():
-                node.var = self.program_variables[node.name]
-            else:
-                raise TransformerVariableException(
-                    f"Grammar contains unknown variable \"{node.name}\"")
-        for child in node.children():
-            self._assign_grammar_variables(hole_id, child)
+            return None
+
+        def lookup(name: str) -> Variable:
+            if name in self.program_variables.keys():
+                return self.program_variables[name]
+            raise TransformerVariableException(
+                f"Expression contains unknown variable \"{name}\"")
+        return self._resolve(node, lookup)
+
+    def _assign_grammar_variables(self, hole_id: str, grammar: Grammar):
+
+        def lookup(name: str) -> Variable:
+            if name in self.grammar_variables[hole_id].keys():
+                return self.grammar_variables[hole_id][name]
+            elif name in self.program_variables.keys():
+                return self.program_variables[name]
+            raise TransformerVariableException(
+                f"Grammar contains unknown variable \"{name}\"")
+        for rule in grammar.rules:
+            rule.productions = [self._resolve(p, lookup) for p in rule.productions]
 
     def program(self, lst):
         inputs, lst = takedrop(lambda x: isinstance(x, Variable), lst)
@@ -161,14 +176,12 @@ class ToAst(Transformer):
     @v_args(inline=True)
     def assignment(self, identifier, paddletype, expr):
         var = Variable(identifier, paddletype)
-        self._assign_program_variables(expr)
+        expr = self._assign_program_variables(expr)
         self._add_program_variable(var)
         return Assignment(var, expr)
 
     def assertion(self, e):
-        for node in e:
-            self._assign_program_variables(node)
-        return self.expression(e)
+        return self.expression([self._assign_program_variables(node) for node in e])
 
     def expression(self, e):
         if len(e) >= 1:
@@ -73,12 +73,18 @@ The documentation for `pycco` is available [here](https://pycco-docs.github.io/p
 """
 
 import sys
-from typing import Mapping
+import time
+from typing import List, Mapping, NamedTuple, Optional
 from lang.paddle import parse
-from lang.ast import Expression
-from lang.symb_eval import Evaluator
+from lang.ast import Expression, Program
+from lang.interpreter import Interpreter, Value
+from lang.compiler import compile_program
+from lang.batch_interpreter import BatchInterpreter, Columns
 from synthesis.synth import Synthesizer
-from verification.verifier import is_valid
+from synthesis.scheduler import Exhausted
+from synthesis.cache import SolutionCache
+from verification.verifier import Budget, RetryQueue, Validity, VerificationSession
+from verification.parallel import ParallelVerifier
 
 
 # You can modifiy this variable. It limits how many times the synthesis loop
@@ -86,11 +92,33 @@ from verification.verifier import is_valid
 # solution to the synthesis problem, or the program is very complex and waiting
 # for the loop to find it would take too long.
 ITERATIONS_LIMIT = 1000
+# Candidates that are rejected on a previous counterexample do not count as
+# iterations since the solver is not called, but the total number of
+# candidates is also limited.
+CANDIDATES_LIMIT = 100 * ITERATIONS_LIMIT
+# A candidate that is true on this number of counterexamples is compiled to
+# Python bytecode to be checked on the others, which costs about as much as
+# interpreting it on this number of counterexamples.
+COMPILE_THRESHOLD = 8
+# With more counterexamples than this, a candidate is checked on all of them
+# at once by the batch interpreter, on their values in arrays, which costs
+# less than compiling it.
+BATCH_THRESHOLD = 32
+# The budget of the solver for each candidate. A candidate that cannot be
+# verified within it is deferred, and verified again with RETRY_BUDGET when
+# the loop ends, so that one hard (e.g. nonlinear) candidate cannot stall the
+# loop. The timeouts are in milliseconds, and 0 means no limit.
+VERIFICATION_BUDGET = Budget(timeout=5000, rlimit=0)
+RETRY_BUDGET = Budget(timeout=60000, rlimit=0)
 
 
 def usage():
     """Print usage information for this file."""
-    print("Usage: python3 main.py METHOD_NUM INPUT_FILE")
+    print("Usage: python3 main.py METHOD_NUM INPUT_FILE [WORKERS]")
+    print("METHOD_NUM is 1, 2, 3 or 5 for the enumerators, or 4 for the solver-based method.")
+    print("With WORKERS > 1, batches of WORKERS candidates are verified in parallel.")
+    print("The solutions are cached in the directory PADDLE_CACHE (default: .paddle_cache).")
+    print("Method 5 uses the costs of the productions in the file PADDLE_COSTS, if it is set.")
 
 
 def print_solution(solution_map: Mapping[str, Expression]) -> None:
@@ -99,6 +127,154 @@ def print_solution(solution_map: Mapping[str, Expression]) -> None:
         print(f"The solution for {hole} is {solution_map[hole]}")
 
 
+def refuted(prog: Program, hole_completions: Mapping[str, Expression],
+            counterexamples: List[Mapping[str, Value]], columns: Optional[Columns] = None) -> bool:
+    """
+    Returns true if the program with the given hole completions is false
+    on one of the counterexamples.
+    @param columns The values of the counterexamples in arrays, which are
+    kept from one call to the next by the synthesis loop.
+    """
+    # Most candidates are false on one of the first counterexamples.
+    interpreter = Interpreter(hole_completions)
+    if any(not interpreter.evaluate(prog, cex) for cex in counterexamples[:COMPILE_THRESHOLD]):
+        return True
+    if len(counterexamples) <= COMPILE_THRESHOLD:
+        return False
+    if len(counterexamples) > BATCH_THRESHOLD:
+        columns = Columns(prog) if columns is None else columns
+        return not BatchInterpreter(hole_completions).evaluate(prog, columns.of(counterexamples)).all()
+    program = compile_program(prog, hole_completions)
+    return any(not program(cex) for cex in counterexamples[COMPILE_THRESHOLD:])
+
+
+def next_completions(synt: Synthesizer, method_num: int) -> Mapping[str, Expression]:
+    """Returns the next hole completions of the synthesizer with the given method."""
+    if method_num == 5:
+        return synt.synth_method_5()
+    elif method_num == 4:
+        return synt.synth_method_4()
+    elif method_num == 3:
+        return synt.synth_method_3()
+    elif method_num == 2:
+        return synt.synth_method_2()
+    return synt.synth_method_1()
+
+
+class SynthesisResult(NamedTuple):
+    """The result of the synthesis loop, with the statistics of the search."""
+    # The hole completions of the solution, or None if no solution was found.
+    solution: Optional[Mapping[str, Expression]]
+    # The number of candidates sent to the verifier.
+    iterations: int
+    # The number of candidates enumerated.
+    candidates: int
+    # The time spent verifying the candidates, in seconds.
+    solver_time: float
+
+
+def synthesize(prog: Program, synt: Synthesizer, method_num: int) -> SynthesisResult:
+    """
+    The synthesis loop: the candidates of the synthesizer are verified until
+    one is valid, the synthesizer has no more candidates, or the limits are
+    reached. The candidates that cannot be verified within the budget are
+    verified again at the end.
+    @param prog The program.
+    @param synt The synthesizer of the program.
+    @param method_num The method of the synthesizer.
+    """
+    iterations = 0
+    candidates = 0
+    solver_time = 0.0
+    # The counterexamples returned by the verifier for the previous candidates,
+    # and the ones found by the synthesizer for the constants of its templates.
+    counterexamples = synt.counterexamples
+    columns = Columns(prog)
+    session = VerificationSession(prog, VERIFICATION_BUDGET)
+    retry_queue = RetryQueue(RETRY_BUDGET)
+    # The solver queries of the synthesizer and its skipped templates count too.
+    while (iterations + synt.constant_queries < ITERATIONS_LIMIT
+           and candidates + synt.skipped_templates < CANDIDATES_LIMIT):
+        candidates += 1
+        # At each call of the methods of the synthesizer a new
+        # hole completion should be returned.
+        try:
+            hole_completions = next_completions(synt, method_num)
+        except Exhausted:
+            # The synthesizer has no more candidates.
+            break
+        # A candidate that fails on a previous counterexample is rejected
+        # without calling the solver.
+        if refuted(prog, hole_completions, counterexamples, columns):
+            continue
+        iterations += 1
+        # Verify the program with these completions, if it is valid it is a
+        # solution! The program is encoded once in the verification session.
+        start = time.perf_counter()
+        validity, counterexample = session.check(hole_completions)
+        solver_time += time.perf_counter() - start
+        if validity == Validity.VALID:
+            return SynthesisResult(hole_completions, iterations, candidates, solver_time)
+        # The solver could not decide within its budget, the candidate is
+        # verified again after the loop.
+        if validity == Validity.UNKNOWN:
+            retry_queue.defer(hole_completions)
+            continue
+        # Otherwise the loop continues, and the counterexample is used to
+        # reject the next candidates.
+        synt.add_counterexample(counterexample)
+    # The deferred candidates are verified with a larger budget.
+    start = time.perf_counter()
+    solution = retry_queue.retry(session)
+    solver_time += time.perf_counter() - start
+    return SynthesisResult(solution, iterations, candidates, solver_time)
+
+
+def parallel_synthesis(prog: Program, synt: Synthesizer, method_num: int,
+                       workers: int) -> Optional[Mapping[str, Expression]]:
+    """
+    The synthesis loop, where batches of `workers` candidates are verified
+    in parallel. Returns the first solution in the order of enumeration, or
+    None if no solution is found within the limits. The candidates that
+    cannot be verified within the budget are verified again at the end.
+    """
+    iterations = 0
+    candidates = 0
+    # The counterexamples are also the ones found by the synthesizer for the constants of its templates.
+    counterexamples = synt.counterexamples
+    columns = Columns(prog)
+    retry_queue = RetryQueue(RETRY_BUDGET)
+    with ParallelVerifier(prog, workers, VERIFICATION_BUDGET) as verifier:
+        while (iterations + synt.constant_queries < ITERATIONS_LIMIT
+               and candidates + synt.skipped_templates < CANDIDATES_LIMIT):
+            batch = []
+            exhausted = False
+            while len(batch) < workers and candidates < CANDIDATES_LIMIT:
+                candidates += 1
+                try:
+                    hole_completions = next_completions(synt, method_num)
+                except Exhausted:
+                    exhausted = True
+                    break
+                if not refuted(prog, hole_completions, counterexamples, columns):
+                    batch.append(hole_completions)
+            iterations += len(batch)
+            # The results are in the order of the batch, the first solution is
+            # the first one that was enumerated.
+            for hole_completions, counterexample in zip(batch, verifier.verify(batch)):
+                if counterexample is None:
+                    return hole_completions
+                if len(counterexample) > 0:
+                    synt.add_counterexample(counterexample)
+                else:
+                    # The solver could not decide within its budget.
+                    retry_queue.defer(hole_completions)
+            if exhausted:
+                break
+    # The deferred candidates are verified with a larger budget.
+    return retry_queue.retry(VerificationSession(prog))
+
+
 if __name__ == '__main__':
     if len(sys.argv) <= 2:
         print("Please provide a method number and an input file!")
@@ -116,25 +292,21 @@ if __name__ == '__main__':
     filename = sys.argv[2]
     # Parse the input file into an AST
     ast = parse(filename)
+    # A solution found by a previous run is only verified again
+    cache = SolutionCache()
+    cached_solution = cache.lookup(ast, VERIFICATION_BUDGET)
+    if cached_solution is not None:
+        print_solution(cached_solution)
+        sys.exit(0)
     # Initialize a Synthesizer with it
     synt = Synthesizer(ast)
-    # Iterate until a solution is found or iteration limit is reached
-    iterations = 0
-    while iterations < ITERATIONS_LIMIT:
-        iterations += 1
-        # At each call of the methods of the synthesizer a new
-        # hole completion should be returned.
-        if method_num == 3:
-            hole_completions = synt.synth_method_3()
-        elif method_num == 2:
-            hole_completions = synt.synth_method_2()
-        else:
-            hole_completions = synt.synth_method_1()
-        # Evaluate the program with these completions
-        evaluator = Evaluator(hole_completions)
-        final_constraint_expr = evaluator.evaluate(ast)
-        # Verify the program, if it is valid it is a solution!
-        if is_valid(final_constraint_expr):
-            print_solution(hole_completions)
-            sys.exit(0)
-        # Otherwise the loop continues.
+    # Verify candidates in parallel if a number of workers is given
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    if workers > 1:
+        solution = parallel_synthesis(ast, synt, method_num, workers)
+    else:
+        # Iterate until a solution is found or iteration limit is reached
+        solution = synthesize(ast, synt, method_num).solution
+    if solution is not None:
+        cache.store(ast, solution, method_num)
+        print_solution(solution)
@@ -0,0 +1,343 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains a bottom-up enumerator for the grammar of a hole.
+Expressions are built by increasing size from the expressions found
+so far, and an expression is only kept if it computes something new on
+a set of example inputs (observational equivalence).
+"""
+from random import Random
+from typing import Callable, Dict, Iterator, List, Mapping, Set, Tuple, Union
+from lang.ast import *
+from lang.interpreter import Interpreter, Value, binary_funcs, unary_funcs
+from synthesis.grammar_analysis import GrammarAnalysis
+
+# The constants that an `Integer` in a grammar can be completed with.
+INTEGER_CONSTANTS = range(-10, 10)
+
+# A slot of a production is either a non-terminal or one of the grammar
+# constants `Var` and `Integer`. The slots of Var are typed, e.g. "Var:int".
+Slot = Union[Variable, str]
+VAR_SLOT = "Var"
+INTEGER_SLOT = "Integer"
+
+
+def var_slot(var_type: PaddleType) -> str:
+    return f"{VAR_SLOT}:{var_type}"
+
+
+def random_value(var: Variable, rng: Random) -> Value:
+    """Returns a random value of the type of the variable."""
+    if var.type == PaddleType.BOOL:
+        return rng.random() < 0.5
+    return rng.randint(-10, 10)
+
+
+def sample_examples(prog: Program, available_vars: Set[Variable],
+                    count: int = 16, seed: int = 410) -> List[Dict[str, Value]]:
+    """
+    Returns `count` example environments for a hole that can use the
+    variables `available_vars`. The inputs of the program are sampled
+    randomly, and the variables defined before the hole is used are
+    computed from the inputs.
+    """
+    rng = Random(seed)
+    interpreter = Interpreter({})
+    examples = []
+    for _ in range(count):
+        env = {var.name: random_value(var, rng) for var in prog.inputs}
+        extend_example(prog, available_vars, interpreter, env, rng)
+        examples.append(env)
+    return examples
+
+
+def extend_example(prog: Program, available_vars: Set[Variable],
+                   interpreter: Interpreter, env: Dict[str, Value], rng: Random) -> Dict[str, Value]:
+    """
+    Adds to `env`, which maps the inputs of the program to values, the values of
+    the defined variables in `available_vars`. The variables that are defined
+    with another hole cannot be computed, they get a random value.
+    """
+    holes = prog.hole_vars()
+    for asgn in prog.assignments:
+        if asgn.var not in available_vars:
+            break
+        if holes.isdisjoint(asgn.expr.uses()):
+            env[asgn.var.name] = interpreter.evaluate_expr(env, asgn.expr)
+        else:
+            env[asgn.var.name] = random_value(asgn.var, rng)
+    return env
+
+
+class BottomUpEnumerator():
+    """
+    A BottomUpEnumerator generates the expressions of a hole's grammar by
+    increasing size. It keeps, for each non-terminal of the grammar, a bank
+    of the expressions found so far indexed by their size. A new expression
+    is discarded when its values on the examples are the same as the values
+    of an expression already in the bank of the non-terminal.
+    """
+
+    def __init__(self, hole: HoleDeclaration, available_vars: Set[Variable],
+                 examples: List[Mapping[str, Value]]) -> None:
+        """
+        @param hole The hole declaration whose grammar is enumerated.
+        @param available_vars The variables that can complete a `Var`.
+        @param examples The example environments used to compare expressions.
+        """
+        self.start = hole.grammar.rules[0].symbol
+        # The non-terminals that derive nothing, or that are not used by the start symbol, have no bank.
+        analysis = GrammarAnalysis(hole.grammar, available_vars)
+        self.nonterminals = [r.symbol for r in hole.grammar.rules if r.symbol == self.start or
+                             (r.symbol.name in analysis.productive and r.symbol.name in analysis.reachable)]
+        self.examples = list(examples)
+        self.interpreter = Interpreter({})
+        # Tells from its values on the examples that an expression of the start symbol is not a solution:
+        # such an expression is kept in the banks, but it is not generated.
+        self.rejects: Callable[[tuple], bool] = lambda values: False
+        self.leaf_exprs = {INTEGER_SLOT: [IntConst(i) for i in INTEGER_CONSTANTS]}
+        for var_type in PaddleType:
+            self.leaf_exprs[var_slot(var_type)] = [VarExpr(v) for v in sorted(available_vars, key=lambda v: v.name)
+                                                   if v.type == var_type]
+        # The minimum size of the expressions that can fill each slot.
+        self.min_sizes: Dict[Slot, int] = {nt: int(analysis.min_sizes[nt.name]) for nt in self.nonterminals
+                                           if nt.name in analysis.productive}
+        # For each non-terminal, a list of (template, slots, base size, values, min size)
+        # where base size is the number of nodes of the template that are not slots,
+        # values computes the values of the template from the values of its slots, and
+        # min size is the size of the smallest expression derived from the template.
+        # The productions that are ill-typed or that derive nothing are left out.
+        self.productions: Dict[Variable, List[Tuple[Expression, List[Slot], int, Callable, int]]] = {
+            nt: [] for nt in self.nonterminals}
+        for rule in hole.grammar.rules:
+            if rule.symbol not in self.productions:
+                continue
+            for production in analysis.productions[rule.symbol.name]:
+                var_types = iter(analysis.var_types[production])
+                slots = [var_slot(next(var_types)) if s == VAR_SLOT else s for s in self.slots_of(production)]
+                base = self.count_nodes(production) - len(slots)
+                values = self.template_function(production, iter(range(len(slots))))
+                min_size = int(analysis.production_size(production))
+                self.productions[rule.symbol].append((production, slots, base, values, min_size))
+        self.reset()
+
+    def reset(self) -> None:
+        """Empty the banks, the enumeration restarts from the smallest size."""
+        self.bank: Dict[Variable, Dict[int, List[Tuple[Expression, tuple]]]] = {nt: {} for nt in self.nonterminals}
+        self.signatures: Dict[Variable, Set[tuple]] = {nt: set() for nt in self.nonterminals}
+        self.leaves = {slot: [(ex, self.values_of(ex)) for ex in exprs] for slot, exprs in self.leaf_exprs.items()}
+        self.size = 0
+        # The examples added during the enumeration of a size, which are used from the next size on.
+        self.pending: List[Mapping[str, Value]] = []
+
+    def add_example(self, example: Mapping[str, Value]) -> None:
+        """
+        Adds an example environment. It is used from the next size on: the
+        expressions in the banks are then evaluated on it, and the enumeration
+        continues with the finer equivalence, so the work done so far is not
+        done again. The expressions discarded before as equivalent to one in
+        a bank are not generated, even if they differ on the new example.
+        """
+        self.pending.append(example)
+
+    def apply_examples(self) -> None:
+        """Evaluates the expressions in the banks on the examples that were added."""
+        for example in self.pending:
+            self.examples.append(example)
+            # The subexpressions are mostly in the banks, their value is computed once.
+            memo: Dict[Expression, Value] = {}
+            for nonterminal in self.nonterminals:
+                self.signatures[nonterminal] = set()
+                for size, entries in self.bank[nonterminal].items():
+                    entries[:] = [(ex, values + (self.value_on(example, ex, memo),)) for ex, values in entries]
+                    self.signatures[nonterminal].update(self.signature(values) for _, values in entries)
+            self.leaves = {slot: [(ex, values + (self.value_on(example, ex, memo),)) for ex, values in entries]
+                           for slot, entries in self.leaves.items()}
+        self.pending = []
+
+    def value_on(self, env: Mapping[str, Value], ex: Expression, memo: Dict[Expression, Value]) -> Value:
+        """The value of ex on one example, where the values of the subexpressions are memoized."""
+        if ex not in memo:
+            if isinstance(ex, BinaryExpr):
+                memo[ex] = binary_funcs[ex.operator](self.value_on(env, ex.left_operand, memo),
+                                                     self.value_on(env, ex.right_operand, memo))
+            elif isinstance(ex, UnaryExpr):
+                memo[ex] = unary_funcs[ex.operator](self.value_on(env, ex.operand, memo))
+            elif isinstance(ex, Ite):
+                cond = self.value_on(env, ex.cond, memo)
+                memo[ex] = self.value_on(env, ex.true_br if cond else ex.false_br, memo)
+            else:
+                memo[ex] = self.interpreter.evaluate_expr(env, ex)
+        return memo[ex]
+
+    def is_nonterminal(self, ex: Expression) -> bool:
+        return isinstance(ex, VarExpr) and ex.var in self.productions
+
+    def slots_of(self, ex: Expression) -> List[Slot]:
+        """Returns the slots of a production template, from left to right."""
+        if isinstance(ex, GrammarVar):
+            return [VAR_SLOT]
+        if isinstance(ex, GrammarInteger):
+            return [INTEGER_SLOT]
+        if self.is_nonterminal(ex):
+            return [ex.var]
+        if isinstance(ex, (BinaryExpr, UnaryExpr, Ite)):
+            return [s for child in ex.children() for s in self.slots_of(child)]
+        return []
+
+    def count_nodes(self, ex: Expression) -> int:
+        """Returns the number of nodes of an expression."""
+        if isinstance(ex, (BinaryExpr, UnaryExpr, Ite)):
+            return 1 + sum(self.count_nodes(child) for child in ex.children())
+        return 1
+
+    def instantiate(self, ex: Expression, args: Iterator[Expression]) -> Expression:
+        """Replaces the slots of the template ex by the expressions in args."""
+        if isinstance(ex, (GrammarVar, GrammarInteger)) or self.is_nonterminal(ex):
+            return next(args)
+        if isinstance(ex, BinaryExpr):
+            lhs = self.instantiate(ex.left_operand, args)
+            rhs = self.instantiate(ex.right_operand, args)
+            return BinaryExpr(ex.operator, lhs, rhs)
+        if isinstance(ex, UnaryExpr):
+            return UnaryExpr(ex.operator, self.instantiate(ex.operand, args))
+        if isinstance(ex, Ite):
+            cond = self.instantiate(ex.cond, args)
+            true_br = self.instantiate(ex.true_br, args)
+            false_br = self.instantiate(ex.false_br, args)
+            return Ite(cond, true_br, false_br)
+        return ex
+
+    def values_of(self, ex: Expression) -> tuple:
+        """The values of ex on the examples."""
+        return tuple(self.interpreter.evaluate_expr(env, ex) for env in self.examples)
+
+    def template_function(self, ex: Expression, positions: Iterator[int]) -> Callable[[List[tuple]], tuple]:
+        """
+        Returns the function that computes the values on the examples of the
+        template ex, where the slots are replaced by expressions whose values
+        are given in its argument, in the order of the slots. It is built once
+        per production, so that the template is not walked for each expression.
+        """
+        if isinstance(ex, (GrammarVar, GrammarInteger)) or self.is_nonterminal(ex):
+            position = next(positions)
+            return lambda args: args[position]
+        if isinstance(ex, BinaryExpr):
+            lhs = self.template_function(ex.left_operand, positions)
+            rhs = self.template_function(ex.right_operand, positions)
+            binary = binary_funcs[ex.operator]
+            return lambda args: tuple(map(binary, lhs(args), rhs(args)))
+        if isinstance(ex, UnaryExpr):
+            operand = self.template_function(ex.operand, positions)
+            unary = unary_funcs[ex.operator]
+            return lambda args: tuple(map(unary, operand(args)))
+        if isinstance(ex, Ite):
+            cond = self.template_function(ex.cond, positions)
+            true_br = self.template_function(ex.true_br, positions)
+            false_br = self.template_function(ex.false_br, positions)
+            return lambda args: tuple(t if c else f for c, t, f in zip(cond(args), true_br(args), false_br(args)))
+        # The values of the constants and variables depend on the examples, which can be added.
+        return lambda args: self.values_of(ex)
+
+    def signature(self, values: tuple) -> tuple:
+        """
+        The signature of an expression from its values on the examples. The
+        expressions of a non-terminal all have its type, so their values are
+        enough to tell them apart (even if True == 1 in Python).
+        """
+        return values
+
+    def candidates(self, slot: Slot, size: int) -> List[Tuple[Expression, tuple]]:
+        """The expressions of the given size that can fill a slot, with their values."""
+        if isinstance(slot, str):
+            return self.leaves[slot] if size == 1 else []
+        return self.bank[slot].get(size, [])
+
+    def fill(self, slots: List[Slot], total: int) -> Iterator[List[Tuple[Expression, tuple]]]:
+        """Generates all the ways of filling the slots with expressions whose sizes sum up to total."""
+        if len(slots) == 0:
+            if total == 0:
+                yield []
+            return
+        if len(slots) == 1:
+            for entry in self.candidates(slots[0], total):
+                yield [entry]
+            return
+        # Each remaining slot needs an expression of at least its minimum size.
+        rest = sum(self.min_sizes.get(slot, 1) for slot in slots[1:])
+        for size in range(self.min_sizes.get(slots[0], 1), total - rest + 1):
+            for entry in self.candidates(slots[0], size):
+                for rest in self.fill(slots[1:], total - size):
+                    yield [entry] + rest
+
+    def add(self, nonterminal: Variable, ex: Expression, values: tuple, size: int) -> bool:
+        """Adds ex to the bank if it is not equivalent to an expression already in it."""
+        signature = self.signature(values)
+        if signature in self.signatures[nonterminal]:
+            return False
+        self.signatures[nonterminal].add(signature)
+        self.bank[nonterminal].setdefault(size, []).append((ex, values))
+        return True
+
+    def grow(self) -> Iterator[Expression]:
+        """
+        Fills the banks with the expressions of the next size, and yields the
+        new expressions of the start symbol.
+        """
+        self.apply_examples()
+        self.size += 1
+        size = self.size
+        # Productions made of a single non-terminal use expressions of the same
+        # size, they are applied once all the other productions have been.
+        unit_productions = []
+        for nonterminal in self.nonterminals:
+            signatures = self.signatures[nonterminal]
+            for template, slots, base, template_values, min_size in self.productions[nonterminal]:
+                if base == 0 and len(slots) == 1 and not isinstance(slots[0], str):
+                    unit_productions.append((nonterminal, slots[0]))
+                    continue
+                # The production cannot derive an expression of this size.
+                if size < min_size or (len(slots) == 0 and size != base):
+                    continue
+                for args in self.fill(slots, size - base):
+                    # The values are computed from the values of the arguments, and the
+                    # expression is only built if it is new.
+                    values = template_values([v for _, v in args])
+                    if self.signature(values) in signatures:
+                        continue
+                    ex = self.instantiate(template, iter([e for e, _ in args]))
+                    self.add(nonterminal, ex, values, size)
+                    if nonterminal is self.start and not self.rejects(values):
+                        yield ex
+        changed = True
+        while changed:
+            changed = False
+            for nonterminal, child in unit_productions:
+                for ex, values in list(self.bank[child].get(size, [])):
+                    if self.add(nonterminal, ex, values, size):
+                        changed = True
+                        if nonterminal is self.start and not self.rejects(values):
+                            yield ex
+
+    def exhausted(self) -> bool:
+        """
+        The enumeration is over when no expression can be built anymore: any
+        new expression would be built from expressions that are in the bank.
+        """
+        sizes = [s for nt in self.nonterminals for s in self.bank[nt]]
+        largest = max(sizes, default=1)
+        max_slots = max((len(p[1]) for nt in self.nonterminals for p in self.productions[nt]), default=0)
+        max_base = max((p[2] for nt in self.nonterminals for p in self.productions[nt]), default=0)
+        return self.size > max_slots * largest + max_base
+
+    def enumerate(self) -> Iterator[Expression]:
+        """
+        Generates the expressions of the start symbol of the grammar by
+        increasing size. The generator stops when no new expression can be
+        built on the examples, and it can be started again once an example
+        is added: it continues from the current size.
+        """
+        # The examples added since the last size can make new expressions.
+        while not self.exhausted() or len(self.pending) > 0:
+            yield from self.grow()
@@ -0,0 +1,150 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the SolutionCache class, a cache on disk of the solutions
+of the programs that have already been solved.
+
+The cache is a directory with one JSON file per program, named by a hash
+of the program. The parsed program is hashed, as a nested list of the
+classes and the constructor arguments of its nodes, so that the formatting
+and the comments of the file do not change the hash but the structure of
+the expressions does (printed expressions are ambiguous, e.g. nested
+conditionals). Each file contains the completions of the holes, serialized
+in the same way, and the method that found them. The method is only stored
+for information: any solution of the program is returned, whatever method
+is used by the run that looks it up. A cached solution is verified again
+before it is returned, so a repeated run costs one call to the solver
+instead of a search, and a stale entry is simply ignored.
+
+The directory is `.paddle_cache` by default, or the one given by the
+`PADDLE_CACHE` environment variable (the cache is disabled if it is empty).
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+from lang.ast import *
+from lang.symb_eval import Evaluator
+from verification.verifier import Budget, UNBOUNDED, is_valid
+
+CACHE_DIR = os.environ.get("PADDLE_CACHE", ".paddle_cache")
+
+
+# The classes that can be deserialized, by name.
+COMPLETION_CLASSES = {cls.__name__: cls for cls in [Ite, BinaryExpr, UnaryExpr, VarExpr, IntConst, BoolConst]}
+ENUMS = {cls.__name__: cls for cls in [BinaryOperator, UnaryOperator, PaddleType]}
+
+
+def serialize(node: Any) -> Any:
+    """
+    Returns the node as a nested list of JSON values: the name of its class
+    followed by its constructor arguments for an expression (see `key`), or
+    by its children for the other nodes.
+    """
+    if node is None or isinstance(node, (bool, int, str)):
+        return node
+    if isinstance(node, Enum):
+        return [type(node).__name__, node.name]
+    if isinstance(node, Variable):
+        return ["Variable", node.name, serialize(node.type)]
+    args = node.key() if isinstance(node, Expression) else node.children()
+    return [type(node).__name__] + [serialize(arg) for arg in args or ()]
+
+
+def deserialize(data: Any, variables: Mapping[str, Variable]) -> Any:
+    """
+    Returns the completion serialized by `serialize`. Raises a ValueError
+    if the data is not a serialized completion that only uses the variables.
+    @param variables The variables that the completion can use, by name.
+    """
+    if data is None or isinstance(data, (bool, int, str)):
+        return data
+    if not isinstance(data, list) or not data:
+        raise ValueError(f"{data} is not a serialized completion.")
+    name, args = data[0], data[1:]
+    if name in ENUMS and len(args) == 1:
+        return ENUMS[name][args[0]]
+    if name == "Variable" and len(args) == 2:
+        var = variables.get(args[0])
+        if var is None or var.type != deserialize(args[1], variables):
+            raise ValueError(f"The completion cannot use the variable {args[0]}.")
+        return var
+    if name in COMPLETION_CLASSES:
+        return COMPLETION_CLASSES[name](*[deserialize(arg, variables) for arg in args])
+    raise ValueError(f"{name} cannot appear in a completion.")
+
+
+def program_hash(prog: Program) -> str:
+    """Returns the hash of the program, which does not depend on how the program is written in its file."""
+    return hashlib.sha256(json.dumps(serialize(prog)).encode()).hexdigest()
+
+
+def is_solution(prog: Program, hole_completions: Mapping[str, Expression], budget: Budget = UNBOUNDED) -> bool:
+    """Returns true if the program with the given hole completions is valid within the budget."""
+    try:
+        return is_valid(Evaluator(hole_completions).evaluate(prog), budget)
+    except Exception:
+        return False
+
+
+class SolutionCache():
+    """
+    A SolutionCache maps programs to the completions of their holes that
+    were found by a previous run.
+    """
+
+    def __init__(self, directory: Optional[str] = CACHE_DIR) -> None:
+        """
+        @param directory The directory of the cache, no solution is cached if
+        it is None or empty.
+        """
+        self.directory = Path(directory) if directory else None
+
+    def path(self, prog: Program) -> Path:
+        return self.directory / f"{program_hash(prog)}.json"
+
+    def lookup(self, prog: Program, budget: Budget = UNBOUNDED) -> Optional[Dict[str, Expression]]:
+        """
+        Returns the cached completions of the holes of the program, or None
+        if there are none or they are not a solution of the program anymore.
+        The solution is returned whatever the method that found it.
+        @param budget The budget of the solver to verify the cached solution.
+        """
+        if self.directory is None or not self.path(prog).exists():
+            return None
+        try:
+            with open(self.path(prog)) as entry_file:
+                entry = json.load(entry_file)
+            hole_completions = {}
+            for h in prog.holes:
+                variables = {v.name: v for v in prog.hole_can_use(h.var.name)}
+                completion = deserialize(entry["holes"][h.var.name], variables)
+                if not isinstance(completion, Expression):
+                    raise ValueError(f"{completion} is not an expression.")
+                hole_completions[h.var.name] = completion
+        except Exception:
+            # The entry is corrupted, or was written for another version of the program.
+            return None
+        return hole_completions if is_solution(prog, hole_completions, budget) else None
+
+    def store(self, prog: Program, hole_completions: Mapping[str, Expression], method_num: int) -> None:
+        """
+        Adds the solution of the program to the cache.
+        @param method_num The method that found the solution, which is only
+        stored for information.
+        """
+        if self.directory is None:
+            return
+        entry = {
+            "holes": {hole: serialize(completion) for hole, completion in hole_completions.items()},
+            "method": method_num,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # The entry is written in a temporary file and then renamed, so that
+        # a concurrent run never reads a partial entry.
+        temporary = self.path(prog).with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary, "w") as entry_file:
+            json.dump(entry, entry_file, indent=1, sort_keys=True)
+        os.replace(temporary, self.path(prog))
@@ -0,0 +1,178 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines a canonical form of expressions, which is used to prune
+candidates that are trivially equivalent to a previous candidate (e.g.
+`x + y` and `y + x`, `x + 0` and `x`, or `! ! b` and `b`).
+
+The rewrite rules are valid with the semantics of z3, where the result of
+a division by zero is unspecified but is the same for the same operands.
+Expressions can also be templates that contain `Integer`: each `Integer` is
+a different unknown constant, so two equal operands that contain one are
+not considered equal.
+"""
+from typing import Callable, Iterator, List, Set
+from lang.ast import *
+from lang.interpreter import binary_funcs, unary_funcs
+from synthesis.constants import has_integer_hole
+
+# The operators whose operands can be swapped.
+COMMUTATIVE = {BinaryOperator.PLUS, BinaryOperator.TIMES, BinaryOperator.EQUALS,
+               BinaryOperator.NOTEQUALS, BinaryOperator.AND, BinaryOperator.OR}
+# The operators that are replaced by another operator with swapped operands.
+FLIPPED = {BinaryOperator.GREATER: BinaryOperator.LESSTHAN,
+           BinaryOperator.GREATER_EQ: BinaryOperator.LESSTHAN_EQ}
+# The comparisons that are the negation of another comparison, with the
+# operands swapped or not.
+NEGATED = {BinaryOperator.LESSTHAN: (BinaryOperator.LESSTHAN_EQ, True),
+           BinaryOperator.LESSTHAN_EQ: (BinaryOperator.LESSTHAN, True),
+           BinaryOperator.EQUALS: (BinaryOperator.NOTEQUALS, False),
+           BinaryOperator.NOTEQUALS: (BinaryOperator.EQUALS, False)}
+# The result of `x op x` for the operators where it does not depend on x.
+SAME_OPERANDS = {BinaryOperator.MINUS: IntConst(0),
+                 BinaryOperator.EQUALS: BoolConst(True),
+                 BinaryOperator.NOTEQUALS: BoolConst(False),
+                 BinaryOperator.LESSTHAN: BoolConst(False),
+                 BinaryOperator.LESSTHAN_EQ: BoolConst(True)}
+
+# Placeholders for the children of an expression that are not derived yet.
+PLACEHOLDER_VARS = [Variable(f"?{i}", PaddleType.INT) for i in range(3)]
+PLACEHOLDERS = [VarExpr(v) for v in PLACEHOLDER_VARS]
+
+
+def is_const(ex: Expression) -> bool:
+    return isinstance(ex, (IntConst, BoolConst))
+
+
+def const(value) -> Expression:
+    if isinstance(value, bool):
+        return BoolConst(value)
+    return IntConst(value)
+
+
+def canonical_binary(operator: BinaryOperator, left: Expression, right: Expression) -> Expression:
+    """Returns the canonical form of a binary expression whose operands are canonical."""
+    if operator in FLIPPED:
+        operator, left, right = FLIPPED[operator], right, left
+    if operator in COMMUTATIVE and str(right) < str(left):
+        left, right = right, left
+    # Constants are folded, except for the division by zero which is unspecified.
+    if is_const(left) and is_const(right):
+        if not (operator in (BinaryOperator.DIV, BinaryOperator.MODULO) and right.value == 0):
+            return const(binary_funcs[operator](left.value, right.value))
+    if left is right and not has_integer_hole(left):
+        if operator in SAME_OPERANDS:
+            return SAME_OPERANDS[operator]
+        if operator in (BinaryOperator.AND, BinaryOperator.OR):
+            return left
+    # Identities and annihilators.
+    if operator in (BinaryOperator.PLUS, BinaryOperator.MINUS) and right == IntConst(0):
+        return left
+    if operator == BinaryOperator.PLUS and left == IntConst(0):
+        return right
+    if operator in (BinaryOperator.TIMES, BinaryOperator.DIV) and right == IntConst(1):
+        return left
+    if operator == BinaryOperator.TIMES and left == IntConst(1):
+        return right
+    if operator == BinaryOperator.TIMES and IntConst(0) in (left, right):
+        return IntConst(0)
+    if operator == BinaryOperator.MODULO and right in (IntConst(1), IntConst(-1)):
+        return IntConst(0)
+    if operator in (BinaryOperator.AND, BinaryOperator.OR):
+        for constant, other in [(left, right), (right, left)]:
+            if isinstance(constant, BoolConst):
+                # True is neutral for && and absorbing for ||, and the opposite for False.
+                return other if constant.value == (operator == BinaryOperator.AND) else constant
+    return BinaryExpr(operator, left, right)
+
+
+def negation(cond: BinaryExpr) -> Expression:
+    """Returns the canonical form of the negation of a canonical comparison."""
+    operator, swap = NEGATED[cond.operator]
+    if swap:
+        return canonical_binary(operator, cond.right_operand, cond.left_operand)
+    return canonical_binary(operator, cond.left_operand, cond.right_operand)
+
+
+def canonical_unary(operator: UnaryOperator, operand: Expression) -> Expression:
+    """Returns the canonical form of a unary expression whose operand is canonical."""
+    if is_const(operand):
+        return const(unary_funcs[operator](operand.value))
+    # ! (a < b) = b <= a
+    if operator == UnaryOperator.NOT and isinstance(operand, BinaryExpr) and operand.operator in NEGATED:
+        return negation(operand)
+    # ! ! b = b and - - x = x
+    if isinstance(operand, UnaryExpr) and operand.operator == operator and operator != UnaryOperator.ABS:
+        return operand.operand
+    # abs (abs x) = abs (- x) = abs x
+    if operator == UnaryOperator.ABS and isinstance(operand, UnaryExpr) and operand.operator != UnaryOperator.NOT:
+        return canonical_unary(operator, operand.operand)
+    return UnaryExpr(operator, operand)
+
+
+def canonical_ite(cond: Expression, true_br: Expression, false_br: Expression) -> Expression:
+    """Returns the canonical form of an if-then-else whose children are canonical."""
+    if isinstance(cond, BoolConst):
+        return true_br if cond.value else false_br
+    if true_br is false_br and not has_integer_hole(true_br):
+        return true_br
+    # ! c ? a : b = c ? b : a, and the conditions a <= b and a != b are
+    # replaced by their negations b < a and a = b.
+    if isinstance(cond, UnaryExpr) and cond.operator == UnaryOperator.NOT:
+        cond, true_br, false_br = cond.operand, false_br, true_br
+    elif isinstance(cond, BinaryExpr) and cond.operator in (BinaryOperator.LESSTHAN_EQ, BinaryOperator.NOTEQUALS):
+        cond, true_br, false_br = negation(cond), false_br, true_br
+    if true_br == BoolConst(True) and false_br == BoolConst(False):
+        return cond
+    if true_br == BoolConst(False) and false_br == BoolConst(True):
+        return canonical_unary(UnaryOperator.NOT, cond)
+    return Ite(cond, true_br, false_br)
+
+
+def canonicalize(ex: Expression) -> Expression:
+    """
+    Returns the canonical form of the expression, an expression that is
+    equivalent to ex. Two expressions that differ only by the order of the
+    operands of a commutative operator, by neutral elements, by double
+    negations or by the order of the branches of an if-then-else have the
+    same canonical form.
+    """
+    # The canonical form is computed once for each expression, since equal
+    # expressions are the same object.
+    canonical = getattr(ex, "canonical_form", None)
+    if canonical is not None:
+        return canonical
+    if isinstance(ex, BinaryExpr):
+        canonical = canonical_binary(ex.operator, canonicalize(ex.left_operand), canonicalize(ex.right_operand))
+    elif isinstance(ex, UnaryExpr):
+        canonical = canonical_unary(ex.operator, canonicalize(ex.operand))
+    elif isinstance(ex, Ite):
+        canonical = canonical_ite(canonicalize(ex.cond), canonicalize(ex.true_br), canonicalize(ex.false_br))
+    else:
+        canonical = ex
+    ex.canonical_form = canonical
+    return canonical
+
+
+def canonical_stream(stream: Iterator[Expression]) -> Iterator[Expression]:
+    """
+    Generates the expressions of the stream whose canonical form is different
+    from the canonical forms of the previous expressions. The expressions are
+    returned as they are, so they are still derivations of the grammar.
+    """
+    seen: Set[Expression] = set()
+    for ex in stream:
+        canonical = canonicalize(ex)
+        if canonical not in seen:
+            seen.add(canonical)
+            yield ex
+
+
+def ignores_next(rebuild: Callable[..., Expression], prefix: List[Expression], remaining: int) -> bool:
+    """
+    Returns true if the canonical form of the expression `rebuild(*prefix, *others)`, where others are the
+    `remaining` children, does not depend on the first of the others. For example, `0 * e` does not depend on e.
+    """
+    canonical = canonicalize(rebuild(*prefix, *PLACEHOLDERS[:remaining]))
+    return PLACEHOLDER_VARS[0] not in canonical.uses()
@@ -0,0 +1,138 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the functions that find the integer constants of a
+candidate. Instead of trying all the values of `Integer` in a grammar, the
+enumerators generate templates where `Integer` is left as it is, and the
+values of the constants are found by z3.
+
+Each `Integer` of a template is a different unknown constant. The constants
+are found by a small counterexample-guided loop: z3 finds constants that
+make the program true on some inputs, and the verifier checks the program
+with these constants on all the inputs.
+
+The loop is bounded, so the constants of a template may not be found even
+if they exist: such a template is unresolved, and it is up to the caller to
+try it again (the synthesizer does it with more rounds once its enumeration
+is exhausted, and drops it after that).
+"""
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional
+from z3 import *
+from lang.ast import *
+from lang.interpreter import Value
+from verification.verifier import z3_expr, set_budget, DEFAULT_BUDGET, Validity, VerificationSession
+
+# The maximum number of candidate constants tried for a template.
+CONSTANT_ROUNDS = 8
+# The maximum number when the templates whose constants were not found are
+# tried again, once the enumeration is exhausted.
+RETRY_CONSTANT_ROUNDS = 32
+
+
+def has_integer_hole(ex: Expression) -> bool:
+    """Returns true if the expression contains an `Integer` that has no value yet."""
+    if isinstance(ex, GrammarInteger):
+        return True
+    return any(has_integer_hole(child) for child in ex.children() if isinstance(child, Expression))
+
+
+def replace_integers(ex: Expression, replacements: Iterator[Expression]) -> Expression:
+    """Returns the expression where each `Integer`, from left to right, is replaced by the next replacement."""
+    if isinstance(ex, GrammarInteger):
+        return next(replacements)
+    if isinstance(ex, BinaryExpr):
+        left = replace_integers(ex.left_operand, replacements)
+        return BinaryExpr(ex.operator, left, replace_integers(ex.right_operand, replacements))
+    if isinstance(ex, UnaryExpr):
+        return UnaryExpr(ex.operator, replace_integers(ex.operand, replacements))
+    if isinstance(ex, Ite):
+        cond = replace_integers(ex.cond, replacements)
+        true_br = replace_integers(ex.true_br, replacements)
+        return Ite(cond, true_br, replace_integers(ex.false_br, replacements))
+    return ex
+
+
+def unknown_constants(unknowns: List[Variable]) -> Iterator[Expression]:
+    """
+    Generates variables for the unknown constants, with names that cannot
+    appear in a Paddle program, and adds them to `unknowns`.
+    """
+    while True:
+        var = Variable(f"?Integer{len(unknowns)}", PaddleType.INT)
+        unknowns.append(var)
+        yield VarExpr(var)
+
+
+def on_example(formula: ExprRef, prog: Program, example: Mapping[str, Value]) -> ExprRef:
+    """Returns the formula where the inputs of the program are replaced by their values in the example."""
+    substitution = []
+    for var in prog.inputs:
+        if var.type == PaddleType.BOOL:
+            substitution.append((Bool(var.name), BoolVal(example[var.name])))
+        else:
+            substitution.append((Int(var.name), IntVal(example[var.name])))
+    return substitute(formula, *substitution)
+
+
+class Constants(NamedTuple):
+    """The result of the search of the constants of some templates."""
+    # The valid hole completions, or None if no constants were found.
+    completions: Optional[Dict[str, Expression]]
+    # True if the search stopped before the constants were found or shown
+    # not to exist (too many rounds, or a query the solver could not decide).
+    unresolved: bool
+    # The counterexamples found by the verifier for the constants that were tried.
+    counterexamples: List[Dict[str, Value]]
+    # The number of solver queries.
+    queries: int
+
+
+def solve_constants(prog: Program, templates: Mapping[str, Expression], examples: List[Mapping[str, Value]],
+                    session: Optional[VerificationSession] = None, rounds: int = CONSTANT_ROUNDS) -> Constants:
+    """
+    Searches the hole completions obtained by replacing the `Integer` in the
+    templates by constants such that the program is valid.
+    @param prog The program.
+    @param templates A map from the holes of the program to templates.
+    @param examples Inputs on which the program must be true, e.g. the
+    previous counterexamples. They are used for the first guess.
+    @param session The verification session of the program, which also
+    evaluates it once for all the templates (see `ProgramTemplate`). The
+    completions it verifies are cached, so they are not verified again.
+    @param rounds The maximum number of constants tried.
+    """
+    session = VerificationSession(prog) if session is None else session
+    unknowns = []
+    constants = unknown_constants(unknowns)
+    numbered = {h: replace_integers(ex, constants) for h, ex in templates.items()}
+    formula = z3_expr(session.template.instantiate(numbered))
+    if not is_expr(formula):
+        formula = BoolVal(formula)
+    examples = list(examples)
+    counterexamples = []
+    queries = 0
+    for _ in range(rounds):
+        s = Solver()
+        set_budget(s, DEFAULT_BUDGET)
+        if len(examples) == 0:
+            s.add(formula)
+        for example in examples:
+            s.add(on_example(formula, prog, example))
+        queries += 2
+        ans = s.check()
+        if ans != sat:
+            # There are no constants for the examples, or the solver could not decide.
+            return Constants(None, ans == unknown, counterexamples, queries - 1)
+        model = s.model()
+        # The constants replace the Integer in the same order as the unknowns.
+        values = iter([IntConst(model.eval(Int(var.name), model_completion=True).as_long()) for var in unknowns])
+        completions = {h: replace_integers(ex, values) for h, ex in templates.items()}
+        validity, counterexample = session.check(completions)
+        if validity == Validity.VALID:
+            return Constants(completions, False, counterexamples, queries)
+        if validity == Validity.UNKNOWN:
+            return Constants(None, True, counterexamples, queries)
+        examples.append(counterexample)
+        counterexamples.append(counterexample)
+    return Constants(None, True, counterexamples, queries)
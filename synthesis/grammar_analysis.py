@@ -0,0 +1,195 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains the static analysis of the grammar of a hole, which
+tells the enumerators which productions can be used at all, and which ones
+cannot complete within a depth or size budget.
+
+The analysis computes:
+- the type of the result of each production, and the type of each `Var` in
+  it (e.g. in `B : bool -> G > Var`, Var is an int). A production whose
+  type is not the type of its nonterminal is ill-typed;
+- the productive nonterminals, which derive at least one expression, and
+  the reachable nonterminals, which appear in a derivation of the start
+  symbol through productions that can be used;
+- the minimum depth and size of a derivation of each nonterminal and each
+  production. The depth counts the expansions of nonterminals and the
+  composite expressions, like the top-down enumerators, and the size
+  counts the nodes of the expression, like the bottom-up enumerator.
+"""
+from typing import Dict, List, Optional, Set
+from lang.ast import *
+
+# The operators on integers that return an integer.
+ARITHMETIC = {BinaryOperator.PLUS, BinaryOperator.MINUS, BinaryOperator.TIMES,
+              BinaryOperator.DIV, BinaryOperator.MODULO}
+# The operators on integers that return a boolean.
+COMPARISONS = {BinaryOperator.GREATER, BinaryOperator.GREATER_EQ,
+               BinaryOperator.LESSTHAN, BinaryOperator.LESSTHAN_EQ}
+# The operators on booleans.
+LOGICAL = {BinaryOperator.AND, BinaryOperator.OR}
+
+INFINITY = float("inf")
+
+
+class GrammarAnalysis():
+    """
+    The result of the analysis of a grammar, for a hole that can use some
+    variables. The productions are the objects of the grammar, so the
+    results are looked up by production.
+    """
+
+    def __init__(self, grammar: Grammar, available_vars: Set[Variable]) -> None:
+        """
+        @param grammar The grammar of the hole.
+        @param available_vars The variables that can complete a `Var`.
+        """
+        self.start = grammar.rules[0].symbol.name
+        self.rules = {r.symbol.name: r for r in grammar.rules}
+        self.var_types_available = {v.type for v in available_vars}
+        # The type of the result of each production, None if it is ill-typed.
+        self.types: Dict[Expression, Optional[PaddleType]] = {}
+        # The types of the Var of each production, from left to right.
+        self.var_types: Dict[Expression, List[PaddleType]] = {}
+        for rule in grammar.rules:
+            for production in rule.productions:
+                var_types = []
+                self.types[production] = self.infer(production, rule.symbol.type, var_types)
+                self.var_types[production] = var_types
+        self.min_depths = self.fixed_point(self.production_depth)
+        self.min_sizes = self.fixed_point(self.production_size)
+        self.productive = {n for n, depth in self.min_depths.items() if depth < INFINITY}
+        # The productions that can be used in a derivation, in the order of the grammar.
+        self.productions: Dict[str, List[Expression]] = {
+            n: [p for p in rule.productions if self.usable(rule, p)] for n, rule in self.rules.items()}
+        self.reachable = self.reachable_from(self.start)
+
+    def is_nonterminal(self, ex: Expression) -> bool:
+        return isinstance(ex, VarExpr) and ex.var.name in self.rules
+
+    def check(self, actual: Optional[PaddleType], expected: Optional[PaddleType]) -> Optional[PaddleType]:
+        """Returns the actual type if it is the expected one (or nothing is expected), None otherwise."""
+        return actual if expected is None or actual == expected else None
+
+    def infer(self, ex: Expression, expected: Optional[PaddleType], var_types: List[PaddleType]) -> Optional[PaddleType]:
+        """
+        Returns the type of a production, or None if it is ill-typed, and
+        adds the types of its Var to var_types.
+        @param expected The type required by the context, None if any type
+        is allowed.
+        """
+        if self.is_nonterminal(ex):
+            return self.check(self.rules[ex.var.name].symbol.type, expected)
+        if isinstance(ex, GrammarVar):
+            # A Var compared with = takes the type of the other operand, or int.
+            var_type = PaddleType.INT if expected is None else expected
+            var_types.append(var_type)
+            return var_type
+        if isinstance(ex, (GrammarInteger, IntConst)):
+            return self.check(PaddleType.INT, expected)
+        if isinstance(ex, BoolConst):
+            return self.check(PaddleType.BOOL, expected)
+        if isinstance(ex, VarExpr):
+            return self.check(ex.var.type, expected)
+        if isinstance(ex, UnaryExpr):
+            operand_type = PaddleType.BOOL if ex.operator == UnaryOperator.NOT else PaddleType.INT
+            if self.infer(ex.operand, operand_type, var_types) is None:
+                return None
+            return self.check(operand_type, expected)
+        if isinstance(ex, BinaryExpr):
+            if ex.operator in ARITHMETIC or ex.operator in COMPARISONS or ex.operator in LOGICAL:
+                operand_type = PaddleType.BOOL if ex.operator in LOGICAL else PaddleType.INT
+                left = self.infer(ex.left_operand, operand_type, var_types)
+                right = self.infer(ex.right_operand, operand_type, var_types)
+                if left is None or right is None:
+                    return None
+                return self.check(PaddleType.INT if ex.operator in ARITHMETIC else PaddleType.BOOL, expected)
+            # = and != compare two operands of the same type. The type of a
+            # Var on the left comes from the right operand.
+            right_var_types = []
+            if isinstance(ex.left_operand, GrammarVar):
+                right = self.infer(ex.right_operand, None, right_var_types)
+                left = self.infer(ex.left_operand, right, var_types)
+            else:
+                left = self.infer(ex.left_operand, None, var_types)
+                right = self.infer(ex.right_operand, left, right_var_types)
+            var_types += right_var_types
+            if left is None or right is None:
+                return None
+            return self.check(PaddleType.BOOL, expected)
+        if isinstance(ex, Ite):
+            if self.infer(ex.cond, PaddleType.BOOL, var_types) is None:
+                return None
+            true_type = self.infer(ex.true_br, expected, var_types)
+            if true_type is None:
+                return None
+            return self.infer(ex.false_br, true_type, var_types)
+        return None
+
+    def well_typed(self, rule: ProductionRule, production: Expression) -> bool:
+        """A production is well typed if it has the type of its nonterminal and its Var can be completed."""
+        return (self.types[production] == rule.symbol.type and
+                all(t in self.var_types_available for t in self.var_types[production]))
+
+    def usable(self, rule: ProductionRule, production: Expression) -> bool:
+        return self.well_typed(rule, production) and self.production_depth(production, self.min_depths) < INFINITY
+
+    def fixed_point(self, measure) -> Dict[str, float]:
+        """
+        Returns the minimum of the measure (depth or size) of the derivations
+        of each nonterminal, infinite if there is no derivation.
+        """
+        minimum = {n: INFINITY for n in self.rules}
+        changed = True
+        while changed:
+            changed = False
+            for n, rule in self.rules.items():
+                for production in rule.productions:
+                    if not self.well_typed(rule, production):
+                        continue
+                    value = measure(production, minimum)
+                    # The expansion of the nonterminal adds one to the depth, but no node.
+                    if measure == self.production_depth:
+                        value += 1
+                    if value < minimum[n]:
+                        minimum[n] = value
+                        changed = True
+        return minimum
+
+    def production_depth(self, ex: Expression, min_depths: Optional[Dict[str, float]] = None) -> float:
+        """Returns the minimum depth of a derivation of the production."""
+        min_depths = self.min_depths if min_depths is None else min_depths
+        if self.is_nonterminal(ex):
+            return min_depths[ex.var.name]
+        children = [c for c in ex.children() if isinstance(c, Expression)]
+        if isinstance(ex, (BinaryExpr, UnaryExpr, Ite)):
+            return 1 + max(self.production_depth(c, min_depths) for c in children)
+        return 0
+
+    def production_size(self, ex: Expression, min_sizes: Optional[Dict[str, float]] = None) -> float:
+        """Returns the minimum number of nodes of a derivation of the production."""
+        min_sizes = self.min_sizes if min_sizes is None else min_sizes
+        if self.is_nonterminal(ex):
+            return min_sizes[ex.var.name]
+        if isinstance(ex, (BinaryExpr, UnaryExpr, Ite)):
+            return 1 + sum(self.production_size(c, min_sizes) for c in ex.children() if isinstance(c, Expression))
+        return 1
+
+    def reachable_from(self, start: str) -> Set[str]:
+        """Returns the nonterminals that appear in the derivations of start."""
+        reachable = {start}
+        stack = [start]
+        while len(stack) > 0:
+            n = stack.pop()
+            for production in self.productions[n]:
+                for used in production.uses():
+                    if used.name in self.rules and used.name not in reachable:
+                        reachable.add(used.name)
+                        stack.append(used.name)
+        return reachable
+
+    def var_type(self, production: Expression) -> Optional[PaddleType]:
+        """Returns the type of the Var of the production if they all have the same type, None otherwise."""
+        types = set(self.var_types[production])
+        return types.pop() if len(types) == 1 else None
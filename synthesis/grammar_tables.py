@@ -0,0 +1,91 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the GrammarTables class, the grammar of a hole compiled
+once for the top-down enumerators.
+
+The enumerators only ever derive the productions of the grammar and their
+subexpressions, which are hash-consed, so everything they need to know
+about them is computed in advance and looked up in tables: the kind of
+each subexpression (a nonterminal, a composite expression that contains
+nonterminals, or a terminal) and the minimum depth of its derivations,
+and for each nonterminal (by integer id, its position in the grammar) the
+productions that can be used with their minimum depth and the variables
+that can complete their Var.
+"""
+from typing import Dict, List, NamedTuple, Set
+from lang.ast import *
+from synthesis.grammar_analysis import GrammarAnalysis
+
+# The kinds of the subexpressions of the productions.
+VAR = 0
+INTEGER = 1
+# An expression without nonterminals, e.g. `0` or `x + 1`.
+TERMINAL = 2
+NONTERMINAL = 3
+# A composite expression that contains nonterminals, e.g. `G + 1`.
+COMPOSITE = 4
+
+
+class Production(NamedTuple):
+    """A production of a nonterminal, ready to be derived."""
+    template: Expression
+    # The minimum depth of a derivation of the production.
+    depth: float
+    # The variables that can complete the Var of the production.
+    variables: Set[Variable]
+
+
+class GrammarTables():
+    """The tables of the grammar of a hole, indexed by nonterminal ids and by subexpression."""
+
+    def __init__(self, hole: HoleDeclaration, analysis: GrammarAnalysis, available_vars: Set[Variable]) -> None:
+        """
+        @param hole The hole declaration.
+        @param analysis The analysis of the grammar of the hole.
+        @param available_vars The variables that the hole can use.
+        """
+        rules = hole.grammar.rules
+        ids = {r.symbol.name: i for i, r in enumerate(rules)}
+        self.kinds: Dict[Expression, int] = {}
+        # The id of the nonterminal expressions.
+        self.nonterminal: Dict[Expression, int] = {}
+        # The minimum depth of the derivations of each subexpression, infinite
+        # if it contains a nonterminal that derives nothing.
+        self.depths: Dict[Expression, float] = {}
+        for rule in rules:
+            for template in rule.productions:
+                self.compile(template, ids, analysis)
+        # The productions of each nonterminal that can be used, with the fewest children first.
+        self.productions: List[List[Production]] = []
+        for rule in rules:
+            usable = analysis.productions[rule.symbol.name] if rule.symbol.name in analysis.reachable else []
+            self.productions.append([self.production(analysis, p, available_vars)
+                                     for p in sorted(usable, key=lambda p: len(p.children()))])
+        # The productions of the start symbol, in the order of the grammar.
+        self.start: List[Production] = [self.production(analysis, p, available_vars)
+                                        for p in analysis.productions[rules[0].symbol.name]]
+
+    def production(self, analysis: GrammarAnalysis, template: Expression, available_vars: Set[Variable]) -> Production:
+        var_type = analysis.var_type(template)
+        variables = available_vars if var_type is None else {v for v in available_vars if v.type == var_type}
+        return Production(template, analysis.production_depth(template), variables)
+
+    def compile(self, ex: Expression, ids: Dict[str, int], analysis: GrammarAnalysis) -> int:
+        """Fills the tables for the expression and its subexpressions, and returns its kind."""
+        if ex in self.kinds:
+            return self.kinds[ex]
+        if isinstance(ex, GrammarVar):
+            kind = VAR
+        elif isinstance(ex, GrammarInteger):
+            kind = INTEGER
+        elif isinstance(ex, VarExpr) and ex.var.name in ids:
+            kind = NONTERMINAL
+            self.nonterminal[ex] = ids[ex.var.name]
+        else:
+            kinds = [self.compile(child, ids, analysis) for child in ex.children() if isinstance(child, Expression)]
+            kind = COMPOSITE if any(k in (NONTERMINAL, COMPOSITE) for k in kinds) else TERMINAL
+        self.kinds[ex] = kind
+        self.depths[ex] = analysis.production_depth(ex)
+        return kind
@@ -0,0 +1,113 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the JointScheduler class, which combines the expressions
+generated for each hole of a program into complete hole completions.
+
+The combinations are enumerated diagonally: if the i-th expression of a hole
+has rank i, the combinations are returned by increasing sum of the ranks of
+their expressions. The expressions of each hole are only generated when a
+combination needs them, and the cross product is never built.
+"""
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from lang.ast import *
+
+
+class Exhausted(Exception):
+    """
+    Raised by `next_completion`, and by the methods of the synthesizer, when
+    there are no more completions. A program without holes has one (empty)
+    completion, so the end of the enumeration cannot be told by the values of
+    a completion.
+    """
+
+
+class JointScheduler():
+    """
+    A JointScheduler returns a new combination of expressions, one for each
+    hole, at each call of `next_completion`.
+    The expressions of a hole come from a stream, which can be restarted
+    (e.g. after a counterexample). The expressions that were already
+    generated are kept, so the combinations that have already been returned,
+    and therefore refuted, are skipped instead of being verified again.
+    """
+
+    def __init__(self, holes: List[str], make_stream: Callable[[str], Iterator[Expression]]) -> None:
+        """
+        @param holes The names of the holes.
+        @param make_stream A function that returns a new stream of expressions
+        for a hole.
+        """
+        self.holes = holes
+        self.make_stream = make_stream
+        self.streams = {h: make_stream(h) for h in holes}
+        # The expressions generated for each hole, in order.
+        self.seen: Dict[str, List[Expression]] = {h: [] for h in holes}
+        self.exhausted: Dict[str, bool] = {h: False for h in holes}
+        # The combinations that have been returned.
+        self.refuted: Set[Tuple[Expression, ...]] = set()
+        self.state = self.diagonals()
+
+    def restart(self, hole: str) -> None:
+        """
+        Restarts the stream of a hole. The enumeration of the combinations
+        starts over, but skips the combinations that were already returned.
+        """
+        self.streams[hole] = self.make_stream(hole)
+        self.exhausted[hole] = False
+        self.state = self.diagonals()
+
+    def expression(self, hole: str, rank: int) -> Optional[Expression]:
+        """Returns the expression of the hole with the given rank, or None if there is none."""
+        seen = self.seen[hole]
+        while len(seen) <= rank and not self.exhausted[hole]:
+            ex = next(self.streams[hole], None)
+            if ex is None:
+                self.exhausted[hole] = True
+            else:
+                seen.append(ex)
+        return seen[rank] if rank < len(seen) else None
+
+    def combinations(self, holes: List[str], total: int) -> Iterator[List[Expression]]:
+        """Generates the combinations of expressions of the holes whose ranks sum to total."""
+        if len(holes) == 0:
+            if total == 0:
+                yield []
+            return
+        if len(holes) == 1:
+            # The last hole gets the remaining rank.
+            ex = self.expression(holes[0], total)
+            if ex is not None:
+                yield [ex]
+            return
+        for rank in range(total + 1):
+            ex = self.expression(holes[0], rank)
+            if ex is None:
+                return
+            for rest in self.combinations(holes[1:], total - rank):
+                yield [ex] + rest
+
+    def diagonals(self) -> Iterator[Dict[str, Expression]]:
+        """Generates all the combinations that have not been returned yet, by increasing sum of ranks."""
+        total = 0
+        # Once all the holes are exhausted, there is no combination past this sum of ranks.
+        while not all(self.exhausted.values()) or total <= sum(len(self.seen[h]) - 1 for h in self.holes):
+            for exprs in self.combinations(self.holes, total):
+                key = tuple(exprs)
+                if key not in self.refuted:
+                    self.refuted.add(key)
+                    yield dict(zip(self.holes, exprs))
+            if any(self.exhausted[h] and len(self.seen[h]) == 0 for h in self.holes):
+                return
+            total += 1
+
+    def next_completion(self) -> Dict[str, Expression]:
+        """
+        Returns the next combination of expressions, as a map from hole names
+        to expressions. When there is no next combination, it raises `Exhausted`.
+        """
+        completion = next(self.state, None)
+        if completion is None:
+            raise Exhausted("There is no next combination of expressions.")
+        return completion
@@ -0,0 +1,306 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the SketchSynthesizer class, which synthesizes hole
+completions by solving constraints instead of enumerating expressions.
+
+The grammar of each hole is unrolled up to a depth bound into a tree of
+nodes. Each node has a selector, an integer variable that chooses the
+production of the node, and the value of the hole is a z3 term made of
+if-then-else on the selectors. A single query then asks z3 for selectors
+(and constants for `Integer`) such that the program is true on all the
+counterexamples found so far. The candidate is decoded from the model, and
+the counterexample of the verifier is added to the query (a CEGIS loop).
+When there is no candidate at some depth, the depth is increased.
+"""
+from collections import Counter
+from typing import Dict, Iterator, List, Mapping, Optional, Set, Tuple
+from z3 import *
+from lang.ast import *
+from lang.template import ProgramTemplate
+from lang.interpreter import Value
+from verification.verifier import binary_funcs, unary_funcs, z3_expr, set_budget, Budget
+from synthesis.grammar_analysis import GrammarAnalysis
+from synthesis.scheduler import Exhausted
+
+# The maximum depth to which the grammars are unrolled.
+SKETCH_MAX_DEPTH = 6
+# The key of the count of Integer in a production.
+INTEGER = "Integer"
+# The budget of the solver for each completion, about as much as the budget of
+# the verifier (5 seconds). It is a resource limit and not a timeout: with a
+# timeout, the timer thread of z3 4.8.10 can deadlock on the queries of the
+# sketches.
+SKETCH_BUDGET = Budget(rlimit=20000000)
+
+
+def z3_var(name: str, paddle_type: PaddleType) -> ExprRef:
+    return Bool(name) if paddle_type == PaddleType.BOOL else Int(name)
+
+
+def z3_value(value: Value) -> ExprRef:
+    return BoolVal(value) if isinstance(value, bool) else IntVal(value)
+
+
+class SketchNode():
+    """
+    A node of an unrolled grammar: a choice between the productions of a
+    nonterminal. The nonterminals, Var and Integer in the productions are
+    children of the node, indexed by their position in the production, so
+    that the productions share their children.
+    """
+
+    def __init__(self, sketch: 'GrammarSketch', symbol: Variable, path: str, depth: int) -> None:
+        """
+        @param sketch The unrolled grammar that contains the node.
+        @param symbol The nonterminal of the node.
+        @param path A name for the node that is unique in the tree.
+        @param depth The depth that remains below the node.
+        """
+        self.sketch = sketch
+        self.path = path
+        self.selector = Int(f"{path}!sel")
+        # The children nodes of the nonterminals, by (name, occurrence).
+        self.children: Dict[Tuple[str, int], SketchNode] = {}
+        # The selectors of the Var, by type and occurrence, and the unknowns of the Integer, by occurrence.
+        self.var_selectors: Dict[Tuple[PaddleType, int], ArithRef] = {}
+        self.constants: List[ArithRef] = []
+        self.term: Optional[ExprRef] = None
+        self.productions = [p for p in sketch.rules[symbol.name] if self.fits(p, depth)]
+
+    def fits(self, production: Expression, depth: int) -> bool:
+        """
+        Returns true if the production can be derived with the remaining
+        depth, creating the children nodes it needs.
+        """
+        occurrences: Dict[str, int] = {}
+        for symbol in self.sketch.nonterminals_of(production):
+            index = occurrences.get(symbol.name, 0)
+            occurrences[symbol.name] = index + 1
+            key = (symbol.name, index)
+            if key not in self.children:
+                if depth == 0:
+                    return False
+                child = SketchNode(self.sketch, symbol, f"{self.path}.{symbol.name}{index}", depth - 1)
+                if len(child.productions) == 0:
+                    return False
+                self.children[key] = child
+        return True
+
+    def constraints(self) -> List[BoolRef]:
+        """Returns the constraints on the selectors of the node and of its children."""
+        constraints = [self.selector >= 0, self.selector < len(self.productions)]
+        for (var_type, _), var_selector in self.var_selectors.items():
+            constraints += [var_selector >= 0, var_selector < len(self.sketch.vars[var_type])]
+        for child in self.children.values():
+            constraints += child.constraints()
+        return constraints
+
+    def value(self) -> ExprRef:
+        """Returns the value of the node, as a term over the selectors and the variables."""
+        # The term is built once, the productions that share the node share its term.
+        if self.term is None:
+            for index in reversed(range(len(self.productions))):
+                production = self.productions[index]
+                production = self.encode(production, iter(self.sketch.analysis.var_types[production]), {}, Counter())
+                self.term = production if self.term is None else If(self.selector == index, production, self.term)
+        return self.term
+
+    def var_selector(self, var_type: PaddleType, index: int) -> ArithRef:
+        if (var_type, index) not in self.var_selectors:
+            self.var_selectors[(var_type, index)] = Int(f"{self.path}!var_{var_type}{index}")
+        return self.var_selectors[(var_type, index)]
+
+    def constant(self, index: int) -> ArithRef:
+        while len(self.constants) <= index:
+            self.constants.append(Int(f"{self.path}!int{len(self.constants)}"))
+        return self.constants[index]
+
+    def encode(self, ex: Expression, var_types: Iterator[PaddleType], occurrences: Dict[str, int],
+               counts: Counter) -> ExprRef:
+        """
+        Returns the z3 term of a production, whose Var have the types
+        var_types. The occurrences of the nonterminals and the counts of Var
+        (by type) and Integer are updated while the production is traversed,
+        from left to right.
+        """
+        if isinstance(ex, BinaryExpr):
+            left = self.encode(ex.left_operand, var_types, occurrences, counts)
+            return binary_funcs[str(ex.operator)](left, self.encode(ex.right_operand, var_types, occurrences, counts))
+        if isinstance(ex, UnaryExpr):
+            return unary_funcs[str(ex.operator)](self.encode(ex.operand, var_types, occurrences, counts))
+        if isinstance(ex, Ite):
+            cond = self.encode(ex.cond, var_types, occurrences, counts)
+            true_br = self.encode(ex.true_br, var_types, occurrences, counts)
+            return If(cond, true_br, self.encode(ex.false_br, var_types, occurrences, counts))
+        if isinstance(ex, GrammarVar):
+            var_type = next(var_types)
+            var_selector = self.var_selector(var_type, counts[var_type])
+            counts[var_type] += 1
+            variables = self.sketch.vars[var_type]
+            result = self.sketch.variable_value(variables[-1])
+            for index in reversed(range(len(variables) - 1)):
+                result = If(var_selector == index, self.sketch.variable_value(variables[index]), result)
+            return result
+        if isinstance(ex, GrammarInteger):
+            counts[INTEGER] += 1
+            return self.constant(counts[INTEGER] - 1)
+        if isinstance(ex, VarExpr) and ex.var.name in self.sketch.rules:
+            index = occurrences.get(ex.var.name, 0)
+            occurrences[ex.var.name] = index + 1
+            return self.children[(ex.var.name, index)].value()
+        return z3_expr(ex)
+
+    def decode(self, model: ModelRef, used: List[ArithRef]) -> Expression:
+        """
+        Returns the expression chosen by the model, and adds the selectors
+        and unknowns that determine it to `used`.
+        """
+        used.append(self.selector)
+        production = self.productions[model.eval(self.selector, model_completion=True).as_long()]
+        var_types = iter(self.sketch.analysis.var_types[production])
+        return self.rebuild(production, model, used, var_types, {}, Counter())
+
+    def rebuild(self, ex: Expression, model: ModelRef, used: List[ArithRef], var_types: Iterator[PaddleType],
+                occurrences: Dict[str, int], counts: Counter) -> Expression:
+        if isinstance(ex, BinaryExpr):
+            left = self.rebuild(ex.left_operand, model, used, var_types, occurrences, counts)
+            return BinaryExpr(ex.operator, left,
+                              self.rebuild(ex.right_operand, model, used, var_types, occurrences, counts))
+        if isinstance(ex, UnaryExpr):
+            return UnaryExpr(ex.operator, self.rebuild(ex.operand, model, used, var_types, occurrences, counts))
+        if isinstance(ex, Ite):
+            cond = self.rebuild(ex.cond, model, used, var_types, occurrences, counts)
+            true_br = self.rebuild(ex.true_br, model, used, var_types, occurrences, counts)
+            return Ite(cond, true_br, self.rebuild(ex.false_br, model, used, var_types, occurrences, counts))
+        if isinstance(ex, GrammarVar):
+            var_type = next(var_types)
+            used.append(self.var_selectors[(var_type, counts[var_type])])
+            counts[var_type] += 1
+            return VarExpr(self.sketch.vars[var_type][model.eval(used[-1], model_completion=True).as_long()])
+        if isinstance(ex, GrammarInteger):
+            counts[INTEGER] += 1
+            used.append(self.constants[counts[INTEGER] - 1])
+            return IntConst(model.eval(used[-1], model_completion=True).as_long())
+        if isinstance(ex, VarExpr) and ex.var.name in self.sketch.rules:
+            index = occurrences.get(ex.var.name, 0)
+            occurrences[ex.var.name] = index + 1
+            return self.children[(ex.var.name, index)].decode(model, used)
+        return ex
+
+
+class GrammarSketch():
+    """
+    A GrammarSketch is the grammar of a hole unrolled up to a depth, with
+    a term for the value of the hole.
+    """
+
+    def __init__(self, hole: HoleDeclaration, available_vars: Set[Variable],
+                 environment: Mapping[str, Expression], depth: int) -> None:
+        """
+        @param hole The hole declaration.
+        @param available_vars The variables that the hole can use.
+        @param environment The symbolic values of the defined variables.
+        @param depth The depth of the unrolled grammar.
+        """
+        self.environment = environment
+        # The productions that are ill-typed or that derive nothing are left out.
+        self.analysis = GrammarAnalysis(hole.grammar, available_vars)
+        self.rules = self.analysis.productions
+        self.vars = {t: sorted((v for v in available_vars if v.type == t), key=lambda v: v.name) for t in PaddleType}
+        self.symbols = {r.symbol.name: r.symbol for r in hole.grammar.rules}
+        start = hole.grammar.rules[0].symbol
+        self.root = SketchNode(self, start, hole.var.name, depth)
+        self.term = self.root.value() if len(self.root.productions) > 0 else None
+
+    def nonterminals_of(self, ex: Expression) -> List[Variable]:
+        """Returns the nonterminals of a production, from left to right."""
+        if isinstance(ex, VarExpr):
+            return [self.symbols[ex.var.name]] if ex.var.name in self.rules else []
+        return [s for child in ex.children() if isinstance(child, Expression) for s in self.nonterminals_of(child)]
+
+    def variable_value(self, var: Variable) -> ExprRef:
+        """Returns the symbolic value of a variable that the hole uses."""
+        return z3_expr(self.environment.get(var.name, VarExpr(var)))
+
+
+class SketchSynthesizer():
+    """
+    A SketchSynthesizer returns, at each call of `next_completion`, hole
+    completions that are correct on all the examples it was given, and that
+    it has not returned before.
+    """
+
+    def __init__(self, prog: Program, vars_for_hole: Mapping[str, Set[Variable]],
+                 budget: Budget = SKETCH_BUDGET) -> None:
+        """
+        @param prog The program.
+        @param vars_for_hole The variables that each hole can use.
+        @param budget The budget of the solver for each completion.
+        """
+        self.prog = prog
+        self.vars_for_hole = vars_for_hole
+        self.budget = budget
+        self.examples: List[Mapping[str, Value]] = []
+        self.returned: Set[Tuple[Expression, ...]] = set()
+        # The holes are replaced by placeholders in the program, and by their value on each example.
+        template = ProgramTemplate(prog)
+        self.placeholders = template.placeholders
+        self.environment = template.environment
+        self.constraint = z3_expr(template.constraint)
+        self.depth = 0
+        self.encode()
+
+    def encode(self) -> None:
+        """Unrolls the grammars to the current depth, and adds the examples to a new solver."""
+        self.solver = Solver()
+        set_budget(self.solver, self.budget)
+        self.sketches = {h.var.name: GrammarSketch(h, self.vars_for_hole[h.var.name], self.environment, self.depth)
+                         for h in self.prog.holes}
+        self.feasible = all(sketch.term is not None for sketch in self.sketches.values())
+        if self.feasible:
+            for sketch in self.sketches.values():
+                self.solver.add(*sketch.root.constraints())
+            for index, example in enumerate(self.examples):
+                self.add_to_solver(index, example)
+
+    def add_to_solver(self, index: int, example: Mapping[str, Value]) -> None:
+        """Adds the constraint that the program is true on the example."""
+        substitution = [(z3_var(var.name, var.type), z3_value(example[var.name])) for var in self.prog.inputs]
+        for h in self.prog.holes:
+            name = h.var.name
+            substitution.append((z3_var(f"?{name}", h.var.type), z3_var(f"?{name}!{index}", h.var.type)))
+        for name, sketch in self.sketches.items():
+            placeholder = self.placeholders[name].var
+            self.solver.add(z3_var(f"?{name}!{index}", placeholder.type) == substitute(sketch.term, *substitution))
+        self.solver.add(substitute(self.constraint, *substitution))
+
+    def add_example(self, example: Mapping[str, Value]) -> None:
+        """Adds an example (e.g. a counterexample) on which the program must be true."""
+        self.examples.append(example)
+        if self.feasible:
+            self.add_to_solver(len(self.examples) - 1, example)
+
+    def next_completion(self) -> Dict[str, Expression]:
+        """
+        Returns the next hole completions. It raises `Exhausted` when there is
+        no completion up to `SKETCH_MAX_DEPTH`. When the solver cannot find a
+        completion within its budget, the grammars are unrolled to the next
+        depth, as if there were none at this depth.
+        """
+        while self.depth <= SKETCH_MAX_DEPTH:
+            if self.feasible and self.solver.check() == sat:
+                model = self.solver.model()
+                used = []
+                completions = {name: sketch.root.decode(model, used) for name, sketch in self.sketches.items()}
+                # The same candidate is not chosen again, even if the verifier did not return a counterexample.
+                self.solver.add(Or([v != model.eval(v, model_completion=True) for v in used]))
+                key = tuple(completions.values())
+                if key not in self.returned:
+                    self.returned.add(key)
+                    return completions
+            else:
+                self.depth += 1
+                self.encode()
+        raise Exhausted(f"There is no completion up to depth {SKETCH_MAX_DEPTH}.")
@@ -6,15 +6,38 @@ Fill in this file to complete the synthesis portion
 of the assignment.
 """
 
-from typing import Mapping, Iterator, Set, Dict
+from itertools import islice
+from random import Random
+from typing import Mapping, Iterator, List, Optional, Set, Dict, Tuple
 from z3 import *
 from lang.ast import *
+from lang.interpreter import Interpreter, Value
+from synthesis.bottom_up import BottomUpEnumerator, extend_example, sample_examples
+from synthesis.scheduler import Exhausted, JointScheduler
+from synthesis.canonical import canonical_stream, ignores_next
+from synthesis.constants import has_integer_hole, solve_constants, CONSTANT_ROUNDS, RETRY_CONSTANT_ROUNDS
+from synthesis.sketch import SketchSynthesizer
+from synthesis.weighted import BestFirstEnumerator, load_costs
+from synthesis.grammar_analysis import GrammarAnalysis
+from synthesis.grammar_tables import GrammarTables, VAR, INTEGER, TERMINAL, NONTERMINAL
+from verification.verifier import VerificationSession
+
+# The number of sampled inputs on which the bottom-up enumerators of method 3 compare the expressions, before
+# the counterexamples are added.
+SAMPLES = 8
+# The number of completions that method 3 rejects from their values on the counterexamples. Past it, they are
+# returned, and they count towards the limit of candidates of the synthesis loop.
+REJECTION_LIMIT = 1000000
+# The depth after which the top-down enumerators stop generating expressions.
+MAX_DEPTH = 160
 
 
 class Synthesizer():
     """
     This class is has three methods `synth_method_1`, `synth_method_2` or
-    `synth_method_3` for generating expression for a program's holes.
+    `synth_method_3` for generating expression for a program's holes, and
+    a fourth method `synth_method_4` that finds them with the solver and a
+    fifth method `synth_method_5` that enumerates them by cost.
 
     You may also choose to add data attributes and methods to this class
     to enable instances of `Synthesizer` to remember information about
@@ -22,7 +45,7 @@ class Synthesizer():
 
     Calling `synth_method_1`, `synth_method_2` or `synth_method_3` should
     produce a new set of hole completions at each call for a given
-    `Synthesizer` instance.
+    `Synthesizer` instance. When there is none, they raise `Exhausted`.
     For example, suppose the program p contains one hole `h1` with the
     grammar `[ G : int -> G + G | 0 | 1 ]`. Then, the following sequence
     is a possible execution:
@@ -51,199 +74,320 @@ class Synthesizer():
     e.g. `prog.hole_can_use("h1")` returns the variables that "h1" can use.
     """
 
-    def __init__(self, ast: Program):
+    def __init__(self, ast: Program, costs: Optional[Mapping[str, float]] = None):
         """
         Initialize the Synthesizer.
         The Synthesizer can have a state or other data attributes and
         methods to remember which programs have been synthesized before.
+        @param costs The costs of the productions used by method 5 (see `synthesis/weighted.py`). By default,
+        they are read from the file given by the `PADDLE_COSTS` environment variable, if any.
         """
         self.vars_for_hole = {h.var.name: ast.hole_can_use(h.var.name) for h in ast.holes}
-        self.generator_states = {}
-        self.ordered_rules = {
-            h.var.name: {r.symbol: sorted(r.productions, key=lambda p: len(p.children())) for r in h.grammar.rules} for
-            h in ast.holes}
+        # The bottom-up enumerators used by method 3.
+        self.bottom_up = {h.var.name: BottomUpEnumerator(
+            h, self.vars_for_hole[h.var.name], sample_examples(ast, self.vars_for_hole[h.var.name], SAMPLES))
+            for h in ast.holes}
+        # The schedulers that combine the expressions of all the holes, for each method.
+        self.schedulers = {}
+        # The counterexamples found by the verifier so far.
+        self.counterexamples = []
+        # With one hole, the value of a completion on a counterexample tells if the program is false on it: the
+        # bottom-up enumerator does not generate the completions that are false on a counterexample.
+        self.outcomes: Dict[Tuple[int, type, Value], bool] = {}
+        # The number of completions rejected from their values on the counterexamples.
+        self.rejected = 0
+        if len(ast.holes) == 1:
+            self.bottom_up[ast.holes[0].var.name].rejects = self.refuted_by_values
+        # The grammars are analysed and compiled into tables once. The productions that are ill-typed, or that are
+        # never part of a derivation, are removed from the tables.
+        self.analysis = {h.var.name: GrammarAnalysis(h.grammar, self.vars_for_hole[h.var.name]) for h in ast.holes}
+        self.tables = {h.var.name: GrammarTables(h, self.analysis[h.var.name], self.vars_for_hole[h.var.name])
+                       for h in ast.holes}
         # The synthesizer is initialized with the program ast it needs
         # to synthesize hole completions for.
         self.ast = ast
-        self.max_depth = 5
+        # The depth of the first round of the iterative deepening of methods 1 and 2.
+        self.max_depth = 1
+        # The constraint-based synthesizer of method 4, created at its first call.
+        self.sketch = None
+        # The verification session of the constants of the templates, created at its first use.
+        self.session = None
+        # The templates of each method whose constants were not found, tried again when its enumeration ends.
+        self.unresolved: Dict[int, List[Mapping[str, Expression]]] = {}
+        # The solver queries made to find constants, and the templates for which none were found.
+        self.constant_queries = 0
+        self.skipped_templates = 0
+        self.costs = load_costs() if costs is None else costs
 
     def do_derivation_1(self, ex: Expression,
-                        sorted_rules: Dict[Variable, List[Expression]],
+                        tables: GrammarTables,
                         available_vars: Set[Variable],
-                        depth: int = 5) -> Iterator[Expression]:
+                        depth: int = 5, min_depth: int = 0) -> Iterator[Expression]:
         """
         A generator function which, given an Expression with some non-terminals and a Grammar, eventually generates
-        all possible derivations
+        all possible derivations of depth at most `depth` and at least `min_depth`.
+        The depth of a derivation is the number of nested expansions and composite expressions in it, so that
+        increasing `depth` only generates more derivations, and setting `min_depth` skips the derivations that were
+        already generated with a smaller `depth`.
         """
-        if depth < 0:
+        if depth < 0 or min_depth > depth:
             return
-        # Handle the Var, Integer, or constant cases
-        if isinstance(ex, GrammarVar):
-            for v in available_vars:
-                yield VarExpr(v)
-            return
-        elif isinstance(ex, GrammarInteger):
-            for i in range(-10, 10):  # this is very stupid
-                yield IntConst(i)
-            return
-        elif len(ex.uses()) == 0:  # this is a constant expression so can just return ex
-            yield ex
-            return
-
-        # if none of the above cases apply, then we can likely apply one of the production rules in gram
-        # note that just because len(ex.uses()) > 0 doesn't mean there must be some non terminals, could be given
-        # an expression like (x1+1). ex.uses() would contain x1 even though it's not a non-terminal
-        found_valid_rule = False
-        for symbol, productions in sorted_rules.items():
-            # this rule does not apply to this expression
-            if symbol not in ex.uses():
-                continue
-            found_valid_rule = True
-
-            # if we found a variable we can replace, generate all possible replacements
-            if isinstance(ex, VarExpr) and ex.var.name == symbol.name:
-                for product in productions:
-                    for d in self.do_derivation_1(product, sorted_rules, available_vars, depth - 1):
-                        if depth > 0 or len(d.children()) == 0:
-                            yield d
+        # Handle the Var, Integer, or constant cases, the kind of the expression is looked up in the tables.
+        kind = tables.kinds[ex]
+        if kind == VAR:
+            if min_depth <= 0:
+                for v in available_vars:
+                    yield VarExpr(v)
+        elif kind == INTEGER:
+            # The value of the constant is found by the solver (see `solve_constants`).
+            if min_depth <= 0:
+                yield ex
+        elif kind == TERMINAL:  # there is no non-terminal in ex (e.g. a constant or x1 + 1), so can just return ex
+            if min_depth <= 0:
+                yield ex
+        elif kind == NONTERMINAL:
+            # generate all possible replacements of the non-terminal
+            for production in tables.productions[tables.nonterminal[ex]]:
+                # The productions that cannot be derived within the depth are skipped.
+                if production.depth > depth - 1:
+                    continue
+                for d in self.do_derivation_1(production.template, tables, production.variables,
+                                              depth - 1, min_depth - 1):
+                    yield d
+        else:
+            # recurse on composite expression types
+            if isinstance(ex, Ite):
+                for c, t, f in self.derive_children([ex.cond, ex.true_br, ex.false_br], lambda c, t, f: Ite(c, t, f),
+                                                    tables, available_vars, depth - 1, min_depth - 1):
+                    yield Ite(c, t, f)
+
+            elif isinstance(ex, BinaryExpr):
+                for left, right in self.derive_children([ex.left_operand, ex.right_operand],
+                                                        lambda left, right: BinaryExpr(ex.operator, left, right),
+                                                        tables, available_vars, depth - 1, min_depth - 1):
+                    yield BinaryExpr(ex.operator, left, right)
+
+            elif isinstance(ex, UnaryExpr):
+                for u in canonical_stream(self.do_derivation_1(ex.operand, tables, available_vars,
+                                                               depth - 1, min_depth - 1)):
+                    yield UnaryExpr(ex.operator, u)
 
             else:
-                # recurse on composite expression types
-                if isinstance(ex, Ite):
-                    for c in self.do_derivation_1(ex.cond, sorted_rules, available_vars, depth - 1):
-                        for t in self.do_derivation_1(ex.true_br, sorted_rules, available_vars, depth - 1):
-                            for f in self.do_derivation_1(ex.false_br, sorted_rules, available_vars, depth - 1):
-                                yield Ite(c, t, f)
-
-                elif isinstance(ex, BinaryExpr):
-                    for left in self.do_derivation_1(ex.left_operand, sorted_rules, available_vars, depth - 1):
-                        for right in self.do_derivation_1(ex.right_operand, sorted_rules, available_vars, depth - 1):
-                            yield BinaryExpr(ex.operator, left, right)
-
-                elif isinstance(ex, UnaryExpr):
-                    for u in self.do_derivation_1(ex.operand, sorted_rules, available_vars, depth - 1):
-                        yield UnaryExpr(ex.operator, u)
-
-                # never should have gotten
-                elif isinstance(ex, (IntConst, BoolConst)):
-                    raise ASTException("Somehow tried to do derivation on a constant expression")
-                else:
-                    raise ASTException(f"Unexpected expression type {ex.__class__()} for {ex}")
-
-                return
-
-        # no rules in the given grammar apply to this expression, so just return
-        if not found_valid_rule:
-            yield ex
-            return
-            # raise ASTException(f"could not replace all non terminals in {ex} with the grammar {gram}")
+                raise ASTException(f"Unexpected expression type {ex.__class__()} for {ex}")
 
     def do_derivation_2(self, ex: Expression,
-                        sorted_rules: Dict[Variable, List[Expression]],
+                        tables: GrammarTables,
                         available_vars: Set[Variable],
-                        depth: int = 5) -> Iterator[Expression]:
+                        depth: int = 5, min_depth: int = 0) -> Iterator[Expression]:
         """
         A generator function which, given an Expression with some non-terminals and a Grammar, eventually generates
-        all possible derivations
+        all possible derivations of depth at most `depth` and at least `min_depth` (see `do_derivation_1`).
         """
-        if depth < 0:
-            return
-        # Handle the Var, Integer, or constant cases
-        if isinstance(ex, GrammarVar):
-            for v in available_vars:
-                yield VarExpr(v)
-            return
-        elif isinstance(ex, GrammarInteger):
-            for i in range(-10, 10):  # this is very stupid
-                yield IntConst(i)
-            return
-        elif len(ex.uses()) == 0:  # this is a constant expression so can just return ex
-            yield ex
+        if depth < 0 or min_depth > depth:
             return
+        # Handle the Var, Integer, or constant cases, the kind of the expression is looked up in the tables.
+        kind = tables.kinds[ex]
+        if kind == VAR:
+            if min_depth <= 0:
+                for v in available_vars:
+                    yield VarExpr(v)
+        elif kind == INTEGER:
+            # The value of the constant is found by the solver (see `solve_constants`).
+            if min_depth <= 0:
+                yield ex
+        elif kind == TERMINAL:  # there is no non-terminal in ex (e.g. a constant or x1 + 1), so can just return ex
+            if min_depth <= 0:
+                yield ex
+        elif kind == NONTERMINAL:
+            # generate all possible replacements of the non-terminal
+            for production in tables.productions[tables.nonterminal[ex]]:
+                # The productions that cannot be derived within the depth are skipped.
+                if production.depth > depth - 1:
+                    continue
+                for d in self.do_derivation_1(production.template, tables, production.variables,
+                                              depth - 1, min_depth - 1):
+                    yield d
+        else:
+            # recurse on composite expression types
+            if isinstance(ex, Ite):
+                for f, t, c in self.derive_children([ex.false_br, ex.true_br, ex.cond], lambda f, t, c: Ite(c, t, f),
+                                                    tables, available_vars, depth - 1, min_depth - 1):
+                    yield Ite(c, t, f)
+
+            elif isinstance(ex, BinaryExpr):
+                for right, left in self.derive_children([ex.right_operand, ex.left_operand],
+                                                        lambda right, left: BinaryExpr(ex.operator, left, right),
+                                                        tables, available_vars, depth - 1, min_depth - 1):
+                    yield BinaryExpr(ex.operator, left, right)
+
+            elif isinstance(ex, UnaryExpr):
+                for u in canonical_stream(self.do_derivation_1(ex.operand, tables, available_vars,
+                                                               depth - 1, min_depth - 1)):
+                    yield UnaryExpr(ex.operator, u)
 
-        # if none of the above cases apply, then we can likely apply one of the production rules in gram
-        # note that just because len(ex.uses()) > 0 doesn't mean there must be some non terminals, could be given
-        # an expression like (x1+1). ex.uses() would contain x1 even though it's not a non-terminal
-        found_valid_rule = False
-        for symbol, productions in sorted_rules.items():
-            # this rule does not apply to this expression
-            if symbol not in ex.uses():
-                continue
-            found_valid_rule = True
+            else:
+                raise ASTException(f"Unexpected expression type {ex.__class__()} for {ex}")
 
-            # if we found a variable we can replace, generate all possible replacements
-            if isinstance(ex, VarExpr) and ex.var.name == symbol.name:
-                for product in productions:
-                    for d in self.do_derivation_1(product, sorted_rules, available_vars, depth - 1):
-                        if depth > 0 or len(d.children()) == 0:
-                            yield d
+    def derive_children(self, children: List[Expression], rebuild,
+                        tables: GrammarTables,
+                        available_vars: Set[Variable],
+                        depth: int, min_depth: int) -> Iterator[List[Expression]]:
+        """
+        Generates the derivations of all the children of a composite expression, with the first child in the
+        outermost loop. Each child is derived with depth at most `depth`, and at least one of them with depth at
+        least `min_depth`: the first such child is the i-th one, the children before it have depth less than
+        `min_depth`. `rebuild` builds the composite expression from the derivations of the children.
+        The bounds within which one of the children cannot be derived at all (e.g. it is deeper than the
+        remaining depth, or uses a nonterminal that derives nothing) are skipped before deriving the others.
+        """
+        if min_depth <= 0:
+            bounds = [[(depth, 0)] * len(children)]
+        else:
+            bounds = [[(min_depth - 1, 0)] * i + [(depth, min_depth)] + [(depth, 0)] * (len(children) - i - 1)
+                      for i in range(len(children))]
+        for bound in bounds:
+            if any(tables.depths[child] > d for child, (d, _) in zip(children, bound)):
+                continue
+            for derivations in self.derive_product(children, bound, tables, available_vars, rebuild, []):
+                yield derivations
 
-            else:
-                # recurse on composite expression types
-                if isinstance(ex, Ite):
-                    for f in self.do_derivation_1(ex.false_br, sorted_rules, available_vars, depth - 1):
-                        for t in self.do_derivation_1(ex.true_br, sorted_rules, available_vars, depth - 1):
-                            for c in self.do_derivation_1(ex.cond, sorted_rules, available_vars, depth - 1):
-                                yield Ite(c, t, f)
-
-                elif isinstance(ex, BinaryExpr):
-                    for right in self.do_derivation_1(ex.right_operand, sorted_rules, available_vars, depth - 1):
-                        for left in self.do_derivation_1(ex.left_operand, sorted_rules, available_vars, depth - 1):
-                            yield BinaryExpr(ex.operator, left, right)
-
-                elif isinstance(ex, UnaryExpr):
-                    for u in self.do_derivation_1(ex.operand, sorted_rules, available_vars, depth - 1):
-                        yield UnaryExpr(ex.operator, u)
-
-                # never should have gotten
-                elif isinstance(ex, (IntConst, BoolConst)):
-                    raise ASTException("Somehow tried to do derivation on a constant expression")
-                else:
-                    raise ASTException(f"Unexpected expression type {ex.__class__()} for {ex}")
-
-                return
-
-        # no rules in the given grammar apply to this expression, so just return
-        if not found_valid_rule:
-            yield ex
+    def derive_product(self, children: List[Expression], bounds: List[Tuple[int, int]],
+                       tables: GrammarTables,
+                       available_vars: Set[Variable], rebuild,
+                       prefix: List[Expression]) -> Iterator[List[Expression]]:
+        """
+        Generates the derivations of all the children, each within its (depth, min_depth) bounds, after the
+        derivations `prefix` of the previous children. The derivations of a child that have the same canonical form
+        as a previous one are skipped, since they give the same canonical form to the parent. If the canonical form
+        of the parent does not depend on the next child (e.g. `True ? t : f` does not depend on f), only its first
+        derivation is generated.
+        """
+        if len(children) == 0:
+            yield []
             return
-
-    def generate_assignments(self, hole: HoleDeclaration, derivation_func) -> Iterator[Expression]:
+        depth, min_depth = bounds[0]
+        derivations = canonical_stream(self.do_derivation_1(children[0], tables, available_vars, depth, min_depth))
+        if ignores_next(rebuild, prefix, len(children)):
+            derivations = islice(derivations, 1)
+        for first in derivations:
+            for rest in self.derive_product(children[1:], bounds[1:], tables, available_vars, rebuild,
+                                            prefix + [first]):
+                yield [first] + rest
+
+    def generate_assignments(self, hole: HoleDeclaration, derivation_func,
+                             depth: int, min_depth: int) -> Iterator[Expression]:
         """
-        Generator function that generates all possible assignments for the given hole.
-        Assignments will be generated breadth first
+        A generator that uses derivation_func to generate all possible assignments to the given hole,
+        with depth at most `depth` and at least `min_depth`.
         """
         # always start from the first production rule
-        for product in hole.grammar.rules[0].productions:
-            h = hole.var.name
-            for assignment in derivation_func(product, self.ordered_rules[h], self.vars_for_hole[h], self.max_depth):
+        tables = self.tables[hole.var.name]
+        for production in tables.start:
+            if production.depth > depth:
+                continue
+            for assignment in derivation_func(production.template, tables, production.variables, depth, min_depth):
                 yield assignment
 
-    def get_next_assignment(self, h: HoleDeclaration, derivation_func):
-        # will return None if there are no more completions
-        next_expr = next(self.generator_states[h.var.name], None)
-        if next_expr is None:
-            self.max_depth *= 2
-            self.generator_states[h.var.name] = self.generate_assignments(h, derivation_func)
-            next_expr = next(self.generator_states[h.var.name], None)
-        # print(next_expr)
-        return {h.var.name: next_expr}
+    def deepening(self, hole: HoleDeclaration, derivation_func) -> Iterator[Expression]:
+        """
+        Generates the assignments of the hole with iterative deepening, starting at depth `self.max_depth`.
+        When all the expressions up to the depth have been generated, the depth grows by one, and only the
+        expressions that are deeper are generated in the next round: the shallow ones have already been tried.
+        """
+        depth, min_depth = self.max_depth, 0
+        while depth < MAX_DEPTH:
+            for assignment in self.generate_assignments(hole, derivation_func, depth, min_depth):
+                yield assignment
+            depth, min_depth = depth + 1, depth + 1
+
+    def scheduler(self, method: int, make_stream) -> JointScheduler:
+        """Returns the scheduler of the method, which combines the streams of expressions of the holes."""
+        if method not in self.schedulers:
+            self.schedulers[method] = JointScheduler([h.var.name for h in self.ast.holes], make_stream)
+        return self.schedulers[method]
+
+    def next_with_constants(self, method: int, scheduler: JointScheduler) -> Mapping[str, Expression]:
+        """
+        Returns the next completion of the scheduler, where the `Integer` left in the templates are replaced by
+        constants found by the solver. The templates for which there are no such constants are skipped, and
+        the ones for which the search gave up are tried again with more rounds when the scheduler is exhausted.
+        The counterexamples found by the search are added like the ones of the verifier.
+        """
+        unresolved = self.unresolved.setdefault(method, [])
+        while True:
+            try:
+                templates, rounds = scheduler.next_completion(), CONSTANT_ROUNDS
+            except Exhausted:
+                if len(unresolved) == 0:
+                    raise
+                templates, rounds = unresolved.pop(0), RETRY_CONSTANT_ROUNDS
+            if not any(has_integer_hole(ex) for ex in templates.values()):
+                return templates
+            if self.session is None:
+                self.session = VerificationSession(self.ast)
+            result = solve_constants(self.ast, templates, self.counterexamples, self.session, rounds)
+            self.constant_queries += result.queries
+            for counterexample in result.counterexamples:
+                self.add_counterexample(counterexample)
+            if result.completions is not None:
+                return result.completions
+            self.skipped_templates += 1
+            if result.unresolved and rounds == CONSTANT_ROUNDS:
+                unresolved.append(templates)
+
+    def refuted_by_values(self, values: tuple) -> bool:
+        """
+        Returns true if the program, which has one hole, is false on a counterexample when the value of its
+        completion is given by values, on the examples of its bottom-up enumerator. The examples that follow
+        the `SAMPLES` sampled ones are the counterexamples, in order.
+        """
+        if self.rejected >= REJECTION_LIMIT:
+            return False
+        hole = self.ast.holes[0].var.name
+        for i, value in enumerate(values[SAMPLES:]):
+            counterexample = self.counterexamples[i]
+            # True == 1 in Python, the type is part of the key.
+            key = (i, type(value), value)
+            if key not in self.outcomes:
+                constant = BoolConst(value) if isinstance(value, bool) else IntConst(value)
+                self.outcomes[key] = Interpreter({hole: constant}).evaluate(self.ast, counterexample)
+            if not self.outcomes[key]:
+                self.rejected += 1
+                return True
+        return False
+
+    def add_counterexample(self, counterexample: Mapping[str, Value]) -> None:
+        """
+        Remember a counterexample (values of the program inputs for which the last hole completion
+        is not correct). The bottom-up enumerators use it as an example input.
+        """
+        self.counterexamples.append(counterexample)
+        interpreter = Interpreter({})
+        rng = Random(len(self.counterexamples))
+        for h in self.ast.holes:
+            name = h.var.name
+            example = extend_example(self.ast, self.vars_for_hole[name], interpreter, dict(counterexample), rng)
+            self.bottom_up[name].add_example(example)
+            # The enumeration continues with the new example, even if it was over without it.
+            if 3 in self.schedulers and self.schedulers[3].exhausted[name]:
+                self.schedulers[3].restart(name)
+        if self.sketch is not None:
+            self.sketch.add_example(counterexample)
 
     def synth_method_1(self, ) -> Mapping[str, Expression]:
         """
         Returns a map from each hole id in the program `self.ast`
         to an expression (method 1).
 
-        Performs DFS search of all expressions, up to a depth of 5. When depth is reached, doubles depth and tries again
-        This is not very efficient as it ends up generating the same expressions at low depths many times.
+        Performs DFS search of all expressions, up to a depth of 1. When depth is reached, increases the depth by one
+        and tries again with only the expressions that are deeper than the previous depth. The expressions of the holes are
+        combined by a `JointScheduler`. An expression is skipped if it has the same canonical form as a previous
+        one (see `synthesis/canonical.py`), e.g. `y + x` after `x + y`. The integer constants are not enumerated,
+        they are found by the solver for each template (see `synthesis/constants.py`).
         """
-        ans = {}
-        for h in self.ast.holes:
-            if h.var.name not in self.generator_states.keys():
-                self.generator_states[h.var.name] = self.generate_assignments(h, self.do_derivation_1)
-            ans = dict(ans, **self.get_next_assignment(self.ast.holes[0], self.do_derivation_1))
-
-        return ans
+        holes = {h.var.name: h for h in self.ast.holes}
+        return self.next_with_constants(1, self.scheduler(1, lambda h: canonical_stream(
+            self.deepening(holes[h], self.do_derivation_1))))
 
     def synth_method_2(self, ) -> Mapping[str, Expression]:
         """
@@ -251,22 +395,50 @@ class Synthesizer():
         to an expression (method 2).
 
         Reversed the order of expression expansion compared to synth_method_1. May perform differently in some cases
+        Expressions are pruned by canonical form and constants are found by the solver like in method 1.
         """
-        ans = {}
-        for h in self.ast.holes:
-            if h.var.name not in self.generator_states.keys():
-                self.generator_states[h.var.name] = self.generate_assignments(h, self.do_derivation_2)
-            ans = dict(ans, **self.get_next_assignment(self.ast.holes[0], self.do_derivation_2))
-
-        return ans
+        holes = {h.var.name: h for h in self.ast.holes}
+        return self.next_with_constants(2, self.scheduler(2, lambda h: canonical_stream(
+            self.deepening(holes[h], self.do_derivation_2))))
 
     def synth_method_3(self, ) -> Mapping[str, Expression]:
         """
         Returns a map from each hole id in the program `self.ast`
         to an expression (method 3).
 
-        Ran out of time unfortunately, but would have liked to try putting all grammars in Chomsky Normal Form
-        to guarantee we dont generate the same expression multiple times, and to to implement a BFS instead of DFS.
-        This should have generated smaller, simpler expressions first, which would probably be more likely to be correct
+        Enumerates bottom-up, by increasing size of expressions, using a `BottomUpEnumerator` for each hole.
+        Expressions that have the same values as a smaller expression on a set of example inputs are never
+        returned, which removes most of the semantically identical candidates (and all the candidates with the same
+        canonical form).
+        The counterexamples are added to the examples, and the enumeration continues with them from the current
+        size. With one hole, the expressions that are false on a counterexample are not returned.
+        """
+        return self.scheduler(3, lambda h: self.bottom_up[h].enumerate()).next_completion()
+
+    def synth_method_4(self, ) -> Mapping[str, Expression]:
+        """
+        Returns a map from each hole id in the program `self.ast`
+        to an expression (method 4).
+
+        Does not enumerate expressions: the grammars are unrolled into a formula, and z3 chooses hole completions
+        that are correct on all the counterexamples (see `synthesis/sketch.py`). Each call is one solver query
+        (more when the depth of the unrolled grammars is increased).
+        """
+        if self.sketch is None:
+            self.sketch = SketchSynthesizer(self.ast, self.vars_for_hole)
+            for counterexample in self.counterexamples:
+                self.sketch.add_example(counterexample)
+        return self.sketch.next_completion()
+
+    def synth_method_5(self, ) -> Mapping[str, Expression]:
+        """
+        Returns a map from each hole id in the program `self.ast`
+        to an expression (method 5).
+
+        Enumerates best-first, by increasing cost of the productions in the derivations, using a
+        `BestFirstEnumerator` for each hole (see `synthesis/weighted.py`). Expressions are pruned by canonical form
+        and constants are found by the solver like in method 1.
         """
-        return self.synth_method_2()
+        holes = {h.var.name: h for h in self.ast.holes}
+        return self.next_with_constants(5, self.scheduler(5, lambda h: canonical_stream(
+            BestFirstEnumerator(holes[h], self.vars_for_hole[h], self.costs).enumerate())))
@@ -0,0 +1,170 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file learns the costs of the productions used by the best-first
+enumerator (see `synthesis/weighted.py`) from problems that have already
+been solved.
+
+A corpus is a directory of Paddle files, where the solution of `foo.paddle`
+is in `foo.solution`, in the format printed by `main.py` (e.g. the output
+of `python main.py 1 foo.paddle > foo.solution`). The solution of each hole
+is parsed back into the derivation of the grammar of the hole, and each
+production is counted when it is chosen and when it could have been chosen
+(i.e. every time a rule that contains it is expanded). The cost of a
+production is the negative log of the (smoothed) frequency with which it
+is chosen.
+
+Usage: `python -m synthesis.training DIRECTORY COSTS_FILE`
+
+The costs are used by method 5 when `PADDLE_COSTS` is set to COSTS_FILE.
+"""
+import json
+import math
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+from lang.ast import *
+from lang.paddle import parse, parse_completion
+from synthesis.weighted import production_key
+
+SOLUTION_LINE = re.compile(r"The solution for (\S+) is (.*)")
+
+
+def read_solutions(prog: Program, path: Path) -> Dict[str, Expression]:
+    """Returns the expressions of the holes in a solution file, parsed in the context of the program."""
+    solutions = {}
+    holes = {h.var.name: h for h in prog.holes}
+    with open(path) as solution_file:
+        for line in solution_file:
+            match = SOLUTION_LINE.match(line.strip())
+            if match is not None and match.group(1) in holes:
+                solutions[match.group(1)] = parse_completion(prog, match.group(1), match.group(2))
+    return solutions
+
+
+class DerivationParser():
+    """
+    A DerivationParser finds the productions of a grammar that derive a
+    given expression.
+    """
+
+    def __init__(self, grammar: Grammar) -> None:
+        self.rules = {r.symbol.name: r for r in grammar.rules}
+        self.memo: Dict[Tuple[Expression, str], Optional[List[Tuple[ProductionRule, Expression]]]] = {}
+        self.in_progress: Set[Tuple[Expression, str]] = set()
+
+    def derive(self, ex: Expression, symbol: str) -> Optional[List[Tuple[ProductionRule, Expression]]]:
+        """
+        Returns the list of (rule, production) expanded to derive ex from the
+        symbol, or None if ex is not in the language of the symbol.
+        """
+        key = (ex, symbol)
+        if key in self.memo:
+            return self.memo[key]
+        # A cycle of rules like G -> H, H -> G cannot derive anything new.
+        if key in self.in_progress:
+            return None
+        self.in_progress.add(key)
+        rule = self.rules[symbol]
+        result = None
+        for production in rule.productions:
+            steps = self.match(production, ex, rule.symbol.type)
+            if steps is not None:
+                result = [(rule, production)] + steps
+                break
+        self.in_progress.remove(key)
+        self.memo[key] = result
+        return result
+
+    def match(self, pattern: Expression, ex: Expression,
+              symbol_type: PaddleType) -> Optional[List[Tuple[ProductionRule, Expression]]]:
+        """Returns the expansions needed to derive ex with the production pattern, or None."""
+        if isinstance(pattern, VarExpr) and pattern.var.name in self.rules:
+            return self.derive(ex, pattern.var.name)
+        if isinstance(pattern, GrammarVar):
+            return [] if isinstance(ex, VarExpr) and ex.var.type == symbol_type else None
+        if isinstance(pattern, GrammarInteger):
+            # Negative constants are printed as -c, which is parsed as - c.
+            if isinstance(ex, UnaryExpr) and ex.operator == UnaryOperator.NEG:
+                ex = ex.operand
+            return [] if isinstance(ex, IntConst) else None
+        if isinstance(pattern, VarExpr):
+            return [] if isinstance(ex, VarExpr) and ex.name == pattern.name else None
+        if type(pattern) != type(ex):
+            return None
+        if isinstance(pattern, (IntConst, BoolConst)):
+            return [] if pattern.value == ex.value else None
+        if isinstance(pattern, (BinaryExpr, UnaryExpr)) and pattern.operator != ex.operator:
+            return None
+        steps = []
+        for sub_pattern, sub_ex in zip(expression_children(pattern), expression_children(ex)):
+            sub_steps = self.match(sub_pattern, sub_ex, symbol_type)
+            if sub_steps is None:
+                return None
+            steps += sub_steps
+        return steps
+
+
+def expression_children(ex: Expression) -> List[Expression]:
+    return [child for child in ex.children() if isinstance(child, Expression)]
+
+
+class ProductionCounter():
+    """Counts how many times each production is chosen, and how many times it could have been chosen."""
+
+    def __init__(self) -> None:
+        self.chosen: Counter = Counter()
+        self.offered: Counter = Counter()
+        self.solutions = 0
+
+    def add(self, hole: HoleDeclaration, solution: Expression) -> bool:
+        """Counts the productions of the derivation of the solution. Returns false if there is none."""
+        steps = DerivationParser(hole.grammar).derive(solution, hole.grammar.rules[0].symbol.name)
+        if steps is None:
+            return False
+        nonterminals = {r.symbol.name for r in hole.grammar.rules}
+        for rule, production in steps:
+            self.chosen[production_key(production, nonterminals)] += 1
+            for other in rule.productions:
+                self.offered[production_key(other, nonterminals)] += 1
+        self.solutions += 1
+        return True
+
+    def costs(self) -> Dict[str, float]:
+        """Returns the cost of each production, with add-one smoothing."""
+        return {key: round(-math.log((self.chosen[key] + 1) / (self.offered[key] + 2)), 4)
+                for key in sorted(self.offered)}
+
+
+def train(directory: Path) -> ProductionCounter:
+    """Counts the productions in the solutions of the Paddle files of the directory (and its subdirectories)."""
+    counter = ProductionCounter()
+    for paddle_file in sorted(Path(directory).glob("**/*.paddle")):
+        solution_file = paddle_file.with_suffix(".solution")
+        if not solution_file.exists():
+            continue
+        prog = parse(str(paddle_file))
+        solutions = read_solutions(prog, solution_file)
+        for hole in prog.holes:
+            if hole.var.name in solutions and not counter.add(hole, solutions[hole.var.name]):
+                print(f"The solution of {hole.var.name} in {solution_file} is not derived by its grammar.")
+    return counter
+
+
+def save_costs(costs: Mapping[str, float], path: Path) -> None:
+    with open(path, "w") as costs_file:
+        json.dump(costs, costs_file, indent=0, sort_keys=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 2:
+        print("Usage: python -m synthesis.training DIRECTORY COSTS_FILE")
+        print("Method 5 uses the costs when PADDLE_COSTS is set to COSTS_FILE.")
+        sys.exit(-1)
+    output = Path(sys.argv[2])
+    counter = train(Path(sys.argv[1]))
+    save_costs(counter.costs(), output)
+    print(f"Learned the costs of {len(counter.offered)} productions from {counter.solutions} solutions in {output}.")
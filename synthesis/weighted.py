@@ -0,0 +1,176 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the BestFirstEnumerator class, which enumerates the
+expressions of a grammar by increasing cost instead of increasing depth.
+
+Each production has a cost (e.g. the negative log of its probability of
+appearing in a solution), and the cost of an expression is the sum of the
+costs of the productions in its derivation. The partial derivations are
+kept in a priority queue, ordered by their cost plus the minimum cost of
+completing their nonterminals (an A* search), so that the cheapest, most
+likely, expressions are returned first.
+
+The costs are looked up by the shape of the production, where the
+nonterminals are replaced by `_` (e.g. `(_ + _)`, `Var` or `Integer`), so
+the same costs can be used for the grammars of different programs.
+They are read from the file given by the `PADDLE_COSTS` environment
+variable (e.g. learned by `synthesis/training.py`); without it, every
+production has the same cost.
+"""
+import heapq
+import json
+import os
+from itertools import count, product
+from typing import Dict, Iterator, List, Mapping, Optional, Set
+from lang.ast import *
+from synthesis.grammar_analysis import GrammarAnalysis
+
+# The cost of the productions that have no cost in the configuration.
+DEFAULT_COST = 1.0
+# The file where the costs are read from, if any.
+COSTS_FILE = os.environ.get("PADDLE_COSTS")
+# The placeholder of the nonterminals in the keys of the productions.
+NONTERMINAL = VarExpr(Variable("_", PaddleType.INT))
+
+
+def load_costs(path: Optional[str] = COSTS_FILE) -> Dict[str, float]:
+    """Returns the costs of the productions in the file, or no costs if the path is None or empty."""
+    if not path:
+        return {}
+    with open(path) as costs_file:
+        return {key: float(cost) for key, cost in json.load(costs_file).items()}
+
+
+def replace_nonterminals(ex: Expression, nonterminals: Set[str], replace) -> Expression:
+    """Returns the expression where each nonterminal n is replaced by replace(n)."""
+    if isinstance(ex, VarExpr) and ex.var.name in nonterminals:
+        return replace(ex)
+    if isinstance(ex, BinaryExpr):
+        left = replace_nonterminals(ex.left_operand, nonterminals, replace)
+        return BinaryExpr(ex.operator, left, replace_nonterminals(ex.right_operand, nonterminals, replace))
+    if isinstance(ex, UnaryExpr):
+        return UnaryExpr(ex.operator, replace_nonterminals(ex.operand, nonterminals, replace))
+    if isinstance(ex, Ite):
+        cond = replace_nonterminals(ex.cond, nonterminals, replace)
+        true_br = replace_nonterminals(ex.true_br, nonterminals, replace)
+        return Ite(cond, true_br, replace_nonterminals(ex.false_br, nonterminals, replace))
+    return ex
+
+
+def replace_vars(ex: Expression, variables: Iterator[Expression]) -> Expression:
+    """Returns the expression where each Var, from left to right, is replaced by the next variable."""
+    if isinstance(ex, GrammarVar):
+        return next(variables)
+    if isinstance(ex, BinaryExpr):
+        left = replace_vars(ex.left_operand, variables)
+        return BinaryExpr(ex.operator, left, replace_vars(ex.right_operand, variables))
+    if isinstance(ex, UnaryExpr):
+        return UnaryExpr(ex.operator, replace_vars(ex.operand, variables))
+    if isinstance(ex, Ite):
+        cond = replace_vars(ex.cond, variables)
+        true_br = replace_vars(ex.true_br, variables)
+        return Ite(cond, true_br, replace_vars(ex.false_br, variables))
+    return ex
+
+
+def production_key(production: Expression, nonterminals: Set[str]) -> str:
+    """Returns the key of a production in the costs, e.g. `(_ + _)` for `G + G`."""
+    return str(replace_nonterminals(production, nonterminals, lambda _: NONTERMINAL))
+
+
+def nonterminals_in(ex: Expression, nonterminals: Set[str]) -> List[str]:
+    """Returns the nonterminals of the expression, from left to right."""
+    if isinstance(ex, VarExpr):
+        return [ex.var.name] if ex.var.name in nonterminals else []
+    return [n for child in ex.children() if isinstance(child, Expression) for n in nonterminals_in(child, nonterminals)]
+
+
+class BestFirstEnumerator():
+    """
+    A BestFirstEnumerator generates the expressions of the grammar of a
+    hole by increasing cost. The `Integer` of the grammar are left in the
+    expressions, their values are found by the solver.
+    """
+
+    def __init__(self, hole: HoleDeclaration, available_vars: Set[Variable],
+                 costs: Optional[Mapping[str, float]] = None) -> None:
+        """
+        @param hole The hole declaration.
+        @param available_vars The variables that the hole can use.
+        @param costs The costs of the productions, by key (see `production_key`).
+        """
+        costs = load_costs() if costs is None else costs
+        self.start = hole.grammar.rules[0].symbol.name
+        self.symbols = {r.symbol.name: r.symbol for r in hole.grammar.rules}
+        nonterminals = set(self.symbols)
+        self.nonterminals = nonterminals
+        # The expansions of each nonterminal with their cost. The Var of a
+        # production are replaced directly by the variables of their type, and
+        # the productions that are ill-typed or derive nothing are left out.
+        analysis = GrammarAnalysis(hole.grammar, available_vars)
+        variables = {t: [VarExpr(v) for v in sorted(available_vars, key=lambda v: v.name) if v.type == t]
+                     for t in PaddleType}
+        self.expansions: Dict[str, List[tuple]] = {}
+        for rule in hole.grammar.rules:
+            expansions = []
+            for production in analysis.productions[rule.symbol.name]:
+                cost = costs.get(production_key(production, nonterminals), DEFAULT_COST)
+                for chosen in product(*[variables[t] for t in analysis.var_types[production]]):
+                    expansions.append((cost, replace_vars(production, iter(chosen))))
+            self.expansions[rule.symbol.name] = expansions
+        self.min_costs = self.minimum_costs()
+
+    def minimum_costs(self) -> Dict[str, float]:
+        """
+        Returns the minimum cost of an expression derived from each
+        nonterminal (infinite if there is none), computed by fixed point.
+        """
+        min_costs = {n: float("inf") for n in self.nonterminals}
+        changed = True
+        while changed:
+            changed = False
+            for n, expansions in self.expansions.items():
+                for cost, production in expansions:
+                    total = cost + sum(min_costs[m] for m in nonterminals_in(production, self.nonterminals))
+                    if total < min_costs[n]:
+                        min_costs[n] = total
+                        changed = True
+        return min_costs
+
+    def estimate(self, ex: Expression) -> float:
+        """Returns the minimum cost of completing the nonterminals of a partial derivation."""
+        return sum(self.min_costs[n] for n in nonterminals_in(ex, self.nonterminals))
+
+    def expand_first(self, ex: Expression, production: Expression) -> Expression:
+        """Returns the partial derivation where the leftmost nonterminal is replaced by the production."""
+        first = [True]
+
+        def replace(nonterminal: Expression) -> Expression:
+            if first[0]:
+                first[0] = False
+                return production
+            return nonterminal
+        return replace_nonterminals(ex, self.nonterminals, replace)
+
+    def enumerate(self) -> Iterator[Expression]:
+        """Generates the expressions of the grammar by increasing cost."""
+        if self.min_costs[self.start] == float("inf"):
+            return
+        # The queue contains (cost + estimate, tie breaker, cost, partial derivation).
+        tie_breaker = count()
+        root = VarExpr(self.symbols[self.start])
+        queue = [(self.min_costs[self.start], next(tie_breaker), 0.0, root)]
+        while len(queue) > 0:
+            _, _, cost, ex = heapq.heappop(queue)
+            remaining = nonterminals_in(ex, self.nonterminals)
+            if len(remaining) == 0:
+                yield ex
+                continue
+            for production_cost, production in self.expansions[remaining[0]]:
+                expanded = self.expand_first(ex, production)
+                estimate = self.estimate(expanded)
+                if estimate < float("inf"):
+                    new_cost = cost + production_cost
+                    heapq.heappush(queue, (new_cost + estimate, next(tie_breaker), new_cost, expanded))
@@ -28,6 +28,22 @@ from test.verif_test import *
 
 from test.enumerate_test import *
 from test.synth_test import *
+from test.bottom_up_test import *
+from test.interpreter_test import *
+from test.batch_interpreter_test import *
+from test.scheduler_test import *
+from test.canonical_test import *
+from test.constants_test import *
+from test.sketch_test import *
+from test.weighted_test import *
+from test.training_test import *
+from test.grammar_analysis_test import *
+from test.grammar_tables_test import *
+from test.cache_test import *
+from test.simplify_test import *
+from test.template_test import *
+from test.compiler_test import *
+from test.batch_test import *
 
 # You should also check on some input files that the correct
 # program is synthesized.
@@ -215,3 +215,32 @@ class TestAst(unittest.TestCase):
         self.assertTrue(isinstance(node, Node))
         for child in node.children():
             self.all_program_children_are_nodes(child)
+
+    def test_hash_consing(self):
+        x = Variable("x", PaddleType.INT)
+        y = Variable("x", PaddleType.INT)
+        e1 = Ite(BinaryExpr(BinaryOperator.GREATER, VarExpr(x), IntConst(0)), VarExpr(x),
+                 UnaryExpr(UnaryOperator.NEG, VarExpr(x)))
+        e2 = Ite(BinaryExpr(BinaryOperator.GREATER, VarExpr(x), IntConst(0)), VarExpr(x),
+                 UnaryExpr(UnaryOperator.NEG, VarExpr(x)))
+        # Structurally equal expressions are the same object.
+        self.assertIs(e1, e2)
+        self.assertIs(e1.true_br, e1.false_br.operand)
+        self.assertIs(VarExpr(x), VarExpr(var=x, name="x"))
+        self.assertEqual(len({e1, e2}), 1)
+        # Variables with the same name are different variables.
+        self.assertIsNot(VarExpr(x), VarExpr(y))
+        self.assertNotEqual(IntConst(1), IntConst(2))
+        self.assertNotEqual(IntConst(1), BoolConst(True))
+        self.assertNotEqual(BinaryExpr(BinaryOperator.PLUS, IntConst(1), IntConst(2)),
+                            BinaryExpr(BinaryOperator.MINUS, IntConst(1), IntConst(2)))
+
+    def test_parsed_expressions_are_shared(self):
+        # Parsing the same program twice does not change the variables of the first program.
+        filename = '%s/examples/max2.paddle' % Path(__file__).parent.parent.absolute()
+        first = parse(filename)
+        second = parse(filename)
+        self.assertIsNot(first.constraint, second.constraint)
+        for var in first.constraint.uses():
+            self.assertIn(var, first.declares())
+            self.assertNotIn(var, second.declares())
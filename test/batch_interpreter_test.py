@@ -0,0 +1,90 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the batch interpreter, which should give
+the same results as the concrete interpreter on every input.
+"""
+
+import os
+import unittest
+from pathlib import Path
+import numpy as np
+from lang.ast import *
+from lang.paddle import parse
+from lang.interpreter import Interpreter
+from lang.batch_interpreter import BatchInterpreter, Columns, random_inputs, to_columns
+from main import refuted
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+def points_of(columns: dict, size: int) -> list:
+    """Converts arrays of values to a list of inputs."""
+    return [{name: values[i].item() for name, values in columns.items()} for i in range(size)]
+
+
+class TestBatchInterpreter(unittest.TestCase):
+    def check_same_results(self, prog: Program, hole_defs: dict, columns: dict, size: int):
+        results = BatchInterpreter(hole_defs).evaluate(prog, columns)
+        self.assertEqual(results.shape, (size,))
+        self.assertEqual(results.dtype, np.bool_)
+        interpreter = Interpreter(hole_defs)
+        for i, point in enumerate(points_of(columns, size)):
+            self.assertEqual(bool(results[i]), bool(interpreter.evaluate(prog, point)), msg=f"on {point}")
+
+    def test_eval_examples(self):
+        examples_directory = f"{base_path}/examples/evaluation"
+        for filename in os.listdir(examples_directory):
+            if filename.endswith(".paddle"):
+                prog = parse(os.path.join(examples_directory, filename))
+                self.check_same_results(prog, {}, random_inputs(prog, 500, -20, 20), 500)
+
+    def test_division(self):
+        prog = parse(string="""
+        input x : int;
+        input y : int;
+        assert (x / y) * y + x % y = x && x % y >= 0;
+        """)
+        columns = random_inputs(prog, 1000, -10, 10)
+        self.check_same_results(prog, {}, columns, 1000)
+        results = BatchInterpreter({}).evaluate(prog, columns)
+        self.assertTrue(np.all(results | (columns["y"] == 0)))
+
+    def test_overflow(self):
+        # The values do not fit in int64, they should be computed exactly.
+        prog = parse(string="""
+        input x : int;
+        define y : int = x * x * x * x * x;
+        assert (y / x) / x = x * x * x && y - 1 < y;
+        """)
+        columns = to_columns(prog, [{"x": 100000}, {"x": -3000000}, {"x": 7}])
+        results = BatchInterpreter({}).evaluate(prog, columns)
+        self.assertTrue(np.all(results))
+
+    def test_holes(self):
+        prog = parse(f"{base_path}/examples/max2.paddle")
+        x = VarExpr(prog.inputs[0])
+        y = VarExpr(prog.inputs[1])
+        columns = random_inputs(prog, 200)
+        correct = Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)
+        self.assertTrue(np.all(BatchInterpreter({"hmax": correct}).evaluate(prog, columns)))
+        self.check_same_results(prog, {"hmax": x}, columns, 200)
+        self.assertFalse(np.all(BatchInterpreter({"hmax": x}).evaluate(prog, columns)))
+
+    def test_refuted(self):
+        # Checking many counterexamples at once gives the same result as
+        # checking them one by one.
+        prog = parse(f"{base_path}/examples/max2.paddle")
+        x = VarExpr(prog.inputs[0])
+        counterexamples = points_of(random_inputs(prog, 100, -5, 5), 100)
+        columns = Columns(prog)
+        for n in [1, 10, 20, 100]:
+            self.assertEqual(refuted(prog, {"hmax": x}, counterexamples[:n]),
+                             any(cex["y"] > cex["x"] for cex in counterexamples[:n]))
+            self.assertEqual(refuted(prog, {"hmax": x}, counterexamples[:n], columns),
+                             any(cex["y"] > cex["x"] for cex in counterexamples[:n]))
+        # The columns are converted again when counterexamples are added.
+        counterexamples.append({"x": 2 ** 70, "y": 2 ** 70 + 1})
+        self.assertEqual(columns.of(counterexamples)["x"].size, 101)
+        self.assertTrue(refuted(prog, {"hmax": x}, counterexamples, columns))
@@ -0,0 +1,91 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the synthesis of many files at once.
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import batch
+from batch import problem_files, run, solve_file
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+def solve_or_crash(method_num, filename, *args):
+    """Kills the worker process on the files named crash.paddle."""
+    if filename.endswith("crash.paddle"):
+        os._exit(1)
+    return solve_file(method_num, filename, *args)
+
+
+class TestBatch(unittest.TestCase):
+    def test_problem_files(self):
+        directory = f"{base_path}/examples"
+        files = problem_files(directory)
+        self.assertIn(f"{directory}/max2.paddle", files)
+        # The subdirectories are included.
+        self.assertTrue(any(f.startswith(f"{directory}/evaluation/") for f in files))
+        self.assertEqual(problem_files(f"{directory}/max*.paddle"),
+                         [f"{directory}/max2.paddle", f"{directory}/max3.paddle"])
+
+    def test_solve_file(self):
+        result = solve_file(1, f"{base_path}/examples/max2.paddle", None)
+        self.assertIsNotNone(result["solution"])
+        self.assertIn("hmax", result["solution"])
+        self.assertFalse(result["cached"])
+        self.assertGreaterEqual(result["candidates"], result["iterations"])
+        self.assertGreater(result["iterations"], 0)
+        self.assertGreaterEqual(result["wall_time"], result["solver_time"])
+        # An error is reported in the result.
+        result = solve_file(1, f"{base_path}/examples/missing.paddle", None)
+        self.assertIn("FileNotFoundError", result["error"])
+
+    def test_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = solve_file(1, f"{base_path}/examples/max2.paddle", directory)
+            second = solve_file(1, f"{base_path}/examples/max2.paddle", directory)
+        self.assertTrue(second["cached"])
+        self.assertEqual(first["solution"], second["solution"])
+
+    def test_run(self):
+        files = [f"{base_path}/examples/max2.paddle", f"{base_path}/examples/abs.paddle",
+                 f"{base_path}/examples/missing.paddle"]
+        output = io.StringIO()
+        self.assertEqual(run(1, files, 2, output, None), 2)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted(r["file"] for r in results), sorted(files))
+        for result in results:
+            self.assertEqual("error" in result, os.path.basename(result["file"]) == "missing.paddle")
+
+    def test_timeout(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "square.paddle")
+            with open(filename, "w") as f:
+                # There is no solution in the grammar, and it is infinite.
+                f.write("input x : int;\nhole h : int [G : int -> G + G | Var];\nassert h = x * x;\n")
+            result = solve_file(1, filename, None, 0.5)
+        self.assertIn("Timeout", result["error"])
+        self.assertLess(result["wall_time"], 30)
+
+    def test_broken_pool(self):
+        # The files that were not solved when a worker died are solved again.
+        files = [f"{base_path}/examples/max2.paddle", f"{base_path}/examples/crash.paddle",
+                 f"{base_path}/examples/abs.paddle"]
+        output = io.StringIO()
+        with mock.patch.object(batch, "solve_file", solve_or_crash):
+            self.assertEqual(run(1, files, 2, output, None), 2)
+        results = {json.loads(line)["file"]: json.loads(line) for line in output.getvalue().splitlines()}
+        self.assertEqual(sorted(results), sorted(files))
+        self.assertIn("BrokenProcessPool", results[files[1]]["error"])
+        self.assertIsNotNone(results[files[0]]["solution"])
+
+
+if __name__ == '__main__':
+    unittest.main()
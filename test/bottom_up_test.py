@@ -0,0 +1,105 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the bottom-up enumerator.
+"""
+
+import unittest
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from synthesis.bottom_up import BottomUpEnumerator, sample_examples
+from synthesis.synth import Synthesizer
+from main import refuted
+from test.synth_test import main_loop_synth_check
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+def enumerator_for(filename: str) -> BottomUpEnumerator:
+    prog = parse(f"{base_path}/examples/{filename}")
+    hole = prog.holes[0]
+    available_vars = prog.hole_can_use(hole.var.name)
+    return BottomUpEnumerator(hole, available_vars, sample_examples(prog, available_vars))
+
+
+class TestBottomUp(unittest.TestCase):
+    def test_sizes_increase(self):
+        enumerator = enumerator_for("sum3.paddle")
+        sizes = []
+        for i, ex in enumerate(enumerator.enumerate()):
+            sizes.append(enumerator.count_nodes(ex))
+            if i > 200:
+                break
+        self.assertEqual(sizes, sorted(sizes))
+        self.assertEqual(sizes[0], 1)
+
+    def test_no_equivalent_expressions(self):
+        enumerator = enumerator_for("max3.paddle")
+        signatures = set()
+        for i, ex in enumerate(enumerator.enumerate()):
+            signature = enumerator.signature(enumerator.values_of(ex))
+            self.assertNotIn(signature, signatures, msg=f"{ex} is equivalent to a previous expression.")
+            signatures.add(signature)
+            if i > 500:
+                break
+
+    def test_pruning(self):
+        # x + y and y + x compute the same thing, only one of them is kept.
+        enumerator = enumerator_for("sum2.paddle")
+        generated = []
+        for ex in enumerator.enumerate():
+            if enumerator.size > 3:
+                break
+            generated.append(str(ex))
+        self.assertIn("(x + y)", generated)
+        self.assertNotIn("(y + x)", generated)
+
+    def test_finite_grammar(self):
+        prog = parse(string="""
+        input x : bool;
+        hole h : bool [ B : bool -> ! V | V; V : bool -> Var | True ];
+        assert (h = x);
+        """)
+        hole = prog.holes[0]
+        available_vars = prog.hole_can_use("h")
+        enumerator = BottomUpEnumerator(hole, available_vars, sample_examples(prog, available_vars))
+        generated = [str(ex) for ex in enumerator.enumerate()]
+        self.assertEqual(sorted(generated), sorted(["x", "True", "(! x)", "(! True)"]))
+
+    def test_method_3_synth(self):
+        for filename in ["abs_tern.paddle", "max2.paddle", "xor.paddle"]:
+            self.assertTrue(main_loop_synth_check(3, f"{base_path}/examples/{filename}"),
+                            msg=f"Method 3 failed to synthesize a solution for {filename}.")
+
+    def test_counterexample(self):
+        # After a counterexample is added the enumeration continues, and the
+        # expressions that have already been generated are not generated again.
+        prog = parse(f"{base_path}/examples/sum3.paddle")
+        synt = Synthesizer(prog)
+        first = [synt.synth_method_3() for _ in range(10)]
+        synt.add_counterexample({"x": 3, "y": 5, "z": -2})
+        size = synt.bottom_up["h"].size
+        second = [synt.synth_method_3() for _ in range(10)]
+        self.assertEqual(len({str(c["h"]) for c in first + second}), 20)
+        # From the next size on, the completions that are false on the counterexample are not generated.
+        while synt.bottom_up["h"].size <= size + 1:
+            completion = synt.synth_method_3()
+            if synt.bottom_up["h"].size > size:
+                self.assertFalse(refuted(prog, completion, synt.counterexamples), msg=f"{completion}")
+
+    def test_add_example(self):
+        # The banks are evaluated on the new example, the enumeration does not restart.
+        enumerator = enumerator_for("sum3.paddle")
+        stream = enumerator.enumerate()
+        for _ in range(50):
+            next(stream)
+        size = enumerator.size
+        enumerator.add_example({"x": 3, "y": 5, "z": -2})
+        next(stream)
+        self.assertGreaterEqual(enumerator.size, size)
+        for nonterminal, bank in enumerator.bank.items():
+            for entries in bank.values():
+                for ex, values in entries:
+                    self.assertEqual(values, enumerator.values_of(ex))
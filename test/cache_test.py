@@ -0,0 +1,96 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the cache of solutions.
+"""
+
+import json
+import tempfile
+import unittest
+from lang.ast import *
+from lang.paddle import parse, parse_completion
+from synthesis.cache import SolutionCache, deserialize, program_hash, serialize
+
+MAX = """
+input x : int;
+input y : int;
+hole h : int [ G : int -> Var | G > G ? G : G ];
+assert h >= x && h >= y && (h = x || h = y);
+"""
+
+
+class TestSolutionCache(unittest.TestCase):
+    def solution(self, prog: Program, text: str) -> dict:
+        return {"h": parse_completion(prog, "h", text)}
+
+    def test_hash_ignores_formatting(self):
+        reformatted = MAX.replace("\n", "\n\n").replace(" ? ", "?")
+        self.assertEqual(program_hash(parse(string=MAX)), program_hash(parse(string=reformatted)))
+        other = MAX.replace("h >= y", "h > y")
+        self.assertNotEqual(program_hash(parse(string=MAX)), program_hash(parse(string=other)))
+
+    def test_hash_nested_conditionals(self):
+        # The two constraints are printed the same, but are different.
+        program = """
+        input a : bool; input b : bool; input c : bool;
+        hole h : bool [B : bool -> Var];
+        assert %s;
+        """
+        first = parse(string=program % "(a ? b : c) ? h : a")
+        second = parse(string=program % "a ? b : (c ? h : a)")
+        self.assertEqual(str(first), str(second))
+        self.assertNotEqual(program_hash(first), program_hash(second))
+
+    def test_serialize(self):
+        prog = parse(string=MAX)
+        variables = {v.name: v for v in prog.hole_can_use("h")}
+        completion = parse_completion(prog, "h", "(x > y) ? x : ((y < 0) ? -1 : y)")
+        data = json.loads(json.dumps(serialize(completion)))
+        self.assertEqual(serialize(deserialize(data, variables)), data)
+        # The completion uses the variables of the program.
+        self.assertEqual(deserialize(data, variables).uses(), set(variables.values()))
+        # A completion can only use the variables of the hole, with their types.
+        with self.assertRaises(ValueError):
+            deserialize(serialize(completion), {"x": variables["x"]})
+        with self.assertRaises(ValueError):
+            deserialize(["VarExpr", ["Variable", "x", ["PaddleType", "BOOL"]], "x"], variables)
+        with self.assertRaises(ValueError):
+            deserialize(["GrammarInteger"], variables)
+
+    def test_store_and_lookup(self):
+        prog = parse(string=MAX)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SolutionCache(directory)
+            self.assertIsNone(cache.lookup(prog))
+            cache.store(prog, self.solution(prog, "(x > y) ? x : y"), 1)
+            # The program is parsed again, as in a new run.
+            cached = cache.lookup(parse(string=MAX))
+            self.assertEqual(str(cached["h"]), "(x > y) ? x : y")
+            # The solution is returned whatever the method that found it.
+            with open(cache.path(prog)) as entry_file:
+                self.assertEqual(json.load(entry_file)["method"], 1)
+
+    def test_invalid_entries(self):
+        prog = parse(string=MAX)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SolutionCache(directory)
+            # A wrong solution is verified again and ignored.
+            cache.store(prog, self.solution(prog, "x"), 1)
+            self.assertIsNone(cache.lookup(prog))
+            with open(cache.path(prog), "w") as entry_file:
+                json.dump({"holes": {"h": "x +"}}, entry_file)
+            self.assertIsNone(cache.lookup(prog))
+            with open(cache.path(prog), "w") as entry_file:
+                json.dump({"holes": {"h": ["Variable", "x", ["PaddleType", "INT"]]}}, entry_file)
+            self.assertIsNone(cache.lookup(prog))
+
+    def test_disabled(self):
+        prog = parse(string=MAX)
+        cache = SolutionCache("")
+        cache.store(prog, self.solution(prog, "(x > y) ? x : y"), 1)
+        self.assertIsNone(cache.lookup(prog))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the canonical form of expressions.
+"""
+
+import unittest
+from pathlib import Path
+from random import Random
+from lang.ast import *
+from lang.paddle import parse
+from lang.interpreter import Interpreter
+from synthesis.canonical import canonicalize
+from synthesis.synth import Synthesizer
+
+base_path = Path(__file__).parent.parent.absolute()
+
+x_var = Variable("x", PaddleType.INT)
+y_var = Variable("y", PaddleType.INT)
+b_var = Variable("b", PaddleType.BOOL)
+x = VarExpr(x_var)
+y = VarExpr(y_var)
+b = VarExpr(b_var)
+
+
+def binary(op: BinaryOperator, left: Expression, right: Expression) -> Expression:
+    return BinaryExpr(op, left, right)
+
+
+class TestCanonical(unittest.TestCase):
+    def test_commutativity(self):
+        self.assertIs(canonicalize(binary(BinaryOperator.PLUS, x, y)),
+                      canonicalize(binary(BinaryOperator.PLUS, y, x)))
+        self.assertIs(canonicalize(binary(BinaryOperator.GREATER, x, y)),
+                      canonicalize(binary(BinaryOperator.LESSTHAN, y, x)))
+        self.assertIsNot(canonicalize(binary(BinaryOperator.MINUS, x, y)),
+                         canonicalize(binary(BinaryOperator.MINUS, y, x)))
+
+    def test_identities(self):
+        self.assertIs(canonicalize(binary(BinaryOperator.PLUS, x, IntConst(0))), x)
+        self.assertIs(canonicalize(binary(BinaryOperator.TIMES, IntConst(1), x)), x)
+        self.assertIs(canonicalize(binary(BinaryOperator.TIMES, y, IntConst(0))), IntConst(0))
+        self.assertIs(canonicalize(binary(BinaryOperator.MINUS, x, x)), IntConst(0))
+        self.assertIs(canonicalize(binary(BinaryOperator.AND, BoolConst(True), b)), b)
+        self.assertIs(canonicalize(binary(BinaryOperator.OR, b, BoolConst(True))), BoolConst(True))
+        self.assertIs(canonicalize(UnaryExpr(UnaryOperator.NOT, UnaryExpr(UnaryOperator.NOT, b))), b)
+        self.assertIs(canonicalize(binary(BinaryOperator.PLUS, IntConst(2), IntConst(3))), IntConst(5))
+        # The division by zero is unspecified, it is not folded.
+        zero_div = binary(BinaryOperator.DIV, IntConst(2), IntConst(0))
+        self.assertIs(canonicalize(zero_div), zero_div)
+
+    def test_ite(self):
+        self.assertIs(canonicalize(Ite(b, x, x)), x)
+        self.assertIs(canonicalize(Ite(BoolConst(False), x, y)), y)
+        self.assertIs(canonicalize(Ite(UnaryExpr(UnaryOperator.NOT, b), x, y)), Ite(b, y, x))
+        self.assertIs(canonicalize(Ite(binary(BinaryOperator.GREATER_EQ, x, y), x, y)),
+                      canonicalize(Ite(binary(BinaryOperator.LESSTHAN, x, y), y, x)))
+
+    def test_equivalent(self):
+        # The canonical form of the enumerated expressions is equivalent to them, and canonical.
+        rng = Random(410)
+        for filename in ["max2.paddle", "xor.paddle", "sum3.paddle"]:
+            prog = parse(f"{base_path}/examples/{filename}")
+            synt = Synthesizer(prog)
+            interpreter = Interpreter({})
+            for _ in range(500):
+                ex = synt.synth_method_2()[prog.holes[0].var.name]
+                canonical = canonicalize(ex)
+                self.assertIs(canonicalize(canonical), canonical)
+                for _ in range(10):
+                    env = {v.name: rng.random() < 0.5 if v.type == PaddleType.BOOL else rng.randint(-5, 5)
+                           for v in prog.inputs}
+                    self.assertEqual(interpreter.evaluate_expr(env, ex), interpreter.evaluate_expr(env, canonical),
+                                     msg=f"{ex} and {canonical} on {env}")
+
+    def test_pruning(self):
+        # Method 1 returns only one of x + y and y + x, and one of x + 0, 0 + x and x.
+        prog = parse(f"{base_path}/examples/sum2.paddle")
+        synt = Synthesizer(prog)
+        completions = [str(synt.synth_method_1()["h"]) for _ in range(300)]
+        self.assertEqual(len([c for c in completions if c in ["(x + y)", "(y + x)"]]), 1)
+        self.assertEqual(len([c for c in completions if c in ["(x + 0)", "(0 + x)", "x"]]), 1)
@@ -0,0 +1,98 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the compilation of expressions and
+programs to Python functions, which should give the same results as the
+concrete interpreter on every input.
+"""
+
+import os
+import unittest
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from lang.compiler import compile_expr, compile_program
+from lang.interpreter import Interpreter
+from lang.batch_interpreter import random_inputs
+from lang.symb_eval import EvaluationTypeError, Evaluator
+from main import refuted
+from test.batch_interpreter_test import points_of
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+class TestCompiler(unittest.TestCase):
+    def check_same_results(self, prog: Program, hole_defs: dict, size: int = 300):
+        program = compile_program(prog, hole_defs)
+        interpreter = Interpreter(hole_defs)
+        for point in points_of(random_inputs(prog, size, -20, 20), size):
+            expected = interpreter.evaluate(prog, point)
+            result = program(point)
+            self.assertEqual(result, expected, msg=f"on {point}")
+            self.assertIs(type(result), type(expected))
+
+    def test_eval_examples(self):
+        examples_directory = f"{base_path}/examples/evaluation"
+        for filename in os.listdir(examples_directory):
+            if filename.endswith(".paddle"):
+                self.check_same_results(parse(os.path.join(examples_directory, filename)), {})
+
+    def test_division(self):
+        prog = parse(string="""
+        input x : int;
+        input y : int;
+        assert (x / y) * y + x % y = x && x % y >= 0 && (y = 0 || x / (- y) = - (x / y));
+        """)
+        self.check_same_results(prog, {}, 1000)
+
+    def test_holes(self):
+        prog = parse(f"{base_path}/examples/max2.paddle")
+        x = VarExpr(prog.inputs[0])
+        y = VarExpr(prog.inputs[1])
+        for completion in [x, Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y), UnaryExpr(UnaryOperator.ABS, y)]:
+            self.check_same_results(prog, {"hmax": completion})
+        with self.assertRaises(KeyError):
+            compile_program(prog, {})
+
+    def test_names(self):
+        # The names of the variables are not Python names.
+        prog = parse(string="""
+        input lambda : int;
+        input inputs : bool;
+        define t0 : int = lambda * 2;
+        define def : bool = inputs && t0 > lambda;
+        assert def || ! inputs || lambda <= 0;
+        """)
+        self.check_same_results(prog, {})
+
+    def test_expressions(self):
+        x = Variable("x", PaddleType.INT)
+        # A deep expression is split into statements.
+        deep = VarExpr(x)
+        for i in range(500):
+            deep = BinaryExpr(BinaryOperator.MINUS, IntConst(i), deep)
+        self.assertEqual(compile_expr(deep, ("x",))(3), Interpreter({}).evaluate_expr({"x": 3}, deep))
+        # The shared subexpressions are evaluated once.
+        prog = parse(string="input x : int;\n" + "\n".join(
+            f"define d{i} : int = {'x' if i == 0 else f'd{i - 1}'} + {'x' if i == 0 else f'd{i - 1}'};"
+            for i in range(100)) + "\nassert d99 > x;")
+        formula = Evaluator({}).evaluate(prog)
+        self.assertTrue(compile_expr(formula, ("x",))(1))
+        self.assertFalse(compile_expr(formula, ("x",))(-1))
+        self.assertIs(compile_expr(formula, ("x",)), compile_expr(formula, ("x",)))
+        self.assertIs(compile_expr(BinaryExpr(BinaryOperator.DIV, IntConst(7), IntConst(0)))(), 0)
+        with self.assertRaises(EvaluationTypeError):
+            compile_expr(deep)
+
+    def test_refuted(self):
+        # The candidates that are true on the first counterexamples are compiled.
+        prog = parse(f"{base_path}/examples/max2.paddle")
+        x = VarExpr(prog.inputs[0])
+        counterexamples = [{"x": 1, "y": 0}] * 20 + [{"x": 0, "y": 1}]
+        self.assertTrue(refuted(prog, {"hmax": x}, counterexamples))
+        self.assertFalse(refuted(prog, {"hmax": x}, counterexamples[:20]))
+
+
+if __name__ == '__main__':
+    unittest.main()
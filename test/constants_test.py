@@ -0,0 +1,128 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the synthesis of integer constants.
+"""
+
+import unittest
+from lang.ast import *
+from lang.paddle import parse
+from lang.symb_eval import Evaluator
+from synthesis.canonical import canonicalize
+from synthesis.constants import has_integer_hole, replace_integers, solve_constants
+from synthesis.scheduler import Exhausted
+from synthesis.synth import Synthesizer
+from verification.verifier import is_valid
+
+x_var = Variable("x", PaddleType.INT)
+x = VarExpr(x_var)
+
+
+def solve(prog: Program, method: int) -> dict:
+    synt = Synthesizer(prog)
+    for _ in range(200):
+        try:
+            completions = synt.synth_method_1() if method == 1 else synt.synth_method_2()
+        except Exhausted:
+            return None
+        if is_valid(Evaluator(completions).evaluate(prog)):
+            return completions
+    return {}
+
+
+class TestConstants(unittest.TestCase):
+    def test_replace_integers(self):
+        template = BinaryExpr(BinaryOperator.MINUS, GrammarInteger(), BinaryExpr(BinaryOperator.TIMES, x, GrammarInteger()))
+        self.assertTrue(has_integer_hole(template))
+        replaced = replace_integers(template, iter([IntConst(3), IntConst(4)]))
+        self.assertFalse(has_integer_hole(replaced))
+        self.assertEqual(str(replaced), "(3 - (x * 4))")
+
+    def test_templates_are_not_simplified(self):
+        # Two Integer are different constants.
+        template = BinaryExpr(BinaryOperator.MINUS, GrammarInteger(), GrammarInteger())
+        self.assertIsNot(canonicalize(template), IntConst(0))
+
+    def test_solve_constants(self):
+        prog = parse(string="""
+        input x : int;
+        hole h : int [G : int -> G + G | G * G | Var | Integer];
+        assert h = 3 * x + 1234;
+        """)
+        template = BinaryExpr(BinaryOperator.PLUS, BinaryExpr(BinaryOperator.TIMES, GrammarInteger(), x),
+                              GrammarInteger())
+        result = solve_constants(prog, {"h": template}, [])
+        self.assertEqual(str(result.completions["h"]), "((3 * x) + 1234)")
+        self.assertFalse(result.unresolved)
+        self.assertGreater(result.queries, 0)
+        # There are no constants for a template that does not use x.
+        result = solve_constants(prog, {"h": GrammarInteger()}, [{"x": 0}])
+        self.assertIsNone(result.completions)
+        self.assertFalse(result.unresolved)
+
+    def test_unresolved(self):
+        prog = parse(string="""
+        input x : int;
+        hole h : int [G : int -> G + G | G * G | Var | Integer];
+        assert x > 0 || h = 1234;
+        """)
+        template = BinaryExpr(BinaryOperator.TIMES, GrammarInteger(), x)
+        # Without examples, the constants are found on any input, and the
+        # counterexamples of the verifier are returned.
+        result = solve_constants(prog, {"h": template}, [], rounds=1)
+        self.assertIsNone(result.completions)
+        self.assertTrue(result.unresolved)
+        self.assertEqual(len(result.counterexamples), 1)
+        # The synthesizer adds the counterexamples, and counts the queries.
+        synt = Synthesizer(prog)
+        for _ in range(50):
+            try:
+                completions = synt.synth_method_1()
+            except Exhausted:
+                break
+            if is_valid(Evaluator(completions).evaluate(prog)):
+                break
+        self.assertGreater(synt.constant_queries, 0)
+        self.assertGreater(len(synt.counterexamples), 0)
+
+    def test_large_constants(self):
+        # The constants are out of the range that was enumerated.
+        prog = parse(string="""
+        input x : int;
+        hole h : int [G : int -> G + G | Var | Integer];
+        assert h = x + 1234;
+        """)
+        for method in [1, 2]:
+            completions = solve(prog, method)
+            self.assertIn("h", completions)
+            self.assertTrue(is_valid(Evaluator(completions).evaluate(prog)))
+
+    def test_no_solution(self):
+        prog = parse(string="""
+        input x : int;
+        hole h : int [G : int -> Integer];
+        assert h = x;
+        """)
+        for method in [1, 2]:
+            self.assertIsNone(solve(prog, method))
+
+    def test_typed_vars(self):
+        # Var is only completed with variables of the type of the symbol.
+        prog = parse(string="""
+        input b : bool;
+        input x : int;
+        hole h : int [G : int -> G + G | Var];
+        assert h = x + x;
+        """)
+        synt = Synthesizer(prog)
+        for _ in range(20):
+            try:
+                completions = synt.synth_method_1()
+            except Exhausted:
+                break
+            self.assertTrue(all(v.type == PaddleType.INT for v in completions["h"].uses()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,6 +10,7 @@ from typing import Mapping
 from lang.ast import *
 from lang import paddle
 from pathlib import Path
+from synthesis.scheduler import Exhausted
 from synthesis.synth import Synthesizer
 import os
 
@@ -99,3 +100,31 @@ class TestEnumerator(unittest.TestCase):
 
             else:
                 continue
+
+    def test_no_repeated_completions(self):
+        # When the maximum depth increases, the expressions that were
+        # generated with the previous depth are not generated again.
+        base_path = Path(__file__).parent.parent.absolute()
+        for filename in ["max2.paddle", "xor.paddle"]:
+            for method in [Synthesizer.synth_method_1, Synthesizer.synth_method_2]:
+                s = Synthesizer(paddle.parse(f"{base_path}/examples/{filename}"))
+                completions = [str({h: str(e) for h, e in method(s).items()}) for _ in range(1000)]
+                self.assertEqual(len(completions), len(set(completions)),
+                                 msg=f"Some completions of {filename} were generated twice.")
+
+    def test_finite_grammar(self):
+        # All the expressions of a finite grammar are generated, and then
+        # there is no next program.
+        s = Synthesizer(paddle.parse(string="""
+        input x : bool;
+        hole h : bool [ B : bool -> ! V | V; V : bool -> Var | True ];
+        assert (h = x);
+        """))
+        completions = []
+        while True:
+            try:
+                completion = s.synth_method_1()
+            except Exhausted:
+                break
+            completions.append(str(completion["h"]))
+        self.assertEqual(sorted(completions), sorted(["x", "True", "(! x)", "(! True)"]))
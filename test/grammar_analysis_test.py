@@ -0,0 +1,101 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the static analysis of grammars.
+"""
+
+import unittest
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from synthesis.bottom_up import BottomUpEnumerator, sample_examples
+from synthesis.grammar_analysis import INFINITY, GrammarAnalysis
+from synthesis.synth import Synthesizer
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+def analyze(source: str) -> GrammarAnalysis:
+    prog = parse(string=source)
+    return GrammarAnalysis(prog.holes[0].grammar, prog.hole_can_use(prog.holes[0].var.name))
+
+
+def productions(analysis: GrammarAnalysis, symbol: str) -> list:
+    return [str(p) for p in analysis.productions[symbol]]
+
+
+class TestGrammarAnalysis(unittest.TestCase):
+    def test_types(self):
+        analysis = analyze("""
+        input x : int;
+        input b : bool;
+        hole h : int [
+            G : int -> G + G | B | B ? G : G | Var;
+            B : bool -> G > G | Var | ! G | True
+        ];
+        assert h = x;
+        """)
+        # B is not an int, and ! G is not well typed.
+        self.assertEqual(productions(analysis, "G"), ["(G + G)", "B ? G : G", "Var"])
+        self.assertEqual(productions(analysis, "B"), ["(G > G)", "Var", "True"])
+        var_types = {(str(analysis.types[p]), str(p)): ts for p, ts in analysis.var_types.items()}
+        self.assertEqual(var_types[("int", "Var")], [PaddleType.INT])
+        self.assertEqual(var_types[("bool", "Var")], [PaddleType.BOOL])
+
+    def test_productive_and_reachable(self):
+        analysis = analyze("""
+        input x : int;
+        hole h : int [
+            G : int -> G + H | G * G | Var;
+            H : int -> H + 1;
+            I : int -> 0
+        ];
+        assert h = x;
+        """)
+        self.assertEqual(analysis.productive, {"G", "I"})
+        self.assertEqual(analysis.reachable, {"G"})
+        self.assertEqual(productions(analysis, "G"), ["(G * G)", "Var"])
+
+    def test_var_without_variables(self):
+        # There is no boolean variable, so B can only be derived with a comparison.
+        analysis = analyze("""
+        input x : int;
+        hole h : bool [B : bool -> Var | B && B | G > G; G : int -> Var | G + 1];
+        assert h;
+        """)
+        self.assertEqual(productions(analysis, "B"), ["(B && B)", "(G > G)"])
+        self.assertEqual(analysis.min_depths, {"B": 3, "G": 1})
+        self.assertEqual(analysis.min_sizes, {"B": 3, "G": 1})
+
+    def test_synthesis_is_well_typed(self):
+        # The enumerators only use variables of the right type.
+        prog = parse(f"{base_path}/examples/obfuscated_1.paddle")
+        for method in [1, 2, 3, 5]:
+            # The counterexamples found for the constants of a method would change the completions of the others.
+            synt = Synthesizer(prog, {})
+            for _ in range(50):
+                completions = getattr(synt, f"synth_method_{method}")()
+                self.assertTrue(all(v.type == PaddleType.INT for v in completions["h"].uses()))
+
+    def test_pruning(self):
+        # H derives nothing, and B && B is never smaller than 7 nodes.
+        prog = parse(string="""
+        input x : int;
+        hole h : bool [B : bool -> B && B | G > G | H > G; G : int -> Var | G + 1; H : int -> H + 1];
+        assert h;
+        """)
+        hole = prog.holes[0]
+        enumerator = BottomUpEnumerator(hole, prog.hole_can_use("h"), sample_examples(prog, prog.hole_can_use("h")))
+        self.assertEqual([nt.name for nt in enumerator.nonterminals], ["B", "G"])
+        self.assertEqual({nt.name: size for nt, size in enumerator.min_sizes.items()}, {"B": 3, "G": 1})
+        self.assertEqual([p[4] for p in enumerator.productions[enumerator.start]], [7, 3])
+        synt = Synthesizer(prog, {})
+        tables = synt.tables["h"]
+        self.assertEqual(tables.depths[tables.start[1].template], 2)
+        self.assertEqual(max(tables.depths.values()), INFINITY)
+        self.assertEqual(str(synt.synth_method_1()["h"]), "(x > x)")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the grammars compiled into tables.
+"""
+
+import unittest
+from lang.ast import *
+from lang.paddle import parse
+from synthesis.grammar_analysis import GrammarAnalysis
+from synthesis.grammar_tables import *
+from synthesis.synth import Synthesizer
+
+SOURCE = """
+input x : int;
+input b : bool;
+hole h : int [
+    G : int -> G + 1 | B ? G : G | x + 1 | Var;
+    B : bool -> G > G | Var;
+    H : int -> H + 1
+];
+assert h = x;
+"""
+
+
+def compile_tables(source: str) -> GrammarTables:
+    prog = parse(string=source)
+    hole = prog.holes[0]
+    available_vars = prog.hole_can_use(hole.var.name)
+    return GrammarTables(hole, GrammarAnalysis(hole.grammar, available_vars), available_vars)
+
+
+class TestGrammarTables(unittest.TestCase):
+    def test_kinds(self):
+        tables = compile_tables(SOURCE)
+        kinds = {str(ex): kind for ex, kind in tables.kinds.items() if not isinstance(ex, GrammarVar)}
+        self.assertEqual(kinds["G"], NONTERMINAL)
+        self.assertEqual(kinds["(G + 1)"], COMPOSITE)
+        self.assertEqual(kinds["(x + 1)"], TERMINAL)
+        self.assertEqual(kinds["1"], TERMINAL)
+        self.assertEqual(kinds["B ? G : G"], COMPOSITE)
+        self.assertTrue(all(tables.kinds[ex] == VAR for ex in tables.kinds if isinstance(ex, GrammarVar)))
+        # The id of a nonterminal is its position in the grammar.
+        self.assertEqual({str(ex): n for ex, n in tables.nonterminal.items()}, {"G": 0, "B": 1, "H": 2})
+
+    def test_productions(self):
+        tables = compile_tables(SOURCE)
+        g, b, h = 0, 1, 2
+        # H derives nothing and is not reachable, the productions are sorted by number of children.
+        self.assertEqual(tables.productions[h], [])
+        self.assertEqual([str(p.template) for p in tables.productions[g]], ["Var", "(G + 1)", "(x + 1)", "B ? G : G"])
+        self.assertEqual([str(p.template) for p in tables.start], ["(G + 1)", "B ? G : G", "(x + 1)", "Var"])
+        # The Var of G are completed with x and the Var of B with b.
+        self.assertEqual({v.name for v in tables.productions[g][0].variables}, {"x"})
+        self.assertEqual({v.name for v in tables.productions[b][0].variables}, {"b"})
+        self.assertEqual([p.depth for p in tables.productions[b]], [0, 2])
+
+    def test_derivations(self):
+        prog = parse(string=SOURCE)
+        synth = Synthesizer(prog)
+        hole = prog.holes[0]
+        for derivation_func in [synth.do_derivation_1, synth.do_derivation_2]:
+            derivations = [str(ex) for d in range(5) for ex in synth.generate_assignments(hole, derivation_func, d, d)]
+            self.assertEqual(derivations[0], "x")
+            self.assertIn("((x + 1) + 1)", derivations)
+            self.assertIn("b ? x : x", derivations)
+
+
+if __name__ == '__main__':
+    unittest.main()
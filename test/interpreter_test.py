@@ -0,0 +1,83 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the concrete interpreter. The interpreter
+is compared to z3 on the examples in `examples/evaluation`.
+"""
+
+import os
+import unittest
+from pathlib import Path
+from random import Random
+from z3 import IntVal, BoolVal, Int, Bool, is_true, is_false, simplify, substitute
+from lang.ast import *
+from lang.paddle import parse
+from lang.symb_eval import Evaluator, EvaluationUndefinedHoleError
+from lang.interpreter import Interpreter, int_div, int_mod
+from verification.verifier import z3_expr
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+def z3_value(formula: Expression, inputs: dict):
+    """
+    Returns the value of the formula on the inputs computed by z3, or None
+    if z3 cannot compute it (e.g. it depends on a division by zero).
+    """
+    substitution = []
+    for var in formula.uses():
+        if var.type == PaddleType.BOOL:
+            substitution.append((Bool(var.name), BoolVal(inputs[var.name])))
+        else:
+            substitution.append((Int(var.name), IntVal(inputs[var.name])))
+    value = simplify(substitute(z3_expr(formula), *substitution))
+    if is_true(value):
+        return True
+    if is_false(value):
+        return False
+    return None
+
+
+class TestInterpreter(unittest.TestCase):
+    def test_division(self):
+        for x in range(-7, 8):
+            for y in range(-4, 5):
+                if y == 0:
+                    continue
+                self.assertEqual(int_div(x, y), simplify(IntVal(x) / IntVal(y)).as_long(), msg=f"{x} / {y}")
+                self.assertEqual(int_mod(x, y), simplify(IntVal(x) % IntVal(y)).as_long(), msg=f"{x} % {y}")
+
+    def test_undefined_hole(self):
+        prog = parse(f"{base_path}/examples/max2.paddle")
+        with self.assertRaises(EvaluationUndefinedHoleError):
+            Interpreter({}).evaluate(prog, {"x": 1, "y": 2})
+
+    def test_holes(self):
+        prog = parse(f"{base_path}/examples/max2.paddle")
+        x = VarExpr(prog.inputs[0])
+        y = VarExpr(prog.inputs[1])
+        hmax = Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)
+        interpreter = Interpreter({"hmax": hmax})
+        self.assertTrue(interpreter.evaluate(prog, {"x": 3, "y": -5}))
+        interpreter = Interpreter({"hmax": x})
+        self.assertTrue(interpreter.evaluate(prog, {"x": 3, "y": -5}))
+        self.assertFalse(interpreter.evaluate(prog, {"x": -5, "y": 3}))
+
+    def test_eval_examples(self):
+        examples_directory = f"{base_path}/examples/evaluation"
+        rng = Random(410)
+        for filename in os.listdir(examples_directory):
+            if not filename.endswith(".paddle"):
+                continue
+            prog = parse(os.path.join(examples_directory, filename))
+            formula = Evaluator({}).evaluate(prog)
+            interpreter = Interpreter({})
+            for _ in range(50):
+                inputs = {"x": rng.randint(-20, 20), "y": rng.randint(-20, 20), "z": rng.randint(-20, 20),
+                          "w": rng.randint(-20, 20), "b": rng.random() < 0.5}
+                expected = z3_value(formula, inputs)
+                if expected is None:
+                    continue
+                self.assertEqual(interpreter.evaluate(prog, inputs), expected,
+                                 msg=f"{filename} on {inputs}")
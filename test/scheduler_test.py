@@ -0,0 +1,80 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the joint scheduler of hole completions.
+"""
+
+import unittest
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from synthesis.scheduler import Exhausted, JointScheduler
+from synthesis.synth import Synthesizer
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+def all_completions(scheduler: JointScheduler) -> list:
+    completions = []
+    while True:
+        try:
+            completion = scheduler.next_completion()
+        except Exhausted:
+            return completions
+        completions.append({h: ex.value for h, ex in completion.items()})
+
+
+class TestScheduler(unittest.TestCase):
+    def test_diagonal_order(self):
+        # Each combination is returned once, by increasing sum of ranks.
+        streams = {"a": [0, 1, 2], "b": [0, 1, 2, 3, 4], "c": [0, 1]}
+        scheduler = JointScheduler(["a", "b", "c"], lambda h: iter([IntConst(i) for i in streams[h]]))
+        completions = all_completions(scheduler)
+        self.assertEqual(len(completions), 3 * 5 * 2)
+        self.assertEqual(len({tuple(c.values()) for c in completions}), 3 * 5 * 2)
+        sums = [sum(c.values()) for c in completions]
+        self.assertEqual(sums, sorted(sums))
+
+    def test_empty_stream(self):
+        scheduler = JointScheduler(["a", "b"], lambda h: iter([IntConst(1)] if h == "a" else []))
+        with self.assertRaises(Exhausted):
+            scheduler.next_completion()
+
+    def test_no_holes(self):
+        # A program without holes has one empty completion, and then the methods are exhausted.
+        prog = parse(string="input x : int; assert x > x + 1;")
+        for method in range(1, 6):
+            synt = Synthesizer(prog)
+            self.assertEqual(getattr(synt, f"synth_method_{method}")(), {})
+            with self.assertRaises(Exhausted):
+                getattr(synt, f"synth_method_{method}")()
+
+    def test_restart(self):
+        # After a restart, the combinations that were returned are skipped.
+        new_values = {"a": [0, 1], "b": [0, 1]}
+
+        def make_stream(h):
+            values, new_values[h] = new_values[h], [2]
+            return iter([IntConst(i) for i in values])
+
+        scheduler = JointScheduler(["a", "b"], make_stream)
+        first = [scheduler.next_completion() for _ in range(3)]
+        first = [{h: ex.value for h, ex in c.items()} for c in first]
+        scheduler.restart("a")
+        second = all_completions(scheduler)
+        self.assertEqual(len(first) + len(second), 3 * 2)
+        for completion in second:
+            self.assertNotIn(completion, first)
+
+    def test_several_holes(self):
+        # All the holes get an expression, and no combination is returned twice.
+        synt = Synthesizer(parse(f"{base_path}/examples/division.paddle"))
+        for method in [synt.synth_method_1, synt.synth_method_2, synt.synth_method_3]:
+            completions = set()
+            for _ in range(200):
+                completion = method()
+                self.assertEqual(set(completion.keys()), {"h1", "h2"})
+                self.assertNotIn(None, completion.values())
+                completions.add((str(completion["h1"]), str(completion["h2"])))
+            self.assertEqual(len(completions), 200)
@@ -0,0 +1,54 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the simplification of the evaluated
+expressions.
+"""
+
+import unittest
+from lang.ast import *
+from lang.paddle import parse
+from lang.simplify import Simplifier
+from lang.symb_eval import Evaluator
+from verification.verifier import is_valid
+
+
+def program(constraint: str) -> Program:
+    return parse(string=f"input x : int; input b : bool; hole h : int [ G : int -> Var ]; assert {constraint};")
+
+
+class TestSimplifier(unittest.TestCase):
+    def simplify(self, constraint: str, h: str = "x") -> str:
+        prog = program(constraint)
+        completion = VarExpr(prog.inputs[0]) if h == "x" else IntConst(int(h))
+        simplifier = Simplifier({"h": completion})
+        simplified = simplifier.evaluate(prog)
+        # The simplified formula is equivalent to the formula.
+        formula = Evaluator({"h": completion}).evaluate(prog)
+        self.assertTrue(is_valid(BinaryExpr(BinaryOperator.EQUALS, formula, simplified)))
+        self.assertEqual(simplifier.removed, simplifier.size(formula) - simplifier.size(simplified))
+        return str(simplified)
+
+    def test_constants(self):
+        self.assertEqual(self.simplify("h + 2 * 3 > 1 - 4", "2"), "True")
+        self.assertEqual(self.simplify("((-7) / 2 = (-4)) && ((-7) % 2 = 1)"), "True")
+        self.assertEqual(self.simplify("x + 3 % 0 > (2 - 2) * x"), "((x + (3 % 0)) > 0)")
+
+    def test_identities(self):
+        self.assertEqual(self.simplify("(1 > 0 ? h : x + 1) * 1 + 0 >= x"), "(x >= x)")
+        self.assertEqual(self.simplify("(True && b) || (b || False)"), "b")
+        self.assertEqual(self.simplify("! ! b = True"), "b")
+        self.assertEqual(self.simplify("(b ? True : False) != True"), "(! b)")
+        self.assertEqual(self.simplify("(b ? x : x) = h"), "(x = x)")
+
+    def test_shared_definitions(self):
+        prog = parse(string="input x : int; hole h : int [ G : int -> Var ]; define d : int = h * 0 + x;"
+                            "define e : int = d + d; assert e = x + x;")
+        simplifier = Simplifier({"h": VarExpr(prog.inputs[0])})
+        self.assertEqual(str(simplifier.evaluate(prog)), "((x + x) = (x + x))")
+        self.assertEqual(simplifier.removed, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
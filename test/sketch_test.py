@@ -0,0 +1,90 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the solver-based synthesis method.
+"""
+
+import unittest
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from lang.symb_eval import Evaluator
+from synthesis.scheduler import Exhausted
+from synthesis.sketch import SKETCH_MAX_DEPTH, SketchSynthesizer
+from synthesis.synth import Synthesizer
+from verification.verifier import Budget, find_counterexample
+
+base_path = Path(__file__).parent.parent.absolute()
+
+
+def cegis(prog: Program, max_calls: int = 50):
+    """Returns the solution found by method 4 and the number of calls, or None if there is none."""
+    synt = Synthesizer(prog)
+    for calls in range(1, max_calls + 1):
+        try:
+            completions = synt.synth_method_4()
+        except Exhausted:
+            return None, calls
+        counterexample = find_counterexample(Evaluator(completions).evaluate(prog), prog.inputs)
+        if counterexample is None:
+            return completions, calls
+        synt.add_counterexample(counterexample)
+    return None, max_calls
+
+
+class TestSketch(unittest.TestCase):
+    def test_examples(self):
+        # Grammars that are hard to enumerate are solved with few solver calls.
+        for filename in ["abs_tern.paddle", "max2.paddle", "xor.paddle", "sum4c.paddle"]:
+            prog = parse(f"{base_path}/examples/{filename}")
+            solution, calls = cegis(prog)
+            self.assertIsNotNone(solution, msg=f"No solution for {filename}.")
+            self.assertLess(calls, 20)
+
+    def test_constants(self):
+        prog = parse(string="""
+        input x : int;
+        hole h : int [G : int -> G + G | G * G | Var | Integer];
+        assert h = 7 * x - 1234;
+        """)
+        solution, _ = cegis(prog)
+        self.assertIsNotNone(solution)
+
+    def test_holes_and_defines(self):
+        # The second hole uses a variable defined with the first hole.
+        prog = parse(string="""
+        input x : int;
+        input y : int;
+        hole h1 : int [G : int -> G + G | Var];
+        hole h2 : bool [B : bool -> I > I | ! B; I : int -> Var | I + 1];
+        define a : int = h1;
+        define b : bool = h2;
+        assert a = x + y && (b = (a > x + 1));
+        """)
+        solution, _ = cegis(prog)
+        self.assertIsNotNone(solution)
+
+    def test_no_solution(self):
+        prog = parse(f"{base_path}/examples/no_sol_1.paddle")
+        solution, _ = cegis(prog)
+        self.assertIsNone(solution)
+
+    def test_new_completions(self):
+        # Without counterexamples, the same completion is not returned twice.
+        prog = parse(f"{base_path}/examples/max2.paddle")
+        synt = Synthesizer(prog)
+        completions = [str(synt.synth_method_4()["hmax"]) for _ in range(30)]
+        self.assertEqual(len(completions), len(set(completions)))
+
+    def test_budget(self):
+        # The solver cannot decide anything within the budget, so every depth is given up.
+        prog = parse(string="input x : int; hole h : int [G : int -> G + 1 | Var]; assert h = x + 3;")
+        sketch = SketchSynthesizer(prog, {"h": prog.hole_can_use("h")}, Budget(rlimit=1))
+        with self.assertRaises(Exhausted):
+            sketch.next_completion()
+        self.assertEqual(sketch.depth, SKETCH_MAX_DEPTH + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
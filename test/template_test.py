@@ -0,0 +1,69 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the programs evaluated once for all the
+hole completions.
+"""
+
+import unittest
+from lang.ast import *
+from lang.paddle import parse
+from lang.symb_eval import Evaluator
+from lang.template import ProgramTemplate
+
+
+def chain(defines: int) -> Program:
+    """A program whose constraint uses a chain of defines, and whose hole uses the last one."""
+    lines = ["input x : int;", "hole h : int [ G : int -> Var ];", "define d0 : int = x + 1;"]
+    lines += [f"define d{i} : int = d{i - 1} + d{i - 1};" for i in range(1, defines)]
+    lines += [f"define r : int = d{defines - 1} + h;", "assert r > x;"]
+    return parse(string="\n".join(lines))
+
+
+class TestTemplate(unittest.TestCase):
+    def test_instantiate(self):
+        prog = parse(string="""
+            input x : int;
+            input y : int;
+            hole h : int [ G : int -> Var | G + G | 1 ];
+            hole k : bool [ B : bool -> G > G; G : int -> Var ];
+            define m : int = x + y;
+            assert (k ? h : m) >= x;
+        """)
+        template = ProgramTemplate(prog)
+        x, y = prog.inputs
+        for h, k in [(VarExpr(x), BinaryExpr(BinaryOperator.GREATER, VarExpr(x), VarExpr(y))),
+                     (BinaryExpr(BinaryOperator.PLUS, VarExpr(y), IntConst(1)), BoolConst(False))]:
+            completions = {"h": h, "k": k}
+            # The expressions are hash-consed, so the same program is the same object.
+            self.assertIs(template.instantiate(completions), Evaluator(completions).evaluate(prog))
+
+    def test_hole_values(self):
+        prog = chain(5)
+        template = ProgramTemplate(prog)
+        # The hole is a placeholder in the template.
+        self.assertIn("?h", str(template.constraint))
+        values = template.hole_values({"h": VarExpr(prog.inputs[0])})
+        self.assertIs(values["h"], VarExpr(prog.inputs[0]))
+        completions = {"h": VarExpr(prog.inputs[0])}
+        self.assertIs(template.instantiate(completions), Evaluator(completions).evaluate(prog))
+
+    def test_long_chain(self):
+        prog = chain(300)
+        template = ProgramTemplate(prog)
+        evaluate_expr = template.evaluator.evaluate_expr
+        calls = []
+
+        def counted(var_defs, ex):
+            calls.append(ex)
+            return evaluate_expr(var_defs, ex)
+        template.evaluator.evaluate_expr = counted
+        values = template.hole_values({"h": BinaryExpr(BinaryOperator.PLUS, VarExpr(prog.inputs[0]), IntConst(2))})
+        # Only the completion is evaluated, not the 300 defines.
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(str(values["h"]), "(x + 2)")
+
+
+if __name__ == '__main__':
+    unittest.main()
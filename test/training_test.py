@@ -0,0 +1,64 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the training of the costs of the
+productions.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from synthesis.training import DerivationParser, read_solutions, save_costs, train
+from synthesis.weighted import load_costs
+
+base_path = Path(__file__).parent.parent.absolute()
+
+program = """
+input x : int;
+input y : int;
+hole h : int [
+    G : int -> G + G | G - G | B ? G : G | Var | Integer;
+    B : bool -> G > G | G = G
+];
+assert h >= x && h >= y;
+"""
+
+
+class TestTraining(unittest.TestCase):
+    def write_corpus(self, directory: Path, solutions: dict) -> None:
+        for name, solution in solutions.items():
+            (directory / f"{name}.paddle").write_text(program)
+            if solution is not None:
+                (directory / f"{name}.solution").write_text(f"The solution for h is {solution}\n")
+
+    def test_derivation(self):
+        prog = parse(string=program)
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_corpus(Path(directory), {"p": "(x > y) ? x : (y + -3)"})
+            solution = read_solutions(prog, Path(directory) / "p.solution")["h"]
+        steps = DerivationParser(prog.holes[0].grammar).derive(solution, "G")
+        self.assertEqual([str(production) for _, production in steps],
+                         ["B ? G : G", "(G > G)", "Var", "Var", "Var", "(G + G)", "Var", "Integer"])
+        # x * y is not in the language of the grammar.
+        x, y = VarExpr(prog.inputs[0]), VarExpr(prog.inputs[1])
+        self.assertIsNone(DerivationParser(prog.holes[0].grammar).derive(BinaryExpr(BinaryOperator.TIMES, x, y), "G"))
+
+    def test_costs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_corpus(Path(directory), {"p1": "(x > y) ? x : y", "p2": "(y > x) ? y : x",
+                                                "p3": "(x + 1)", "p4": None})
+            counter = train(Path(directory))
+            self.assertEqual(counter.solutions, 3)
+            costs = counter.costs()
+            save_costs(costs, Path(directory) / "costs.json")
+            self.assertEqual(load_costs(Path(directory) / "costs.json"), costs)
+        self.assertLess(costs["Var"], costs["(_ - _)"])
+        self.assertLess(costs["(_ > _)"], costs["(_ = _)"])
+        self.assertTrue(all(cost > 0 for cost in costs.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
-from lang.symb_eval import Evaluator
+from lang.symb_eval import Evaluator, EvaluationTypeError
 from lang.ast import *
-from verification.verifier import is_valid
+from verification.verifier import is_valid, find_counterexample, verification_cache, VerificationCache, \
+    VerificationSession, Budget, RetryQueue, Validity, check, Z3Translator, z3_expr, UNBOUNDED
+from verification.parallel import ParallelVerifier
+from main import refuted, parallel_synthesis, synthesize
+from synthesis.synth import Synthesizer
+import inspect
 import unittest
 from lang.paddle import parse
 from lark import exceptions
@@ -41,3 +46,168 @@ class TestVerif(unittest.TestCase):
 
             else:
                 continue
+
+    def test_counterexamples(self):
+        examples_directory = '%s/examples/verification' % Path(
+            __file__).parent.parent.absolute()
+        for filename in os.listdir(examples_directory):
+            if filename.endswith(".paddle"):
+                ast = parse(os.path.join(examples_directory, filename))
+                final_constraint_expr = Evaluator({}).evaluate(ast)
+                counterexample = find_counterexample(final_constraint_expr, ast.inputs)
+                if filename.endswith("false.paddle"):
+                    # The counterexample gives a value to every input, and the
+                    # formula is false on it.
+                    self.assertIsNotNone(counterexample, msg=f"{filename} should have a counterexample.")
+                    self.assertEqual(set(counterexample), {v.name for v in ast.inputs})
+                    self.assertTrue(refuted(ast, {}, [counterexample]))
+                else:
+                    self.assertIsNone(counterexample, msg=f"{filename} should not have a counterexample.")
+                    self.assertFalse(refuted(ast, {}, [{v.name: 1 for v in ast.inputs}]))
+
+    def test_verification_cache(self):
+        x = VarExpr(Variable("x", PaddleType.INT))
+        y = VarExpr(Variable("y", PaddleType.INT))
+        verification_cache.clear()
+        counterexample = find_counterexample(BinaryExpr(BinaryOperator.GREATER, x, y))
+        self.assertIsNotNone(counterexample)
+        counterexample["x"] = None
+        # The formula is built again, but it is the same hash-consed formula.
+        self.assertIsNotNone(find_counterexample(BinaryExpr(BinaryOperator.GREATER, x, y))["x"])
+        self.assertTrue(is_valid(BinaryExpr(BinaryOperator.GREATER_EQ, x, x)))
+        self.assertTrue(is_valid(BinaryExpr(BinaryOperator.GREATER_EQ, x, x)))
+        self.assertEqual((verification_cache.hits, verification_cache.misses), (2, 2))
+        self.assertGreater(verification_cache.saved_time(), 0)
+        # The least recently used results are evicted.
+        cache = VerificationCache(2)
+        cache.add(("a",), (Validity.VALID, None), 0)
+        cache.add(("b",), (Validity.VALID, None), 0)
+        cache.lookup(("a",))
+        cache.add(("c",), (Validity.VALID, None), 0)
+        self.assertEqual(list(cache.results), [("a",), ("c",)])
+        # The unknown results are not cached.
+        cache.add(("d",), (Validity.UNKNOWN, None), 0)
+        self.assertEqual(list(cache.results), [("a",), ("c",)])
+
+    def test_verification_session(self):
+        ast = parse(string="""
+        input x : int;
+        input y : int;
+        hole h1 : int [ G : int -> Var | G + G ];
+        hole h2 : bool [ B : bool -> G > G; G : int -> Var ];
+        define d : int = x + h1;
+        assert (h2 ? d : y) >= y;
+        """)
+        x = VarExpr(ast.inputs[0])
+        y = VarExpr(ast.inputs[1])
+        d = VarExpr(ast.assignments[0].var)
+        session = VerificationSession(ast)
+        candidates = [{"h1": x, "h2": BinaryExpr(BinaryOperator.GREATER, x, y)},
+                      {"h1": y, "h2": BinaryExpr(BinaryOperator.GREATER, d, y)},
+                      {"h1": y, "h2": BinaryExpr(BinaryOperator.GREATER, x, y)},
+                      {"h1": x, "h2": BinaryExpr(BinaryOperator.GREATER, d, y)}]
+        for candidate in candidates:
+            # The session gives the same result as a new solver for each candidate.
+            expected = find_counterexample(Evaluator(candidate).evaluate(ast), ast.inputs)
+            counterexample = session.find_counterexample(candidate)
+            self.assertEqual(counterexample is None, expected is None, msg=f"{candidate}")
+            if counterexample is not None:
+                self.assertTrue(refuted(ast, candidate, [counterexample]))
+
+    def test_translator(self):
+        x = VarExpr(Variable("x", PaddleType.INT))
+        b = VarExpr(Variable("b", PaddleType.BOOL))
+        shared = BinaryExpr(BinaryOperator.DIV, x, IntConst(0))
+        formula = Ite(b, BinaryExpr(BinaryOperator.GREATER, shared, x), BinaryExpr(BinaryOperator.EQUALS, shared, x))
+        translator = Z3Translator()
+        term = translator.translate(formula)
+        self.assertTrue(term.eq(z3_expr(formula)))
+        # The subexpressions and the variables are translated once.
+        self.assertIs(translator.translate(shared), translator.terms[shared])
+        self.assertEqual(len(translator.variables), 2)
+        self.assertEqual(len(translator.terms), 7)
+        self.assertIs(translator.translate(formula), term)
+        with self.assertRaises(EvaluationTypeError):
+            translator.translate(GrammarInteger())
+
+    def test_define_chain(self):
+        # Each define uses the previous one twice, the constraint is a DAG of linear size.
+        n = 60
+        source = "input x : int; hole h : int [ G : int -> Var | G + G ]; define d0 : int = x + h;"
+        source += "".join(f"define d{i} : int = d{i - 1} + d{i - 1};" for i in range(1, n))
+        ast = parse(string=f"{source} assert d{n - 1} - d0 >= d0;")
+        completions = {"h": VarExpr(ast.inputs[0])}
+        formula = Evaluator(completions).evaluate(ast)
+        self.assertEqual({v.name for v in formula.uses()}, {"x"})
+        self.assertFalse(is_valid(formula))
+        self.assertTrue(refuted(ast, completions, [find_counterexample(formula)]))
+        self.assertIsNotNone(VerificationSession(ast).find_counterexample(completions))
+
+    def test_budget(self):
+        # There are no positive x, y and z such that x^3 + y^3 = z^3, which the solver cannot prove.
+        x, y, z = [VarExpr(Variable(name, PaddleType.INT)) for name in "xyz"]
+        cubes = [BinaryExpr(BinaryOperator.TIMES, v, BinaryExpr(BinaryOperator.TIMES, v, v)) for v in (x, y, z)]
+        positive = BinaryExpr(BinaryOperator.AND, BinaryExpr(BinaryOperator.GREATER, x, IntConst(1)),
+                              BinaryExpr(BinaryOperator.AND, BinaryExpr(BinaryOperator.GREATER, y, IntConst(1)),
+                                         BinaryExpr(BinaryOperator.GREATER, z, IntConst(1))))
+        fermat = BinaryExpr(BinaryOperator.OR, UnaryExpr(UnaryOperator.NOT, positive),
+                            BinaryExpr(BinaryOperator.NOTEQUALS, BinaryExpr(BinaryOperator.PLUS, cubes[0], cubes[1]),
+                                       cubes[2]))
+        for budget in [Budget(timeout=200), Budget(rlimit=100000)]:
+            self.assertEqual(check(fermat, budget=budget), (Validity.UNKNOWN, None))
+            self.assertEqual(find_counterexample(fermat, budget=budget), {})
+            self.assertFalse(is_valid(fermat, budget=budget))
+        self.assertEqual(check(BinaryExpr(BinaryOperator.GREATER, x, y))[0], Validity.INVALID)
+        # is_valid is not limited unless a budget is given.
+        self.assertEqual(inspect.signature(is_valid).parameters["budget"].default, UNBOUNDED)
+
+    def test_retry_queue(self):
+        ast = parse(f"{Path(__file__).parent.parent.absolute()}/examples/max2.paddle")
+        x = VarExpr(ast.inputs[0])
+        y = VarExpr(ast.inputs[1])
+        correct = Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)
+        queue = RetryQueue(Budget(timeout=1000))
+        session = VerificationSession(ast)
+        queue.defer({"hmax": x})
+        queue.defer({"hmax": correct})
+        queue.defer({"hmax": y})
+        self.assertIs(queue.retry(session)["hmax"], correct)
+        self.assertEqual(queue.deferred, [{"hmax": y}])
+        self.assertIsNone(queue.retry(session))
+        self.assertEqual(queue.deferred, [])
+
+    def test_parallel_verification(self):
+        base_path = Path(__file__).parent.parent.absolute()
+        ast = parse(f"{base_path}/examples/max2.paddle")
+        x = VarExpr(ast.inputs[0])
+        y = VarExpr(ast.inputs[1])
+        correct = Ite(BinaryExpr(BinaryOperator.GREATER, x, y), x, y)
+        other = Ite(BinaryExpr(BinaryOperator.GREATER, y, x), y, x)
+        with ParallelVerifier(ast, 2) as verifier:
+            results = verifier.verify([{"hmax": x}, {"hmax": correct}, {"hmax": y}, {"hmax": other}])
+        # The results are in the order of the candidates.
+        self.assertIsNotNone(results[0])
+        self.assertIsNone(results[1])
+        self.assertIsNotNone(results[2])
+        self.assertIsNone(results[3])
+        self.assertTrue(refuted(ast, {"hmax": x}, [results[0]]))
+        self.assertTrue(refuted(ast, {"hmax": y}, [results[2]]))
+
+    def test_parallel_synthesis(self):
+        base_path = Path(__file__).parent.parent.absolute()
+        ast = parse(f"{base_path}/examples/max2.paddle")
+        for workers in [2, 3]:
+            solution = parallel_synthesis(ast, Synthesizer(ast), 3, workers)
+            self.assertIsNotNone(solution)
+            self.assertTrue(is_valid(Evaluator(solution).evaluate(ast)))
+
+    def test_synthesize(self):
+        base_path = Path(__file__).parent.parent.absolute()
+        ast = parse(f"{base_path}/examples/max2.paddle")
+        result = synthesize(ast, Synthesizer(ast), 1)
+        self.assertTrue(is_valid(Evaluator(result.solution).evaluate(ast)))
+        self.assertGreaterEqual(result.candidates, result.iterations)
+        self.assertGreater(result.iterations, 0)
+        # A program without holes has one candidate.
+        ast = parse(string="input x : int;\nassert x + 1 > x;")
+        self.assertEqual(synthesize(ast, Synthesizer(ast), 1)[:3], ({}, 1, 1))
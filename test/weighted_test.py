@@ -0,0 +1,87 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file contains some tests of the best-first enumeration by cost.
+"""
+
+import json
+import tempfile
+import unittest
+from itertools import islice
+from pathlib import Path
+from lang.ast import *
+from lang.paddle import parse
+from lang.symb_eval import Evaluator
+from synthesis.synth import Synthesizer
+from synthesis.weighted import BestFirstEnumerator, load_costs, production_key
+from verification.verifier import is_valid
+
+base_path = Path(__file__).parent.parent.absolute()
+
+program = """
+input x : int;
+input y : int;
+input b : bool;
+hole h : int [G : int -> G + G | G * G | Var | 1];
+assert h = x;
+"""
+
+
+class TestWeighted(unittest.TestCase):
+    def enumerate(self, costs: dict, n: int) -> list:
+        prog = parse(string=program)
+        hole = prog.holes[0]
+        return list(islice(BestFirstEnumerator(hole, prog.hole_can_use("h"), costs).enumerate(), n))
+
+    def test_production_keys(self):
+        prog = parse(string=program)
+        rule = prog.holes[0].grammar.rules[0]
+        self.assertEqual([production_key(p, {rule.symbol.name}) for p in rule.productions],
+                         ["(_ + _)", "(_ * _)", "Var", "1"])
+
+    def test_increasing_cost(self):
+        costs = {"(_ + _)": 1.0, "(_ * _)": 5.0, "Var": 1.0, "1": 3.0}
+        expressions = self.enumerate(costs, 200)
+        # Var is only completed with integer variables.
+        self.assertNotIn("b", [str(e) for e in expressions])
+        self.assertEqual([str(e) for e in expressions[:3]], ["x", "y", "1"])
+
+        def cost(ex: Expression) -> float:
+            if isinstance(ex, BinaryExpr):
+                return costs[f"(_ {ex.operator} _)"] + cost(ex.left_operand) + cost(ex.right_operand)
+            return costs["1"] if isinstance(ex, IntConst) else costs["Var"]
+        self.assertEqual([cost(e) for e in expressions], sorted(cost(e) for e in expressions))
+        self.assertEqual(len(expressions), len(set(expressions)))
+
+    def test_costs_change_order(self):
+        def first_binary(costs: dict) -> str:
+            return next(str(e) for e in self.enumerate(costs, 20) if isinstance(e, BinaryExpr))
+        self.assertIn("*", first_binary({"(_ * _)": 0.5, "(_ + _)": 4.0}))
+        self.assertIn("+", first_binary({"(_ * _)": 4.0, "(_ + _)": 0.5}))
+
+    def test_load_costs(self):
+        # The costs are only read from a file that is given.
+        self.assertEqual(load_costs(None), {})
+        self.assertEqual(load_costs(""), {})
+        with self.assertRaises(FileNotFoundError):
+            load_costs(Path(tempfile.gettempdir()) / "no_such_costs.json")
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as costs_file:
+            json.dump({"Var": 0.5}, costs_file)
+        self.assertEqual(load_costs(costs_file.name), {"Var": 0.5})
+
+    def test_examples(self):
+        for filename in ["abs_tern.paddle", "max2.paddle", "xor.paddle", "sum4c.paddle"]:
+            prog = parse(f"{base_path}/examples/{filename}")
+            synt = Synthesizer(prog, {})
+            for _ in range(2000):
+                completions = synt.synth_method_5()
+                self.assertNotIn(None, completions.values())
+                if is_valid(Evaluator(completions).evaluate(prog)):
+                    break
+            else:
+                self.fail(f"No solution for {filename}.")
+
+
+if __name__ == '__main__':
+    unittest.main()
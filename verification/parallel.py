@@ -0,0 +1,67 @@
+"""
+CSC410 Final Project: Enumerative Synthesizer
+by Victor Nicolet and Danya Lette
+
+This file defines the ParallelVerifier class, which verifies batches of
+candidate hole completions concurrently in a pool of worker processes.
+
+Each worker process receives the program once, when it starts, and
+encodes it in its own verification session. The results of a batch are returned in the order of
+the candidates, so that the first solution in the enumeration order can
+be chosen whatever the order in which the workers finish.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional
+from z3 import *
+from lang.ast import *
+from lang.interpreter import Value
+from verification.verifier import Budget, DEFAULT_BUDGET, VerificationSession
+
+# The verification session of the program in this worker process.
+_session: Optional[VerificationSession] = None
+
+
+def _init_worker(prog: Program, budget: Budget) -> None:
+    """Initializes a worker process: encodes the program once in a verification session."""
+    global _session
+    _session = VerificationSession(prog, budget)
+
+
+def _verify(hole_completions: Mapping[str, Expression]) -> Optional[Dict[str, Value]]:
+    """Verifies one candidate in a worker process (see `VerificationSession`)."""
+    return _session.find_counterexample(hole_completions)
+
+
+class ParallelVerifier():
+    """
+    A ParallelVerifier verifies candidates of a program with a pool of
+    `workers` processes. It should be closed with `shutdown` (or used in a
+    with statement) to stop the processes.
+    """
+
+    def __init__(self, prog: Program, workers: int, budget: Budget = DEFAULT_BUDGET) -> None:
+        """
+        @param prog The program whose hole completions are verified.
+        @param workers The number of worker processes.
+        @param budget The budget of the solver for each candidate.
+        """
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prog, budget))
+
+    def verify(self, candidates: List[Mapping[str, Expression]]) -> List[Optional[Dict[str, Value]]]:
+        """
+        Verifies the candidates concurrently. Returns, for each candidate in
+        order, None if it is a solution and a counterexample otherwise (which
+        is empty if the solver could not decide within the budget).
+        """
+        return list(self.pool.map(_verify, candidates))
+
+    def shutdown(self) -> None:
+        """Stops the worker processes."""
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
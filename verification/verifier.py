@@ -5,9 +5,15 @@ by Victor Nicolet and Danya Lette
 Fill in this file to complete the verification portion
 of the assignment.
 """
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
 from z3 import *
 from lang.ast import *
-from lang.symb_eval import EvaluationTypeError
+from lang.symb_eval import Evaluator, EvaluationTypeError
+from lang.template import ProgramTemplate
+from lang.interpreter import Value
 
 # These should return a z3 expression if x and y are both z3 variables
 binary_funcs = {
@@ -32,55 +38,339 @@ unary_funcs = {
 }
 
 
+# The functions of binary_funcs and unary_funcs, by operator instead of by string.
+binary_operator_funcs = {op: binary_funcs[str(op)] for op in BinaryOperator}
+unary_operator_funcs = {op: unary_funcs[str(op)] for op in UnaryOperator}
+# The number of translated terms after which the terms of a translator are forgotten.
+TRANSLATION_CACHE_SIZE = 100000
+
+
+class Z3Translator():
+    """
+    A Z3Translator translates expressions to z3 terms. The expressions are
+    hash-consed, so the translation of each subexpression is memoized: a
+    subexpression shared by several formulas (e.g. the constraint of the
+    program in the formulas of different candidates) is only translated
+    once, and the z3 constant of each variable is created once.
+    """
+
+    def __init__(self) -> None:
+        self.terms: Dict[Expression, ExprRef] = {}
+        self.variables: Dict[Tuple[str, PaddleType], ExprRef] = {}
+        self.translators = {BinaryExpr: self.binary, UnaryExpr: self.unary, Ite: self.ite, VarExpr: self.variable,
+                            BoolConst: lambda ex: BoolVal(ex.value), IntConst: lambda ex: IntVal(ex.value)}
+
+    def translate(self, formula: Expression) -> ExprRef:
+        term = self.terms.get(formula)
+        if term is not None:
+            return term
+        translator = self.translators.get(type(formula))
+        if translator is None:
+            # GrammarInteger or GramamrVar: this should never happen during evaluation!
+            if isinstance(formula, (GrammarInteger, GrammarVar)):
+                raise EvaluationTypeError(
+                    "GrammarInteger and GrammarVar should not appear in expressions that are validated.")
+            # This should never be reached.
+            raise EvaluationTypeError("Argument is an Expression of unknown type!\n")
+        term = translator(formula)
+        if len(self.terms) >= TRANSLATION_CACHE_SIZE:
+            self.terms.clear()
+        self.terms[formula] = term
+        return term
+
+    def binary(self, formula: BinaryExpr) -> ExprRef:
+        lhs = self.translate(formula.left_operand)
+        rhs = self.translate(formula.right_operand)
+        return binary_operator_funcs[formula.operator](lhs, rhs)
+
+    def unary(self, formula: UnaryExpr) -> ExprRef:
+        return unary_operator_funcs[formula.operator](self.translate(formula.operand))
+
+    def ite(self, formula: Ite) -> ExprRef:
+        return If(self.translate(formula.cond), self.translate(formula.true_br), self.translate(formula.false_br))
+
+    def variable(self, formula: VarExpr) -> ExprRef:
+        key = (formula.name, formula.var.type)
+        if key not in self.variables:
+            if formula.var.type == PaddleType.INT:
+                self.variables[key] = Int(formula.name)
+            elif formula.var.type == PaddleType.BOOL:
+                self.variables[key] = Bool(formula.name)
+            else:
+                raise EvaluationTypeError(f"Unknown variable type {formula.var.type} for {formula.name}")
+        return self.variables[key]
+
+
 def z3_expr(formula: Expression) -> ExprRef:
-    # Case 1 : formula is a binary expression.
-    if isinstance(formula, BinaryExpr):
-        lhs = z3_expr(formula.left_operand)
-        rhs = z3_expr(formula.right_operand)
-        return binary_funcs[str(formula.operator)](lhs, rhs)
-
-    # Case 2 : formula is a unary expression.
-    elif isinstance(formula, UnaryExpr):
-        return unary_funcs[str(formula.operator)](z3_expr(formula.operand))
-
-    # Case 3 : formula is a if-then-else expression (a ternary expression).
-    elif isinstance(formula, Ite):
-        return If(z3_expr(formula.cond),
-                  z3_expr(formula.true_br),
-                  z3_expr(formula.false_br))
-
-    # Case 4: formula is a variable
-    elif isinstance(formula, VarExpr):
-        if formula.var.type == PaddleType.INT:
-            return Int(formula.name)
-        elif formula.var.type == PaddleType.BOOL:
-            return Bool(formula.name)
-        else:
-            raise EvaluationTypeError(f"Unknown variable type {formula.var.type} for {formula.name}")
+    """
+    Translates the formula to a z3 term. The constants are z3 values, so that the operations on constants have
+    the semantics of z3 (e.g. the division of two constants, or by zero). The subexpressions that appear several
+    times in the formula are translated once (see `Z3Translator`).
+    """
+    if not isinstance(formula, Expression):
+        return None
+    return Z3Translator().translate(formula)
+
+
+# The maximum number of formulas whose verification result is remembered.
+CACHE_SIZE = 4096
 
-    # Case 5 : formula is a boolean or integer constant
-    elif isinstance(formula, (BoolConst, IntConst)):
-        return formula.value  # this might cause type issues. if not, change return type hint of this function
 
-    # Case 6 : formula is GrammarInteger or GramamrVar: this should never happen during evaluation!
-    elif isinstance(formula, (GrammarInteger, GrammarVar)):
-        raise EvaluationTypeError("GrammarInteger and GrammarVar should not appear in expressions that are validated.")
+class Validity(Enum):
+    """The result of the verification of a formula."""
+    VALID = "valid"
+    INVALID = "invalid"
+    # The solver could not decide within its budget.
+    UNKNOWN = "unknown"
 
-    # Case 7 should never be reached.
-    elif isinstance(formula, Expression):
-        raise EvaluationTypeError("Argument is an Expression of unknown type!\n")
 
+class Budget(NamedTuple):
+    """The resources the solver can use for one query, where 0 means no limit."""
+    # The timeout, in milliseconds.
+    timeout: int = 0
+    # The resource limit of z3 (its rlimit), which unlike the timeout does
+    # not depend on the speed of the machine.
+    rlimit: int = 0
 
-def is_valid(formula: Expression) -> bool:
+
+# No limit: the solver runs until it decides.
+UNBOUNDED = Budget()
+# The budget of a query, after which its result is unknown.
+DEFAULT_BUDGET = Budget(timeout=5000)
+# The larger budget of the candidates whose result was unknown (see `RetryQueue`).
+RETRY_BUDGET = Budget(timeout=60000)
+
+# A tri-state result: the validity, and the counterexample if the formula is invalid.
+Result = Tuple[Validity, Optional[Dict[str, Value]]]
+
+
+class VerificationCache():
     """
-    Returns true if the formula is valid.
+    A bounded cache of the results of the verification of formulas, where
+    the least recently used results are evicted first. The formulas are
+    hash-consed, so a formula that is structurally equal to a previous one
+    (e.g. the same final constraint obtained from different hole
+    completions) is the same key. Unknown results are not cached, since
+    they can be decided with a larger budget.
     """
 
+    def __init__(self, size: int = CACHE_SIZE) -> None:
+        """
+        @param size The maximum number of results in the cache.
+        """
+        self.size = size
+        self.results: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # The time spent in the solver on the misses, in seconds.
+        self.solver_time = 0.0
+
+    def lookup(self, key: tuple) -> Optional[Result]:
+        """Returns the result of the key if it is in the cache, None otherwise."""
+        if key not in self.results:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return self.results[key]
+
+    def add(self, key: tuple, result: Result, solver_time: float) -> None:
+        self.solver_time += solver_time
+        if result[0] == Validity.UNKNOWN:
+            return
+        self.results[key] = result
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    def saved_time(self) -> float:
+        """Estimates the solver time saved by the hits, with the average time of a miss."""
+        return self.hits * self.solver_time / max(self.misses, 1)
+
+    def clear(self) -> None:
+        self.results.clear()
+        self.hits = 0
+        self.misses = 0
+        self.solver_time = 0.0
+
+
+# The results of `check` and of the verification sessions.
+verification_cache = VerificationCache()
+
+
+def cached_check(key: tuple, solve) -> Result:
+    """Returns the result of the key in the cache, or computes it with solve() and adds it to the cache."""
+    result = verification_cache.lookup(key)
+    if result is None:
+        start = time.perf_counter()
+        result = solve()
+        verification_cache.add(key, result, time.perf_counter() - start)
+    # The counterexamples are copied, since the caller can modify them.
+    validity, counterexample = result
+    return validity, None if counterexample is None else dict(counterexample)
+
+
+def as_counterexample(result: Result) -> Optional[Dict[str, Value]]:
+    """Returns None for a valid result, the counterexample of an invalid one, and an empty counterexample otherwise."""
+    validity, counterexample = result
+    return {} if validity == Validity.UNKNOWN else counterexample
+
+
+def set_budget(s: Solver, budget: Budget) -> None:
+    s.set("timeout", budget.timeout)
+    s.set("rlimit", budget.rlimit)
+
+
+def check(formula: Expression, variables: Optional[Iterable[Variable]] = None,
+          budget: Budget = DEFAULT_BUDGET) -> Result:
+    """
+    Returns the validity of the formula within the budget, and if it is
+    invalid, a counterexample: a map from the names of the variables (by
+    default, the variables of the formula) to values for which the formula
+    is false. The results are cached (see `VerificationCache`).
+    """
+    variables = None if variables is None else tuple(variables)
+    key = (formula, None if variables is None else tuple((v.name, v.type) for v in variables))
+    return cached_check(key, lambda: solve_counterexample(formula, variables, budget))
+
+
+def find_counterexample(formula: Expression,
+                        variables: Optional[Iterable[Variable]] = None,
+                        budget: Budget = DEFAULT_BUDGET) -> Optional[Dict[str, Value]]:
+    """
+    Returns None if the formula is valid. Otherwise, returns a counterexample: a map from the names of the
+    variables (by default, the variables of the formula) to values for which the formula is false.
+    If the solver cannot decide within the budget, the formula is not considered valid and the counterexample is
+    empty (see `check` for the tri-state result).
+    """
+    return as_counterexample(check(formula, variables, budget))
+
+
+def solve_counterexample(formula: Expression, variables: Optional[Iterable[Variable]] = None,
+                         budget: Budget = DEFAULT_BUDGET) -> Result:
+    """Calls the solver to verify the formula (see `check`)."""
     s = Solver()
+    set_budget(s, budget)
     z3_formula = z3_expr(formula)
 
     # want to check if every possible setting of variables is satisfiable, so check if negation of formula is unsat.
     # i.e there is no possible values the variables can take that would not satisfy the formula
     s.add(Not(z3_formula))
     ans = s.check()
-    return str(ans) == 'unsat'
+    if ans == unsat:
+        return Validity.VALID, None
+    if ans == unknown:
+        return Validity.UNKNOWN, None
+    return Validity.INVALID, model_counterexample(s.model(), formula.uses() if variables is None else variables)
+
+
+def model_counterexample(model: ModelRef, variables: Iterable[Variable]) -> Dict[str, Value]:
+    """Returns the values of the variables in the model."""
+    counterexample = {}
+    for var in variables:
+        if var.type == PaddleType.BOOL:
+            counterexample[var.name] = is_true(model.eval(Bool(var.name), model_completion=True))
+        else:
+            counterexample[var.name] = model.eval(Int(var.name), model_completion=True).as_long()
+    return counterexample
+
+
+class VerificationSession():
+    """
+    A VerificationSession verifies the candidate hole completions of a
+    program with a single solver. The program is encoded once, where each
+    hole is a fresh z3 constant `?h`, and each candidate is checked by
+    asserting `?h == completion` between a push and a pop, so that the
+    solver keeps what it learned about the program between candidates.
+    """
+
+    def __init__(self, prog: Program, budget: Budget = DEFAULT_BUDGET) -> None:
+        """
+        @param prog The program whose hole completions are verified.
+        @param budget The budget of each candidate.
+        """
+        self.prog = prog
+        self.budget = budget
+        # The program is evaluated once, and the formulas are simplified
+        # before they are sent to the solver (see `Simplifier`).
+        self.template = ProgramTemplate(prog, simplify=True)
+        self.placeholders = self.template.placeholders
+        self.evaluator = self.template.evaluator
+        # The translation of the subexpressions shared by the candidates, e.g. the defines, is memoized.
+        self.translator = Z3Translator()
+        self.solver = Solver()
+        self.solver.add(Not(self.translator.translate(self.template.constraint)))
+
+    def check(self, hole_completions: Mapping[str, Expression], budget: Optional[Budget] = None) -> Result:
+        """
+        Returns the validity of the program with the hole completions, and a
+        counterexample on the inputs of the program if it is invalid. The
+        results are cached.
+        @param budget The budget of the solver, by default the budget of the session.
+        """
+        budget = self.budget if budget is None else budget
+        key = (self.prog,) + tuple(hole_completions[h.var.name] for h in self.prog.holes)
+        return cached_check(key, lambda: self.solve(hole_completions, budget))
+
+    def find_counterexample(self, hole_completions: Mapping[str, Expression]) -> Optional[Dict[str, Value]]:
+        """
+        Returns None if the program with the hole completions is valid, and
+        a counterexample otherwise (see `find_counterexample`).
+        """
+        return as_counterexample(self.check(hole_completions))
+
+    def solve(self, hole_completions: Mapping[str, Expression], budget: Budget) -> Result:
+        self.solver.push()
+        try:
+            set_budget(self.solver, budget)
+            # A completion can use the defines that come before the hole.
+            for name, value in self.template.hole_values(hole_completions).items():
+                self.solver.add(self.translator.translate(self.placeholders[name]) == self.translator.translate(value))
+            ans = self.solver.check()
+            if ans == unsat:
+                return Validity.VALID, None
+            if ans == unknown:
+                return Validity.UNKNOWN, None
+            return Validity.INVALID, model_counterexample(self.solver.model(), self.prog.inputs)
+        finally:
+            self.solver.pop()
+
+
+class RetryQueue():
+    """
+    The candidates whose verification was unknown within the budget of the
+    synthesis loop. They are deferred, so that one hard candidate does not
+    stall the loop, and verified again later with a larger budget.
+    """
+
+    def __init__(self, budget: Budget = RETRY_BUDGET) -> None:
+        """
+        @param budget The budget of the candidates when they are retried.
+        """
+        self.budget = budget
+        self.deferred: List[Mapping[str, Expression]] = []
+
+    def defer(self, hole_completions: Mapping[str, Expression]) -> None:
+        self.deferred.append(hole_completions)
+
+    def retry(self, session: VerificationSession) -> Optional[Mapping[str, Expression]]:
+        """
+        Verifies the deferred candidates in order with the larger budget, and
+        returns the first one that is valid, or None. The candidates that are
+        still unknown are dropped.
+        """
+        deferred, self.deferred = self.deferred, []
+        for index, hole_completions in enumerate(deferred):
+            validity, _ = session.check(hole_completions, self.budget)
+            if validity == Validity.VALID:
+                # The other candidates can still be retried later.
+                self.deferred = deferred[index + 1:]
+                return hole_completions
+        return None
+
+
+def is_valid(formula: Expression, budget: Budget = UNBOUNDED) -> bool:
+    """
+    Returns true if the formula is valid. By default the solver is not
+    limited, a formula that is not decided within the budget is not valid.
+    """
+    return check(formula, budget=budget)[0] == Validity.VALID